@@ -1,14 +1,327 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, Response, g, render_template, before_render_template, template_rendered, request, redirect, url_for, session, flash, has_request_context, jsonify, send_from_directory, send_file, make_response, get_flashed_messages
+from markupsafe import Markup, escape
 import os
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
+from werkzeug.exceptions import NotFound
+from urllib.parse import quote
 from datetime import datetime, timedelta
 import uuid
 import json
+import bisect
+import sqlite3
+import threading
+import time
+import atexit
 from functools import wraps
 import re
+import math
+import heapq
+import unicodedata
+from collections import OrderedDict, Counter
+import gzip
+import mimetypes
+from contextlib import contextmanager, nullcontext
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import gevent
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent = None
+import hashlib
+import click
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import logging.handlers
+import queue
+import random
+import socket
+import signal
+import tarfile
+import tempfile
+import io
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)  # Secure secret key for production
+
+# ---------- Logging ----------
+# Log records are structured: an event name plus key=value fields, written
+# as logfmt text or, with LOG_FORMAT=json, one JSON object per line. The
+# request thread only puts the record on a queue; formatting and the write
+# to stderr happen on a listener thread. Fields given as callables are only
+# evaluated when their level is enabled, so large payloads cost nothing at
+# the default level. Per-request records below WARNING are sampled by
+# endpoint through LOG_SAMPLE, e.g. "api_page=0.1,static=0,*=1".
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+def parse_sample_rates(spec):
+    rates = {}
+    for part in spec.split(","):
+        endpoint, sep, rate = part.partition("=")
+        if sep:
+            try:
+                rates[endpoint.strip()] = min(max(float(rate), 0.0), 1.0)
+            except ValueError:
+                pass
+    return rates
+
+LOG_SAMPLE_RATES = parse_sample_rates(os.environ.get("LOG_SAMPLE", "static=0,metrics=0"))
+
+logger = logging.getLogger("ourjourney")
+logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+logger.propagate = False
+
+class StructuredFormatter(logging.Formatter):
+    def format(self, record):
+        fields = getattr(record, "fields", {})
+        if LOG_FORMAT == "json":
+            entry = {"time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+                     "level": record.levelname.lower(), "event": record.getMessage(), "pid": record.process}
+            entry.update(fields)
+            if record.exc_info:
+                entry["exception"] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str, ensure_ascii=False)
+        parts = [datetime.fromtimestamp(record.created).strftime("%H:%M:%S"), record.levelname, record.getMessage()]
+        for key, value in fields.items():
+            value = str(value)
+            if not value or any(c in value for c in ' "='):
+                value = json.dumps(value, ensure_ascii=False)
+            parts.append(f"{key}={value}")
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class EndpointSampler(logging.Filter):
+    """Drops a share of the per-request records below WARNING for each endpoint."""
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not has_request_context():
+            return True
+        endpoint = request.endpoint or ""
+        rate = LOG_SAMPLE_RATES.get(endpoint, LOG_SAMPLE_RATES.get("*", 1.0))
+        return rate >= 1.0 or random.random() < rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the queue is full the record is dropped."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Formatting is left to the listener thread; fields are already values
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+log_listener = None
+
+def start_logging():
+    global log_listener
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(EndpointSampler())
+    logger.addHandler(queue_handler)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter())
+    log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    log_listener.start()
+
+def stop_logging():
+    if log_listener is not None and log_listener._thread is not None:
+        log_listener.stop()
+
+start_logging()
+atexit.register(stop_logging)
+# The listener thread does not survive fork (gunicorn --preload); start a
+# fresh queue and listener in the child
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=start_logging)
+
+def log_event(level, event, exc_info=None, **fields):
+    if not logger.isEnabledFor(level):
+        return
+    fields = {key: value() if callable(value) else value for key, value in fields.items()}
+    logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+# ---------- Metrics ----------
+# Counters and histograms kept in process memory and rendered in Prometheus
+# text format by /metrics. Recording is a bisect and an add under a lock per
+# metric; nothing is formatted until something scrapes. Every series carries
+# the worker's pid, so workers behind gunicorn report separate series that
+# the scraper can sum. Set METRICS_TOKEN to let a scraper in with
+# "Authorization: Bearer <token>"; without it /metrics needs a login.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+METRICS = []
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names, values):
+    pairs = zip(names + ("pid",), values + (os.getpid(),))
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+class CounterMetric:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.lock = threading.Lock()
+        self.values = {}
+        METRICS.append(self)
+
+    def inc(self, amount, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            values = list(self.values.items())
+        return [f"{self.name}{format_labels(self.labels, labels)} {value}" for labels, value in values]
+
+class HistogramMetric:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self.values = {}
+        METRICS.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        with self.lock:
+            values = [(labels, counts[:], total) for labels, (counts, total) in self.values.items()]
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labels + ('le',), labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+REQUEST_SECONDS = HistogramMetric("http_request_duration_seconds", "Time spent handling requests.", ("endpoint", "method"))
+REQUESTS = CounterMetric("http_requests_total", "Requests handled.", ("endpoint", "method", "status"))
+RENDER_SECONDS = HistogramMetric("template_render_seconds", "Time spent rendering templates.", ("template",))
+STORAGE_WRITE_SECONDS = HistogramMetric("storage_write_seconds", "Time spent writing to storage.", ("target",))
+STORAGE_WRITE_BYTES = CounterMetric("storage_write_bytes_total", "Bytes written to storage files.", ("file",))
+UPLOAD_BYTES = HistogramMetric("upload_size_bytes", "Size of uploaded files.", ("folder",), SIZE_BUCKETS)
+UPLOAD_SECONDS = HistogramMetric("upload_duration_seconds", "Time spent receiving and storing uploads.", ("folder",))
+JOB_SECONDS = HistogramMetric("job_duration_seconds", "Time spent running background jobs.", ("kind",))
+JOBS = CounterMetric("jobs_total", "Background jobs run.", ("kind", "status"))
+
+# One access record and one latency sample per request
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_SECONDS.observe(elapsed, endpoint, request.method)
+        REQUESTS.inc(1, endpoint, request.method, str(response.status_code))
+        log_event(logging.INFO, "request", method=request.method, path=request.path,
+                  status=response.status_code, ms=round(elapsed * 1000, 1))
+    return response
+
+@before_render_template.connect_via(app)
+def start_render_timer(sender, template, context, **extra):
+    g.setdefault("render_started", []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def record_render(sender, template, context, **extra):
+    started = g.get("render_started")
+    if started:
+        RENDER_SECONDS.observe(time.perf_counter() - started.pop(), template.name or "string")
+
+# Every worker must sign sessions with the same key: SECRET_KEY from the
+# environment, else one generated on first start and kept in SECRET_KEY_FILE
+SECRET_KEY_FILE = "secret_key"
+
+def load_secret_key():
+    if os.environ.get("SECRET_KEY"):
+        return os.environ["SECRET_KEY"]
+    if not os.path.exists(SECRET_KEY_FILE):
+        tmp_file = f"{SECRET_KEY_FILE}.{os.getpid()}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(os.urandom(32).hex())
+        try:
+            # link() fails if another worker got there first; theirs wins
+            os.link(tmp_file, SECRET_KEY_FILE)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_file)
+    with open(SECRET_KEY_FILE, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+app.secret_key = load_secret_key()
+# Ordinary form posts are capped at MAX_REQUEST_MB; anything bigger goes
+# through the chunked upload API in chunks well below that
+MAX_REQUEST_BYTES = int(float(os.environ.get("MAX_REQUEST_MB", "32")) * 1024 * 1024)
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+
+# ---------- Serving ----------
+# gunicorn.conf.py picks the worker class from SERVER_MODE: async (gevent)
+# lets one worker hold WORKER_CONNECTIONS slow uploads and downloads at
+# once, threads (gthread) gives each request one of WORKER_THREADS threads,
+# sync serves one request at a time. Under gevent every request and
+# background "thread" of a worker shares one OS thread, so a blocking disk
+# call stalls all of them; blocking() runs such calls (file writes, fsync,
+# waiting for another process's flock) in gevent's thread pool there and
+# simply calls them everywhere else. SQLite's waits for a lock held by another
+# process cannot be moved off the hub that way, so gunicorn.conf.py only makes
+# async the default for a single worker.
+ASYNC_SERVER = gevent is not None and gevent_monkey.is_module_patched("socket")
+
+def blocking(func, *args):
+    if ASYNC_SERVER:
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+# Per OS thread, also under gevent where threading.local is per greenlet:
+# SQLite connections are kept per thread, not opened for every request
+thread_local = gevent_monkey.get_original("threading", "local") if ASYNC_SERVER else threading.local
 
 # Define a custom Jinja2 filter for datetime formatting
 @app.template_filter('datetime')
@@ -17,73 +330,2591 @@ def format_datetime(value):
         try:
             return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
         except ValueError:
-            print(f"Error parsing datetime: {value} at {datetime.now().strftime('%H:%M:%S')}")
+            log_event(logging.WARNING, "datetime_parse_failed", value=value)
             return value
     return value
 
-# Upload folder setup
-UPLOAD_FOLDER = "static/uploads"
-MEMORIES_PHOTO_FOLDER = "static/memories"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(MEMORIES_PHOTO_FOLDER, exist_ok=True)
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["MEMORIES_PHOTO_FOLDER"] = MEMORIES_PHOTO_FOLDER
+# Upload folder setup
+UPLOAD_FOLDER = "static/uploads"
+MEMORIES_PHOTO_FOLDER = "static/memories"
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(MEMORIES_PHOTO_FOLDER, exist_ok=True)
+app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["MEMORIES_PHOTO_FOLDER"] = MEMORIES_PHOTO_FOLDER
+IMAGE_FOLDERS = {"uploads": UPLOAD_FOLDER, "memories": MEMORIES_PHOTO_FOLDER}
+
+# DB file paths
+DB_FILE = "data.json"
+MUSIC_FILE = "music.json"
+JOURNAL_FILE = "data.journal"
+
+# Multi-worker mode, for gunicorn with several worker processes. Each process
+# keeps its own copy of db, so a change is made under an exclusive lock on
+# LOCK_FILE: the worker first replays what others appended to the journal,
+# then appends its own records before letting go. Every request starts by
+# checking the journal's (inode, size) against what this worker has read and
+# replays only when it moved. On by default when WEB_CONCURRENCY asks for more
+# than one worker, and gunicorn.conf.py turns it on for however many workers
+# gunicorn really starts (-w, --workers); the SQLite backend uses the same
+# lock and PRAGMA data_version.
+MULTI_WORKER = os.environ.get("MULTI_WORKER", "1" if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1 else "0") == "1"
+LOCK_FILE = "data.lock"
+# Touched by a snapshot restore or an archive import from another process; a
+# single worker reloads db when its mtime changes (see reload_if_restored())
+RESTORED_FILE = "data.restored"
+if ASYNC_SERVER and MULTI_WORKER:
+    log_event(logging.WARNING, "async_multi_worker", detail="waits for SQLite locks held by other workers stall the gevent hub")
+
+# Journaled storage: mutations are appended to JOURNAL_FILE as one JSON record per
+# line instead of rewriting DB_FILE, and a background compaction folds the journal
+# back into a fresh DB_FILE snapshot once it grows past JOURNAL_COMPACT_BYTES.
+# Set DB_JOURNAL=0 to go back to rewriting DB_FILE on every save (not in
+# multi-worker mode, which needs the journal).
+JOURNAL_ENABLED = os.environ.get("DB_JOURNAL", "1") != "0" or MULTI_WORKER
+JOURNAL_COMPACT_BYTES = int(os.environ.get("DB_JOURNAL_COMPACT_BYTES", 1024 * 1024))
+
+# Guards db, the pending journal records and the journal sequence number
+db_lock = threading.RLock()
+pending_ops = []
+journal_seq = 0
+compaction_running = False
+# Inode of JOURNAL_FILE and how far into it this process has read or written
+journal_ino = None
+journal_offset = 0
+
+class ProcessLock:
+    """Reentrant lock that excludes other threads and, through flock, other processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.fd = None
+        self.pid = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.depth == 0 and fcntl is not None:
+            # A descriptor inherited through fork shares its flock with the parent
+            if self.pid != os.getpid():
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                self.pid = os.getpid()
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Held by another process; wait off the gevent hub
+                blocking(fcntl.flock, self.fd, fcntl.LOCK_EX)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0 and fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+shared_lock = ProcessLock(LOCK_FILE)
+
+# Collections stored as {id: record} dicts; ids only ever grow, so insertion
+# order is id order and a dict gives O(1) lookup, append and delete
+RECORD_COLLECTIONS = ("ideas", "memories", "notes", "gallery")
+
+# Bumped on every change to a collection, so derived data can tell it is stale
+data_versions = {}
+
+def bump_version(collection):
+    data_versions[collection] = data_versions.get(collection, 0) + 1
+
+# Turn a newest-first list of records into an id-keyed dict, giving records
+# saved before ids existed the next free ids in oldest-first order
+def index_records(items, next_id):
+    records = {}
+    for item in reversed(items):
+        if not isinstance(item, dict):
+            continue
+        if not isinstance(item.get("id"), int):
+            item["id"] = next_id
+        next_id = max(next_id, item["id"] + 1)
+        records[item["id"]] = item
+    return dict(sorted(records.items())), next_id
+
+# Apply one journal record to an in-memory database
+def apply_op(target, op):
+    if op["op"] == "meta":
+        target.setdefault("_meta", {}).update(op["v"])
+        return
+    items = target[op["c"]]
+    next_ids = target["_next_ids"]
+    item_id = op.get("id")
+    if "i" in op and op["op"] != "insert":
+        # Positional record written before records had ids; positions count newest first
+        item_id = list(items)[-1 - op["i"]]
+    if op["op"] == "insert":
+        # A copy: the record stays in pending_ops until it is flushed, and
+        # later changes to the stored item must not show up in it
+        item = dict(op["v"])
+        if not isinstance(item.get("id"), int):
+            item["id"] = next_ids.get(op["c"], 1)
+        items[item["id"]] = item
+        next_ids[op["c"]] = max(next_ids.get(op["c"], 1), item["id"] + 1)
+    elif op["op"] == "update":
+        items[item_id].update(op["v"])
+    elif op["op"] == "replace":
+        items[item_id] = dict(op["v"], id=item_id)
+    elif op["op"] == "delete":
+        items.pop(item_id)
+
+# Mutate db and remember the change so save_db() only has to append it
+def record_op(op, collection, item_id=None, value=None):
+    global journal_seq
+    with db_lock:
+        journal_seq += 1
+        record = {"seq": journal_seq, "op": op, "c": collection}
+        if item_id is not None:
+            record["id"] = item_id
+        if value is not None:
+            record["v"] = value
+        apply_op(db, record)
+        pending_ops.append(record)
+        bump_version(collection)
+
+def db_insert(collection, item):
+    with db_lock:
+        item = dict(item, id=db["_next_ids"].get(collection, 1))
+        record_op("insert", collection, value=item)
+        return item["id"]
+
+def db_update(collection, item_id, **fields):
+    record_op("update", collection, item_id, fields)
+
+def db_replace(collection, item_id, item):
+    record_op("replace", collection, item_id, item)
+
+def db_delete(collection, item_id):
+    record_op("delete", collection, item_id)
+
+def db_set_meta(key, value):
+    record_op("meta", "_meta", value={key: value})
+
+# The on-disk form of db: collections as newest-first lists like before ids existed
+def serialize_db(indent=4):
+    with db_lock:
+        data = {key: value for key, value in db.items() if key not in RECORD_COLLECTIONS}
+        for collection in RECORD_COLLECTIONS:
+            data[collection] = list(reversed(db[collection].values()))
+        data["_journal_seq"] = journal_seq
+        return json.dumps(data, indent=indent, ensure_ascii=False)
+
+# Write-behind flushing: save_db()/save_music() only mark the store dirty and a
+# background thread writes it out, coalescing every save made within
+# WRITE_BEHIND_MAX_DELAY seconds into one write. Set WRITE_BEHIND=0 to write
+# synchronously inside the request; save_db(durable=True) always does.
+# Always off in multi-worker mode, where records must reach the journal under the lock.
+WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND", "1") != "0" and not MULTI_WORKER
+WRITE_BEHIND_MAX_DELAY = float(os.environ.get("WRITE_BEHIND_MAX_DELAY", 0.5))
+
+# Serializes appends to JOURNAL_FILE with the compaction rewrite
+journal_file_lock = threading.Lock()
+
+# Replace path with text without ever leaving a truncated file behind
+def write_file_atomic(path, text):
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        blocking(os.fsync, f.fileno())
+        STORAGE_WRITE_BYTES.inc(os.fstat(f.fileno()).st_size, path)
+    os.replace(tmp_file, path)
+
+class WriteBehindFlusher:
+    """Runs flush_func on a background thread once per burst of save requests."""
+
+    def __init__(self, name, flush_func, max_delay):
+        self.name = name
+        self.flush_func = flush_func
+        self.max_delay = max_delay
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.dirty = False
+        self.thread = None
+
+    def save(self, durable=False):
+        with self.cond:
+            self.dirty = True
+            if durable or not WRITE_BEHIND_ENABLED:
+                sync = True
+            else:
+                sync = False
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self.run, name=f"{self.name}-flusher", daemon=True)
+                    self.thread.start()
+                self.cond.notify()
+        return self.flush() if sync else True
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.dirty:
+                    self.cond.wait()
+            # Let the rest of the burst pile up before writing
+            time.sleep(self.max_delay)
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.cond:
+                if not self.dirty:
+                    return True
+                self.dirty = False
+            started = time.perf_counter()
+            try:
+                self.flush_func()
+                STORAGE_WRITE_SECONDS.observe(time.perf_counter() - started, self.name)
+                return True
+            except Exception as e:
+                log_event(logging.ERROR, "flush_failed", flusher=self.name, error=e)
+                with self.cond:
+                    self.dirty = True
+                return False
+
+# Write pending changes to disk: journal records, or a full snapshot without the journal.
+# Always under shared_lock, so a `flask snapshots --restore` or
+# `flask import-archive` from another process cannot replace the files between
+# this worker noticing it and writing.
+def flush_db():
+    with shared_lock:
+        # Changes made before a restore or import must not land on top of it
+        if not MULTI_WORKER:
+            reload_if_restored()
+        with db_lock:
+            records = pending_ops[:]
+            pending_ops.clear()
+            if not JOURNAL_ENABLED:
+                payload = serialize_db()
+            else:
+                # Serialized under the lock, while no request can be changing them
+                lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        if not JOURNAL_ENABLED:
+            write_file_atomic(DB_FILE, payload)
+            log_event(logging.INFO, "db_saved", file=DB_FILE)
+        elif records:
+            try:
+                with journal_file_lock, open(JOURNAL_FILE, "ab") as f:
+                    start = f.tell()
+                    f.write(lines)
+                    f.flush()
+                    blocking(os.fsync, f.fileno())
+                    track_journal_append(os.fstat(f.fileno()).st_ino, start, f.tell())
+                    STORAGE_WRITE_BYTES.inc(f.tell() - start, JOURNAL_FILE)
+            except Exception:
+                with db_lock:
+                    pending_ops[:0] = records
+                raise
+            log_event(logging.DEBUG, "journal_appended", file=JOURNAL_FILE, records=len(records))
+    maybe_snapshot()
+    if not JOURNAL_ENABLED:
+        return
+    maybe_compact_journal()
+
+db_flusher = WriteBehindFlusher("database", flush_db, WRITE_BEHIND_MAX_DELAY)
+
+# Function to save the main database to a JSON file
+def save_db(durable=False):
+    if db_flusher.save(durable):
+        return True
+    flash("Failed to save database. Please try again.", "error")
+    return False
+
+# Move the read position past our own append, if nothing unread came before it
+def track_journal_append(ino, start, end):
+    global journal_ino, journal_offset
+    with db_lock:
+        if journal_ino in (None, ino) and journal_offset == start:
+            journal_ino, journal_offset = ino, end
+
+# Start a background compaction once the journal passes the size threshold
+def maybe_compact_journal():
+    global compaction_running
+    try:
+        size = os.path.getsize(JOURNAL_FILE)
+    except OSError:
+        return
+    with db_lock:
+        if size < JOURNAL_COMPACT_BYTES or compaction_running:
+            return
+        compaction_running = True
+    threading.Thread(target=compact_journal, name="journal-compaction", daemon=True).start()
+
+# Fold the journal into a new DB_FILE snapshot. The snapshot is serialized under the
+# lock but written outside it, so requests keep changing db while the file is written;
+# records newer than the snapshot are carried over into the truncated journal.
+# The whole compaction holds the cross-process lock: other workers cannot see
+# the snapshot until the journal has been replaced, and a restore or import
+# from another process must not be written over with what this one had.
+def compact_journal():
+    global compaction_running, journal_ino, journal_offset
+    try:
+        with shared_lock:
+            # Another worker's compaction, or a restore, may have replaced the
+            # journal while we waited for the lock
+            if os.path.getsize(JOURNAL_FILE) < JOURNAL_COMPACT_BYTES:
+                return
+            if MULTI_WORKER:
+                refresh_db()
+            else:
+                reload_if_restored()
+            # The records about to leave the journal go into a snapshot first
+            if SNAPSHOTS_ENABLED:
+                take_snapshot()
+            with db_lock:
+                snapshot_seq = journal_seq
+                payload = serialize_db()
+            write_file_atomic(DB_FILE, payload)
+            with journal_file_lock:
+                remaining = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in read_journal()[0] if r["seq"] > snapshot_seq)
+                write_file_atomic(JOURNAL_FILE, remaining)
+                with db_lock:
+                    journal_ino, journal_offset = os.stat(JOURNAL_FILE).st_ino, len(remaining.encode("utf-8"))
+        log_event(logging.INFO, "journal_compacted", file=JOURNAL_FILE, into=DB_FILE, seq=snapshot_seq)
+    except Exception as e:
+        log_event(logging.ERROR, "journal_compaction_failed", error=e)
+    finally:
+        with db_lock:
+            compaction_running = False
+
+# Read the journal from byte offset on. Returns the records, the journal's inode
+# and the offset past the last complete line; a torn last line (a crash or an
+# append still in progress) is left for the next read.
+def read_journal(offset=0):
+    try:
+        with open(JOURNAL_FILE, "rb") as f:
+            ino = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], None, 0
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            log_event(logging.WARNING, "journal_record_unreadable", file=JOURNAL_FILE)
+    return records, ino, offset + end
+
+# Turn the newest-first collection lists of a loaded snapshot into {id: record} dicts
+def index_db(loaded_db):
+    next_ids = loaded_db.setdefault("_next_ids", {})
+    for collection in RECORD_COLLECTIONS:
+        loaded_db[collection], next_ids[collection] = index_records(loaded_db.get(collection, []), next_ids.get(collection, 1))
+    return loaded_db
+
+# Replay journal records newer than the snapshot on top of it
+def replay_journal(loaded_db):
+    global journal_seq, journal_ino, journal_offset
+    journal_seq = loaded_db.pop("_journal_seq", 0)
+    index_db(loaded_db)
+    replayed = 0
+    records, journal_ino, journal_offset = read_journal()
+    for record in records:
+        if record["seq"] <= journal_seq:
+            continue
+        try:
+            apply_op(loaded_db, record)
+        except (IndexError, KeyError, TypeError) as e:
+            log_event(logging.ERROR, "journal_replay_failed", seq=record["seq"], error=e)
+        journal_seq = record["seq"]
+        replayed += 1
+    if replayed:
+        log_event(logging.INFO, "journal_replayed", file=JOURNAL_FILE, records=replayed)
+    return loaded_db
+
+# Function to load the main database from a JSON file
+def load_db():
+    if os.path.exists(DB_FILE):
+        try:
+            with open(DB_FILE, "r", encoding="utf-8") as f:
+                loaded_db = json.load(f)
+                if isinstance(loaded_db.get("ideas", []), list):
+                    loaded_db["ideas"] = [{"text": i, "status": "Planned"} if isinstance(i, str) else i for i in loaded_db["ideas"]]
+                return replay_journal(loaded_db)
+        except json.JSONDecodeError as e:
+            log_event(logging.ERROR, "db_decode_failed", file=DB_FILE, error=e)
+            # Keep it for a closer look; the next save would replace it
+            try:
+                os.replace(DB_FILE, f"{DB_FILE}.corrupt-{datetime.now():%Y%m%d-%H%M%S}")
+            except OSError:
+                pass
+    # Rather than starting over from the seed data
+    recovered = recover_db()
+    if recovered is not None:
+        return replay_journal(recovered)
+    return replay_journal({
+        "users": [
+            {"username": "BUNBUN", "password": "09132025", "role": "erl"},
+            {"username": "BUNNY", "password": "09132025", "role": "love"}
+        ],
+        "ideas": [{"text": "Go for a picnic", "status": "Planned"}, {"text": "Watch a movie together", "status": "Planned"}],
+        "memories": [{"text": "Our first date", "category": "Romantic", "timestamp": "2025-09-13T12:00:00", "photo": ""}],
+        "notes": [{"text": "Don’t forget the anniversary gift!", "timestamp": datetime.now().isoformat()}, {"text": "Plan next weekend", "timestamp": datetime.now().isoformat()}],
+        "gallery": []
+    })
+
+# Multi-worker mode: catch up with journal records other workers appended since
+# we last looked. A journal replaced by another worker's compaction, or a
+# snapshot written without the journal, means reloading everything.
+# Runs without shared_lock, since it only reads: appends are whole lines (a
+# torn last line is left for the next read) and compaction swaps the journal
+# in with a rename after DB_FILE, which the inode check catches. Writers call
+# it again under shared_lock before changing anything (see writing()).
+# The journal is read before taking db_lock: flush_db() holds
+# journal_file_lock and then db_lock, so locks are only ever taken in that order.
+def refresh_db():
+    global journal_seq, journal_offset
+    with db_lock:
+        ino, offset = journal_ino, journal_offset
+    try:
+        stat = os.stat(JOURNAL_FILE)
+    except FileNotFoundError:
+        stat = None
+    if stat is None and ino is None:
+        return
+    if stat is not None and (stat.st_ino, stat.st_size) == (ino, offset):
+        return
+    if stat is None or stat.st_ino != ino or stat.st_size < offset:
+        reload_db()
+        return
+    records, read_ino, end = read_journal(offset)
+    if read_ino != ino:
+        reload_db()
+        return
+    with db_lock:
+        # Another thread reloaded in the meantime and is ahead of this read
+        if journal_ino != ino:
+            return
+        changed = set()
+        for record in records:
+            if record["seq"] <= journal_seq:
+                continue
+            try:
+                apply_op(db, record)
+            except (IndexError, KeyError, TypeError) as e:
+                log_event(logging.ERROR, "journal_replay_failed", seq=record["seq"], error=e)
+            journal_seq = record["seq"]
+            changed.add(record["c"])
+        # Others may have read further, or this worker appended past it
+        journal_offset = max(journal_offset, end)
+        for collection in changed:
+            bump_version(collection)
+
+def reload_db():
+    fresh = load_db()
+    with db_lock:
+        db.clear()
+        db.update(fresh)
+        for collection in RECORD_COLLECTIONS + ("_meta",):
+            bump_version(collection)
+
+# ---------- Snapshots ----------
+# Rotating point-in-time copies of db in SNAPSHOT_FOLDER, taken once
+# SNAPSHOT_EVERY changes have piled up or with the first change after
+# SNAPSHOT_INTERVAL seconds, and always before a compaction drops records
+# from the journal. Journal records are already deltas, so a snapshot is
+# normally just the records since the previous one, gzipped:
+#   <seq>-<unix time>-delta.ndjson.gz
+# Every SNAPSHOT_FULL_EVERY snapshots (or when records are missing, e.g.
+# with DB_JOURNAL=0) it is a gzipped copy of the whole of db instead:
+#   <seq>-<unix time>-full.json.gz
+# Going back to a point means loading the full snapshot before it and
+# applying the deltas up to it. Once there are more than SNAPSHOT_KEEP
+# snapshots, the oldest chain (a full one and its deltas) is dropped.
+# `flask snapshots` lists them, --take takes one, --restore goes back to one
+# while the app keeps running: workers in multi-worker mode reload from the
+# replaced journal, a single worker from the RESTORED_FILE marker.
+SNAPSHOTS_ENABLED = os.environ.get("SNAPSHOTS", "1") != "0"
+SNAPSHOT_FOLDER = os.environ.get("SNAPSHOT_FOLDER", "snapshots")
+SNAPSHOT_EVERY = int(os.environ.get("SNAPSHOT_EVERY", 200))
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", 3600))
+SNAPSHOT_FULL_EVERY = int(os.environ.get("SNAPSHOT_FULL_EVERY", 50))
+SNAPSHOT_KEEP = int(os.environ.get("SNAPSHOT_KEEP", 500))
+SNAPSHOT_NAME_RE = re.compile(r"(\d+)-(\d+)-(full|delta)\.(?:json|ndjson)\.gz")
+if SNAPSHOTS_ENABLED:
+    os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+
+# [{"seq", "time", "kind", "path"}], oldest first
+def list_snapshots():
+    points = []
+    try:
+        entries = list(os.scandir(SNAPSHOT_FOLDER))
+    except FileNotFoundError:
+        return points
+    for entry in entries:
+        match = SNAPSHOT_NAME_RE.fullmatch(entry.name)
+        if match:
+            points.append({"seq": int(match.group(1)), "time": int(match.group(2)), "kind": match.group(3), "path": entry.path})
+    return sorted(points, key=lambda p: (p["seq"], p["kind"] == "full"))
+
+# Guards the snapshot folder within this process
+snapshot_lock = threading.Lock()
+snapshot_running = False
+# (seq, unix time) of the newest snapshot this process knows of
+last_snapshot = next(((p["seq"], p["time"]) for p in list_snapshots()[-1:]), None)
+
+def write_gzip_atomic(path, text):
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_file, "wt", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+    STORAGE_WRITE_BYTES.inc(os.path.getsize(path), SNAPSHOT_FOLDER)
+
+# Start a background snapshot when one is due
+def maybe_snapshot():
+    global snapshot_running
+    if not SNAPSHOTS_ENABLED:
+        return
+    with db_lock:
+        seq = journal_seq
+        last_seq, last_time = last_snapshot or (0, 0)
+        if snapshot_running or seq == last_seq or (seq - last_seq < SNAPSHOT_EVERY and time.time() - last_time < SNAPSHOT_INTERVAL):
+            return
+        snapshot_running = True
+    threading.Thread(target=run_snapshot, name="snapshot", daemon=True).start()
+
+def run_snapshot():
+    global snapshot_running
+    try:
+        take_snapshot()
+    except Exception as e:
+        log_event(logging.ERROR, "snapshot_failed", error=e)
+    finally:
+        with db_lock:
+            snapshot_running = False
+
+# Snapshot what db holds now. A delta when the journal has every record since
+# the previous snapshot, a full copy when it does not or full=True. Returns
+# the new point, or None when nothing changed.
+def take_snapshot(full=False):
+    global last_snapshot
+    with shared_lock if MULTI_WORKER else nullcontext(), snapshot_lock:
+        if MULTI_WORKER:
+            refresh_db()
+        points = list_snapshots()
+        last = points[-1] if points else None
+        since_full = next((i for i, p in enumerate(reversed(points)) if p["kind"] == "full"), None)
+        now = int(time.time())
+        records = None
+        if not full and JOURNAL_ENABLED and since_full is not None and since_full + 1 < SNAPSHOT_FULL_EVERY:
+            # Records of flushes that raced a compaction can be out of order
+            unseen = {r["seq"]: r for r in read_journal()[0] if r["seq"] > last["seq"]}
+            records = [unseen[seq] for seq in sorted(unseen)]
+            if any(r["seq"] != last["seq"] + 1 + i for i, r in enumerate(records)):
+                records = None
+        if records is not None:
+            if not records:
+                return None
+            seq = records[-1]["seq"]
+            path = os.path.join(SNAPSHOT_FOLDER, f"{seq:012d}-{now}-delta.ndjson.gz")
+            write_gzip_atomic(path, "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+            point = {"seq": seq, "time": now, "kind": "delta", "path": path}
+        else:
+            with db_lock:
+                seq = journal_seq
+                payload = serialize_db(indent=None)
+            if last is not None and last["seq"] == seq and not full:
+                return None
+            path = os.path.join(SNAPSHOT_FOLDER, f"{seq:012d}-{now}-full.json.gz")
+            write_gzip_atomic(path, payload)
+            point = {"seq": seq, "time": now, "kind": "full", "path": path}
+        with db_lock:
+            last_snapshot = (seq, now)
+        points.append(point)
+        prune_snapshots(points)
+        log_event(logging.INFO, "snapshot_taken", kind=point["kind"], seq=seq, bytes=os.path.getsize(path))
+        return point
+
+# Drop the oldest chain while the newer ones alone hold SNAPSHOT_KEEP snapshots
+def prune_snapshots(points):
+    fulls = [i for i, p in enumerate(points) if p["kind"] == "full"]
+    while len(fulls) > 1 and len(points) - fulls[1] >= SNAPSHOT_KEEP:
+        for point in points[:fulls[1]]:
+            os.remove(point["path"])
+        del points[:fulls[1]]
+        fulls = [i - fulls[1] for i in fulls[1:]]
+
+# db as of points[index], in the on-disk form of DB_FILE
+def snapshot_state(points, index):
+    start = next(i for i in range(index, -1, -1) if points[i]["kind"] == "full")
+    with gzip.open(points[start]["path"], "rt", encoding="utf-8") as f:
+        state = json.load(f)
+    seq = state.pop("_journal_seq", 0)
+    index_db(state)
+    for point in points[start + 1:index + 1]:
+        with gzip.open(point["path"], "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                apply_op(state, record)
+                seq = record["seq"]
+    for collection in RECORD_COLLECTIONS:
+        state[collection] = list(reversed(state[collection].values()))
+    state["_journal_seq"] = seq
+    return state
+
+# db from the newest snapshot that can still be read, or None
+def recover_db():
+    if not SNAPSHOTS_ENABLED:
+        return None
+    points = list_snapshots()
+    for index in range(len(points) - 1, -1, -1):
+        try:
+            state = snapshot_state(points, index)
+        except (OSError, ValueError, KeyError, StopIteration) as e:
+            log_event(logging.ERROR, "snapshot_unreadable", seq=points[index]["seq"], error=e)
+            continue
+        log_event(logging.WARNING, "db_recovered", seq=points[index]["seq"], snapshot=points[index]["path"])
+        return state
+    return None
+
+# Write db out as a fresh DB_FILE with an empty journal. Journal records still
+# in flight are older than the new DB_FILE and skipped on replay. The seq
+# moves on without a record, so the next snapshot is a full one.
+def replace_db_file():
+    global journal_seq, journal_ino, journal_offset
+    with db_lock:
+        pending_ops.clear()
+        journal_seq += 1
+        payload = serialize_db()
+    write_file_atomic(DB_FILE, payload)
+    if JOURNAL_ENABLED:
+        with journal_file_lock:
+            write_file_atomic(JOURNAL_FILE, "")
+            with db_lock:
+                journal_ino, journal_offset = os.stat(JOURNAL_FILE).st_ino, 0
+
+def restored_marker():
+    try:
+        return os.stat(RESTORED_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+restored_seen = restored_marker()
+
+# Tell a running single worker that DB_FILE was replaced under it
+def mark_restored(**details):
+    global restored_seen
+    write_file_atomic(RESTORED_FILE, json.dumps(dict(details, restored_at=datetime.now().isoformat())))
+    restored_seen = restored_marker()
+
+# Make db what it was at a snapshot point. Ids handed out since stay used.
+# Runs under shared_lock whatever the mode: a single worker flushes under it
+# too, and checks for the RESTORED_FILE marker before it writes.
+def restore_snapshot(points, index):
+    state = snapshot_state(points, index)
+    state.pop("_journal_seq")
+    index_db(state)
+    with shared_lock:
+        # What the running worker saved since this process loaded db
+        if JOURNAL_ENABLED:
+            refresh_db()
+        # The current state becomes a point too, so the restore can be undone
+        take_snapshot()
+        with db_lock:
+            for collection, next_id in db["_next_ids"].items():
+                state["_next_ids"][collection] = max(state["_next_ids"].get(collection, 1), next_id)
+            db.clear()
+            db.update(state)
+            for collection in RECORD_COLLECTIONS + ("_meta",):
+                bump_version(collection)
+        replace_db_file()
+        mark_restored(seq=points[index]["seq"])
+    log_event(logging.WARNING, "snapshot_restored", seq=points[index]["seq"], snapshot=points[index]["path"])
+    take_snapshot()
+
+# A single worker does not follow the journal; it reloads when another
+# process restored a snapshot or imported an archive
+def reload_if_restored():
+    global restored_seen
+    marker = restored_marker()
+    if marker == restored_seen:
+        return
+    with db_lock:
+        restored_seen = marker
+        pending_ops.clear()
+        reload_db()
+    log_event(logging.WARNING, "db_reloaded", reason="replaced by another process")
+
+# ---------- Content-Addressed Uploads ----------
+# Uploaded files are stored as <sha256><ext>, hashed while the upload is
+# streamed to disk, so the same image is only ever kept once per folder. When
+# the other folder already has it, the new name is a hard link to that file.
+# Records reference the file by name; it is removed once the last gallery
+# item or memory pointing at it is deleted.
+# blob_lock covers moving a file in together with saving the record that
+# points at it, and checking the references together with removing it, so a
+# file cannot go away between an upload finding it there and linking to it.
+# It is an flock, since workers and the CLI share the folders, and is always
+# taken before shared_lock and db_lock.
+HASH_CHUNK_SIZE = 1024 * 1024
+BLOB_NAME_RE = re.compile(r"[0-9a-f]{64}(\.[\w-]+)?")
+BLOB_REFERENCES = {"uploads": ("gallery", "filename"), "memories": ("memories", "photo")}
+BLOB_LOCK_FILE = "blobs.lock"
+blob_lock = ProcessLock(BLOB_LOCK_FILE)
+
+def blob_name(digest, filename):
+    ext = os.path.splitext(secure_filename(filename))[1].lower()
+    return digest + (".jpg" if ext == ".jpeg" else ext)
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Moves temp_path to folder/name, or drops it when that content is already
+# there. Returns True when a new file was added to the folder.
+def commit_blob(temp_path, folder, name):
+    target = os.path.join(IMAGE_FOLDERS[folder], name)
+    with blob_lock:
+        if os.path.exists(target):
+            os.remove(temp_path)
+            return False
+        for other, path in IMAGE_FOLDERS.items():
+            existing = os.path.join(path, name)
+            if other != folder and os.path.exists(existing):
+                try:
+                    os.link(existing, target)
+                    os.remove(temp_path)
+                    return True
+                except OSError:
+                    break
+        os.replace(temp_path, target)
+        return True
+
+# Streams an uploaded FileStorage to a temporary file in folder, outside
+# blob_lock. Returns (temp path, name) for commit_blob().
+def stage_upload(file, folder):
+    started = time.perf_counter()
+    temp_path = os.path.join(IMAGE_FOLDERS[folder], f".upload-{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as out:
+            for chunk in iter(lambda: file.stream.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                blocking(out.write, chunk)
+                size += len(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    UPLOAD_BYTES.observe(size, folder)
+    UPLOAD_SECONDS.observe(time.perf_counter() - started, folder)
+    return temp_path, blob_name(digest.hexdigest(), file.filename)
+
+class BlobRefs:
+    """Number of records pointing at each file, updated in place by repository writes."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # folder -> {item id: name} and Counter of names
+        self.names = {}
+        self.counts = {}
+        # folder -> data version of its collection the counts reflect
+        self.versions = {}
+
+    def rebuild(self, folder):
+        collection, field = BLOB_REFERENCES[folder]
+        version = data_versions.get(collection, 0)
+        self.names[folder] = {item_id: name for item_id, name in repo.column(collection, field) if name}
+        self.counts[folder] = Counter(self.names[folder].values())
+        self.versions[folder] = version
+
+    def count(self, folder, name):
+        with self.lock:
+            if self.versions.get(folder) != data_versions.get(BLOB_REFERENCES[folder][0], 0):
+                self.rebuild(folder)
+            return self.counts[folder][name]
+
+    # Called by the repositories after a write; item is None once deleted
+    def changed(self, collection, item_id, item):
+        for folder, (referencing, field) in BLOB_REFERENCES.items():
+            if referencing != collection:
+                continue
+            with self.lock:
+                current = data_versions.get(collection, 0)
+                if self.versions.get(folder) != current - 1:
+                    self.versions.pop(folder, None)
+                    continue
+                names, counts = self.names[folder], self.counts[folder]
+                old = names.pop(item_id, None)
+                if old:
+                    counts[old] -= 1
+                    if not counts[old]:
+                        del counts[old]
+                name = item.get(field) if item else None
+                if name:
+                    names[item_id] = name
+                    counts[name] += 1
+                self.versions[folder] = current
+
+blob_references = BlobRefs()
+
+def blob_refs(folder, name):
+    return blob_references.count(folder, name)
+
+# Called after a record stops pointing at name
+def release_blob(folder, name):
+    if not name:
+        return
+    filepath = os.path.join(IMAGE_FOLDERS[folder], name)
+    with blob_lock:
+        # Records other workers saved since this request started count too
+        repo.refresh()
+        if blob_refs(folder, name):
+            return
+        if os.path.exists(filepath):
+            try:
+                os.remove(filepath)
+            except Exception as e:
+                log_event(logging.ERROR, "blob_delete_failed", folder=folder, file=name, error=e)
+    remove_variants(folder, name)
+    if folder == "uploads":
+        remove_puzzles(name)
+
+# ---------- Image Variants ----------
+# Every uploaded image gets downscaled WebP copies (tile, medium, full) under
+# VARIANT_FOLDER/<folder>/<filename>/<variant>-<width>.webp, so list pages can
+# pick a small one through srcset instead of loading the original. They are
+# made in a process pool off the request thread; until they exist the
+# templates fall back to the original file. Pillow is optional.
+try:
+    import thumbnails
+except ImportError:
+    thumbnails = None
+
+VARIANT_FOLDER = "static/variants"
+IMAGE_VARIANTS = (("tile", 400), ("medium", 960), ("full", 1920))
+VARIANT_QUALITY = int(os.environ.get("VARIANT_QUALITY", "80"))
+VARIANT_WORKERS = int(os.environ.get("VARIANT_WORKERS", "2"))
+os.makedirs(VARIANT_FOLDER, exist_ok=True)
+
+variant_pool = None
+variant_pool_lock = threading.Lock()
+# (folder, filename) -> [(variant, width, static path)], only for finished sets
+variant_index = {}
+
+def variant_dir(folder, filename):
+    return os.path.join(VARIANT_FOLDER, folder, filename)
+
+def submit_variants(folder, filename, force=False):
+    return get_variant_pool().submit(
+        thumbnails.generate_variants,
+        os.path.join(IMAGE_FOLDERS[folder], filename),
+        variant_dir(folder, filename),
+        IMAGE_VARIANTS,
+        VARIANT_QUALITY,
+        force
+    )
+
+def get_variant_pool():
+    global variant_pool
+    with variant_pool_lock:
+        if variant_pool is None:
+            # fork, not spawn: a spawned worker would re-import the main module,
+            # and with `python app.py` that reruns the whole startup. The workers
+            # only call into thumbnails, so none of the app's locks matter there.
+            variant_pool = ProcessPoolExecutor(
+                max_workers=VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=init_variant_worker,
+                initargs=(os.getpid(),)
+            )
+        return variant_pool
+
+# A pool process is forked from a web worker and starts out with everything
+# that has: gunicorn's signal handlers, which would have it ignore SIGTERM,
+# and the listening socket, which would keep the port bound. Put the
+# handlers back to default, close the sockets and exit once the web worker
+# is gone, so a killed worker does not leave orphans holding connections.
+def init_variant_worker(parent_pid):
+    for signum in signal.valid_signals():
+        try:
+            if callable(signal.getsignal(signum)):
+                signal.signal(signum, signal.SIG_DFL)
+        except (OSError, ValueError):
+            pass
+    # The pool itself talks over pipes, never sockets
+    fds = os.listdir("/proc/self/fd") if os.path.isdir("/proc/self/fd") else []
+    for fd in (int(name) for name in fds if name.isdigit()):
+        try:
+            sock = socket.socket(fileno=fd)
+        except OSError:
+            continue
+        sock.detach()
+        os.close(fd)
+
+    def watch_parent():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(1)
+
+    threading.Thread(target=watch_parent, name="variant-parent-watch", daemon=True).start()
+
+# A forked web worker cannot use its parent's pool; it makes its own
+def forget_variant_pool():
+    global variant_pool, variant_pool_lock
+    variant_pool = None
+    variant_pool_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=forget_variant_pool)
+
+# With fork, the pool starts all of its processes on the first submit. Doing
+# that before the job threads exist keeps a lock one of them holds (an import
+# in progress, say) from being copied into a worker, where nothing would
+# ever release it.
+def start_variant_pool():
+    if thumbnails is not None:
+        get_variant_pool().submit(os.getpid).result()
+
+# Variants for a new upload are made by a background job (see Background Jobs)
+def queue_variants(folder, filename):
+    if thumbnails is None:
+        return
+    jobs.enqueue("variants", folder=folder, filename=filename)
+
+def remove_variants(folder, filename):
+    variant_index.pop((folder, filename), None)
+    target = variant_dir(folder, filename)
+    if os.path.isdir(target):
+        try:
+            shutil.rmtree(target)
+        except Exception as e:
+            log_event(logging.ERROR, "variants_delete_failed", folder=folder, file=filename, error=e)
+
+def image_variants(folder, filename):
+    key = (folder, filename)
+    if key in variant_index:
+        return variant_index[key]
+    target = variant_dir(folder, filename)
+    if not os.path.isdir(target):
+        return []
+    variants = []
+    for entry in os.scandir(target):
+        name, _, width = entry.name.rsplit(".", 1)[0].partition("-")
+        if width.isdigit():
+            variants.append((name, int(width), f"variants/{folder}/{filename}/{entry.name}"))
+    variants.sort(key=lambda v: v[1])
+    variant_index[key] = variants
+    return variants
+
+# Templates: image_src() gives the named variant (or the next smaller one,
+# or the original) and image_srcset() the candidates for the browser to pick.
+@app.context_processor
+def image_helpers():
+    def image_src(folder, filename, variant="tile"):
+        variants = image_variants(folder, filename)
+        if not variants:
+            return url_for("media", filename=f"{folder}/{filename}")
+        wanted = dict(IMAGE_VARIANTS)[variant]
+        candidates = [v for v in variants if v[1] <= wanted] or variants[:1]
+        return url_for("media", filename=candidates[-1][2])
+
+    def image_srcset(folder, filename):
+        return ", ".join(
+            f"{url_for('media', filename=path)} {width}w"
+            for _, width, path in image_variants(folder, filename)
+        )
+
+    return {"image_src": image_src, "image_srcset": image_srcset}
+
+@atexit.register
+def close_variant_pool(wait=True):
+    if variant_pool is not None:
+        variant_pool.shutdown(wait=wait, cancel_futures=not wait)
+
+# ---------- Background Jobs ----------
+# Work that follows an upload (image variants, dimension probing) runs as a
+# job, so the upload request returns as soon as the file is on disk. Jobs
+# are rows in JOBS_FILE, an SQLite database of its own whatever
+# STORAGE_BACKEND is, so they survive a restart and any worker can run them:
+#   queued -> running -> done
+#                     -> queued again after a backoff, on an error
+#                     -> failed, after JOB_MAX_ATTEMPTS errors
+# Each web process runs JOB_WORKERS threads, started with its first job or
+# request. A job still marked running by a process that is gone, or for
+# longer than JOB_TIMEOUT seconds, is queued again, so handlers must be
+# safe to run twice. Only one queued or running job exists per kind and
+# arguments.
+JOBS_FILE = "jobs.db"
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_TIMEOUT = int(os.environ.get("JOB_TIMEOUT", "600"))
+JOB_POLL_SECONDS = 2.0
+JOB_RETRY_SECONDS = 5
+JOB_MAINTENANCE_SECONDS = 60
+# Finished jobs are kept for a day, failed ones for a week
+JOB_KEEP_SECONDS = {"done": 24 * 3600, "failed": 7 * 24 * 3600}
+JOB_HOST = socket.gethostname()
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+class JobQueue:
+    """Jobs persisted in an SQLite file and run by worker threads in each web process."""
+
+    def __init__(self, path):
+        self.path = path
+        self.forked()
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+                "args TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+                "owner TEXT, run_after REAL NOT NULL, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, run_after)")
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_pending ON jobs (kind, args) "
+                "WHERE status IN ('queued', 'running')"
+            )
+
+    # Threads, locks and connections do not carry over into a forked child;
+    # it starts its own workers when it needs them
+    def forked(self):
+        self.local = thread_local()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        self.threads = []
+        self.stopping = False
+        self.last_maintenance = 0
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def owner(self):
+        return f"{JOB_HOST}:{os.getpid()}"
+
+    def enqueue(self, kind, **args):
+        now = time.time()
+        try:
+            with self.connection() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO jobs (kind, args, status, run_after, created, updated) VALUES (?, ?, 'queued', ?, ?, ?)",
+                    (kind, json.dumps(args, sort_keys=True), now, now, now)
+                )
+        except sqlite3.Error as e:
+            log_event(logging.ERROR, "job_enqueue_failed", kind=kind, error=e, **args)
+            return False
+        with db_lock:
+            bump_version("jobs")
+        self.start()
+        with self.wakeup:
+            self.wakeup.notify()
+        return True
+
+    def start(self):
+        if self.threads or JOB_WORKERS <= 0:
+            return
+        with self.lock:
+            if self.threads:
+                return
+            self.recover(starting=True)
+            start_variant_pool()
+            self.threads = [threading.Thread(target=self.work, name=f"job-worker-{i}", daemon=True) for i in range(JOB_WORKERS)]
+            for thread in self.threads:
+                thread.start()
+
+    def stop(self, timeout=5):
+        self.stopping = True
+        with self.wakeup:
+            self.wakeup.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+    # Our own pid only owns running jobs once this process has started its
+    # workers; before that they were left by an earlier process with that pid
+    @staticmethod
+    def owner_alive(owner, starting=False):
+        host, _, pid = (owner or "").rpartition(":")
+        if host != JOB_HOST:
+            # Another machine sharing the file; JOB_TIMEOUT covers it
+            return True
+        if not pid.isdigit():
+            return False
+        if int(pid) == os.getpid():
+            return not starting
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    # Queues running jobs whose worker is gone again and drops old finished ones
+    def recover(self, starting=False):
+        now = time.time()
+        conn = self.connection()
+        try:
+            rows = conn.execute("SELECT id, owner, updated FROM jobs WHERE status = 'running'").fetchall()
+            stale = [row["id"] for row in rows if row["updated"] < now - JOB_TIMEOUT or not self.owner_alive(row["owner"], starting)]
+            with conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = 'queued', owner = NULL, run_after = ?, updated = ? WHERE id = ? AND status = 'running'",
+                    [(now, now, job_id) for job_id in stale]
+                )
+                for status, keep in JOB_KEEP_SECONDS.items():
+                    conn.execute("DELETE FROM jobs WHERE status = ? AND updated < ?", (status, now - keep))
+        except sqlite3.Error as e:
+            log_event(logging.ERROR, "jobs_recover_failed", error=e)
+            return
+        if stale:
+            log_event(logging.WARNING, "jobs_requeued", count=len(stale))
+
+    def claim(self):
+        now = time.time()
+        with self.connection() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, updated = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY id LIMIT 1) "
+                "RETURNING id, kind, args, attempts",
+                (self.owner(), now, now)
+            ).fetchone()
+
+    def finish(self, job, error=None):
+        now = time.time()
+        run_after = now
+        if error is None:
+            status = "done"
+        elif job["attempts"] < JOB_MAX_ATTEMPTS:
+            status = "queued"
+            run_after = now + JOB_RETRY_SECONDS * 2 ** (job["attempts"] - 1)
+        else:
+            status = "failed"
+        with self.connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, run_after = ?, updated = ? WHERE id = ?",
+                (status, None if error is None else f"{type(error).__name__}: {error}", run_after, now, job["id"])
+            )
+        return status
+
+    def run(self, job):
+        args = json.loads(job["args"])
+        handler = JOB_HANDLERS.get(job["kind"])
+        started = time.perf_counter()
+        error = None
+        try:
+            if handler is None:
+                raise LookupError(f"no handler for {job['kind']} jobs")
+            handler(**args)
+        except Exception as e:
+            error = e
+        seconds = time.perf_counter() - started
+        try:
+            status = self.finish(job, error)
+        except sqlite3.Error as e:
+            # Left running; recover() queues it again
+            log_event(logging.ERROR, "job_finish_failed", id=job["id"], kind=job["kind"], error=e)
+            return
+        JOB_SECONDS.observe(seconds, job["kind"])
+        JOBS.inc(1, job["kind"], status)
+        log_event(
+            logging.INFO if error is None else logging.ERROR if status == "failed" else logging.WARNING,
+            "job_" + status, id=job["id"], kind=job["kind"], attempt=job["attempts"],
+            duration_ms=round(seconds * 1000, 1), error=error, **args
+        )
+        with db_lock:
+            bump_version("jobs")
+
+    def work(self):
+        while not self.stopping:
+            try:
+                job = self.claim()
+            except sqlite3.Error as e:
+                log_event(logging.ERROR, "job_claim_failed", error=e)
+                job = None
+            if job is not None:
+                self.run(job)
+                continue
+            if time.monotonic() - self.last_maintenance > JOB_MAINTENANCE_SECONDS and self.lock.acquire(blocking=False):
+                try:
+                    self.last_maintenance = time.monotonic()
+                    self.recover()
+                finally:
+                    self.lock.release()
+            with self.wakeup:
+                if not self.stopping:
+                    self.wakeup.wait(JOB_POLL_SECONDS)
+
+    # Counts by status and the queued or running jobs, oldest first
+    def status(self, limit=100):
+        conn = self.connection()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        pending = [
+            dict(json.loads(row["args"]), id=row["id"], kind=row["kind"], status=row["status"], attempts=row["attempts"])
+            for row in conn.execute(
+                "SELECT id, kind, args, status, attempts FROM jobs WHERE status IN ('queued', 'running') ORDER BY id LIMIT ?",
+                (limit,)
+            )
+        ]
+        return {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")}, pending
+
+    # Names of the files in folder that still have jobs waiting
+    def pending_files(self, folder):
+        files = set()
+        for row in self.connection().execute("SELECT args FROM jobs WHERE status IN ('queued', 'running')"):
+            args = json.loads(row["args"])
+            if args.get("folder", "uploads") == folder and "filename" in args:
+                files.add(args["filename"])
+        return files
+
+    # Jobs finished by other workers change what the gallery shows
+    def refresh(self):
+        if not MULTI_WORKER:
+            return
+        version = self.connection().execute("PRAGMA data_version").fetchone()[0]
+        if getattr(self.local, "data_version", version) != version:
+            bump_version("jobs")
+        self.local.data_version = version
+
+    def retry_failed(self):
+        now = time.time()
+        with self.connection() as conn:
+            return conn.execute(
+                "UPDATE OR IGNORE jobs SET status = 'queued', attempts = 0, error = NULL, run_after = ?, updated = ? WHERE status = 'failed'",
+                (now, now)
+            ).rowcount
+
+jobs = JobQueue(JOBS_FILE)
+os.register_at_fork(after_in_child=jobs.forked)
+
+@atexit.register
+def stop_jobs():
+    jobs.stop()
+
+@job_handler("variants")
+def variants_job(folder, filename):
+    filepath = os.path.join(IMAGE_FOLDERS[folder], filename)
+    if thumbnails is None or not os.path.exists(filepath):
+        return
+    submit_variants(folder, filename).result()
+    if not os.path.exists(filepath):
+        # Deleted while the variants were being made
+        remove_variants(folder, filename)
+        return
+    # Pages rendered before the variants existed point at the original
+    with db_lock:
+        bump_version("variants")
+
+# Width and height as displayed, i.e. after the EXIF orientation is applied
+@job_handler("probe")
+def probe_job(filename):
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    if thumbnails is None or not os.path.exists(filepath):
+        return
+    width, height = thumbnails.image_size(filepath)
+    for item in repo.find("gallery", "filename", filename):
+        repo.update("gallery", item["id"], {"width": width, "height": height})
+
+# Files in folder with jobs waiting, looked up once per request
+def files_processing(folder):
+    if "pending_files" not in g:
+        g.pending_files = {}
+    if folder not in g.pending_files:
+        try:
+            g.pending_files[folder] = jobs.pending_files(folder)
+        except sqlite3.Error as e:
+            log_event(logging.ERROR, "job_status_failed", error=e)
+            g.pending_files[folder] = set()
+    return g.pending_files[folder]
+
+# Templates: is_processing() tells whether a file still has jobs waiting
+@app.context_processor
+def job_helpers():
+    def is_processing(folder, filename):
+        return filename in files_processing(folder)
+
+    return {"is_processing": is_processing}
+
+@app.before_request
+def start_jobs():
+    jobs.refresh()
+    jobs.start()
+
+@app.cli.command("jobs")
+@click.option("--retry-failed", is_flag=True, help="Queue failed jobs again.")
+def jobs_command(retry_failed):
+    """Show the background job counts, or queue failed jobs again."""
+    if retry_failed:
+        click.echo(f"Queued {jobs.retry_failed()} failed jobs again.")
+    counts, pending = jobs.status()
+    click.echo(" ".join(f"{status}={count}" for status, count in counts.items()))
+    for job in pending:
+        click.echo(json.dumps(job, sort_keys=True))
+
+# ---------- Static Files ----------
+# Uploads, memory photos, their variants and jigsaw puzzles live under
+# static/ too, but they are media: only logged-in users get them, through
+# /media (see Media Routes), and /static answers 404 for them.
+# Other static files get ?v=<content hash> appended by url_for(); a request
+# carrying the current hash is cached for a year as immutable, anything else
+# has to revalidate. All responses carry an ETag and answer conditional GETs with 304.
+# Text assets are served from the .br/.gz copies made by `flask build-assets`
+# when the client accepts them.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MEDIA_PREFIXES = ("uploads/", "memories/", "variants/", "puzzles/")
+COMPRESSIBLE_TYPES = (".css", ".js", ".svg", ".json", ".txt", ".html")
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+CACHE_MAX_AGE = 365 * 24 * 3600
+# filename -> (mtime_ns, content hash)
+asset_fingerprints = {}
+
+def asset_fingerprint(filename):
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = asset_fingerprints.get(filename)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, hash_file(path)[:12])
+        asset_fingerprints[filename] = cached
+    return cached[1]
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    if endpoint == "static" and "v" not in values:
+        filename = values.get("filename", "")
+        if not filename.startswith(MEDIA_PREFIXES):
+            version = asset_fingerprint(filename)
+            if version:
+                values["v"] = version
+
+# The .br/.gz copy of filename the client accepts, if it is not older than the file
+def precompressed_copy(filename):
+    if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_TYPES:
+        return None, None
+    source = safe_join(app.static_folder, filename)
+    if source is None or not os.path.isfile(source):
+        return None, None
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if not request.accept_encodings[encoding]:
+            continue
+        try:
+            if os.stat(source + suffix).st_mtime_ns >= os.stat(source).st_mtime_ns:
+                return encoding, filename + suffix
+        except OSError:
+            continue
+    return None, None
+
+def cache_forever(response, public):
+    response.cache_control.no_cache = None
+    response.cache_control.max_age = CACHE_MAX_AGE
+    response.cache_control.immutable = True
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.public = False
+        response.cache_control.private = True
+    response.expires = None
+
+def serve_static(filename):
+    if filename.startswith(MEDIA_PREFIXES):
+        raise NotFound()
+    encoding, compressed = precompressed_copy(filename)
+    response = send_from_directory(
+        app.static_folder,
+        compressed or filename,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=0,
+    )
+    if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_TYPES:
+        response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if request.args.get("v") == asset_fingerprint(filename):
+        cache_forever(response, public=True)
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+app.view_functions["static"] = serve_static
+
+# Page styles and scripts live in static/css and static/js, not inline in the
+# templates. `flask build-assets` concatenates each bundle's sources into
+# static/dist/<bundle>, minified, and precompresses it; asset_tags() uses the
+# built file while it is up to date and the sources otherwise.
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+ASSET_PAGES = ("base", "login", "dashboard", "gallery", "memories", "notes", "ideas", "image_view", "music", "edit_music", "search")
+ASSET_BUNDLES = {f"{page}.{kind}": [f"{kind}/{page}.{kind}"] for page in ASSET_PAGES for kind in ("css", "js")}
+ASSET_DIST_FOLDER = "dist"
+
+def bundle_is_built(bundle):
+    try:
+        built = os.stat(os.path.join(app.static_folder, ASSET_DIST_FOLDER, bundle)).st_mtime_ns
+        return all(built >= os.stat(os.path.join(app.static_folder, source)).st_mtime_ns for source in ASSET_BUNDLES[bundle])
+    except OSError:
+        return False
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    return re.sub(r"\s*([{};,])\s*", r"\1", text).strip()
+
+def minify_js(text):
+    # Without rjsmin the script is only concatenated; a regex cannot safely minify JS
+    return rjsmin.jsmin(text) if rjsmin is not None else text
+
+@app.context_processor
+def asset_helpers():
+    def asset_tags(bundle):
+        if bundle_is_built(bundle):
+            urls = [url_for("static", filename=f"{ASSET_DIST_FOLDER}/{bundle}")]
+        else:
+            urls = [url_for("static", filename=source) for source in ASSET_BUNDLES[bundle]]
+        tag = '<link rel="stylesheet" href="{}">' if bundle.endswith(".css") else '<script src="{}"></script>'
+        return Markup("\n".join(tag.format(escape(url)) for url in urls))
+
+    return {"asset_tags": asset_tags}
+
+# ---------- Media Manifest ----------
+# The gallery collection doubles as the manifest of UPLOAD_FOLDER: one record
+# per file with its size, mtime, hash and dimensions next to the note, loaded
+# with the rest of the data at startup. reconcile_gallery() only picks up files
+# added, removed or replaced behind the app's back. When the folder's own
+# mtime still equals the saved watermark nothing changed and one stat is all
+# it costs; otherwise a single scandir pass diffs names against the manifest
+# and only re-reads files modified after the watermark.
+GALLERY_WATERMARK_KEY = "gallery_watermark"
+
+# probe=False leaves width and height for a probe job
+def gallery_record(filename, stat=None, digest=None, probe=True):
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    stat = stat or os.stat(filepath)
+    width = height = None
+    if probe and thumbnails is not None:
+        try:
+            width, height = thumbnails.image_size(filepath)
+        except Exception as e:
+            log_event(logging.WARNING, "image_size_failed", file=filename, error=e)
+    return {
+        "filename": filename,
+        "uploaded_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        "note": "",
+        "hash": digest or hash_file(filepath),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "width": width,
+        "height": height,
+    }
+
+def reconcile_gallery():
+    try:
+        folder_mtime = os.stat(UPLOAD_FOLDER).st_mtime_ns
+    except OSError as e:
+        log_event(logging.ERROR, "gallery_scan_failed", folder=UPLOAD_FOLDER, error=e)
+        return
+    watermark = repo.get_meta(GALLERY_WATERMARK_KEY, 0)
+    if folder_mtime == watermark:
+        return
+    known = {}
+    for item in repo.all("gallery"):
+        # Duplicate records for one file (from before uploads were deduplicated)
+        if item["filename"] in known:
+            repo.delete("gallery", item["id"])
+        else:
+            known[item["filename"]] = item
+    added = updated = 0
+    for entry in sorted(os.scandir(UPLOAD_FOLDER), key=lambda e: e.stat().st_mtime_ns):
+        if not entry.is_file() or entry.name.startswith("."):
+            continue
+        item = known.pop(entry.name, None)
+        stat = entry.stat()
+        if item is None:
+            repo.insert("gallery", gallery_record(entry.name, stat))
+            added += 1
+        elif not item.get("hash") or (
+            stat.st_mtime_ns > watermark and (stat.st_size, stat.st_mtime_ns) != (item.get("size"), item.get("mtime"))
+        ):
+            fields = gallery_record(entry.name, stat)
+            repo.update("gallery", item["id"], {k: v for k, v in fields.items() if k not in ("uploaded_at", "note")})
+            updated += 1
+    for item in known.values():
+        repo.delete("gallery", item["id"])
+    repo.set_meta(GALLERY_WATERMARK_KEY, folder_mtime)
+    log_event(logging.INFO, "gallery_reconciled", folder=UPLOAD_FOLDER, added=added, updated=updated, removed=len(known))
+
+# Music data handling
+# The parsed, sanitized music list is kept in memory as an {id: item} dict
+# together with the (mtime, size) of MUSIC_FILE it came from; MUSIC_FILE is only
+# re-read when that changes, e.g. after an edit by hand. music_version counts
+# changes made in memory and music_saved_version the ones that reached the file.
+music_lock = threading.RLock()
+music_items = None
+music_cache_key = None
+music_version = 0
+music_saved_version = 0
+
+def music_file_key():
+    try:
+        stat = os.stat(MUSIC_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Returns the shared {id: item} dict; change it only under music_lock and follow with save_music()
+def load_music():
+    global music_items, music_cache_key
+    with music_lock:
+        unsaved = music_version != music_saved_version
+        if music_items is not None and (unsaved or music_file_key() == music_cache_key):
+            return music_items
+        key = music_file_key()
+        items = read_music_file()
+        next_id = max((i["id"] for i in items if isinstance(i.get("id"), int)), default=0) + 1
+        for item in items:
+            if not isinstance(item.get("id"), int):
+                item["id"] = next_id
+                next_id += 1
+        music_items, music_cache_key = {item["id"]: item for item in items}, key
+        bump_version("music")
+        return music_items
+
+def read_music_file():
+    if os.path.exists(MUSIC_FILE):
+        try:
+            with open(MUSIC_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                if not isinstance(data, list):
+                    log_event(logging.ERROR, "music_invalid_format", file=MUSIC_FILE, expected="list")
+                    return []
+                sanitized_data = []
+                for item in data:
+                    if not isinstance(item, dict):
+                        log_event(logging.WARNING, "music_invalid_item", file=MUSIC_FILE, item=item)
+                        continue
+                    item.setdefault("song", "")
+                    item.setdefault("artist", "")
+                    item.setdefault("url", None)
+                    item.setdefault("thumbnail", None)
+                    item.setdefault("placement", "General")
+                    sanitized_data.append(item)
+                log_event(logging.INFO, "music_loaded", file=MUSIC_FILE, items=len(sanitized_data))
+                return sanitized_data
+        except json.JSONDecodeError as e:
+            log_event(logging.ERROR, "music_decode_failed", file=MUSIC_FILE, error=e)
+            return []
+        except Exception as e:
+            log_event(logging.ERROR, "music_load_failed", file=MUSIC_FILE, error=e)
+            return []
+    log_event(logging.INFO, "music_missing", file=MUSIC_FILE)
+    return []
+
+def flush_music():
+    global music_saved_version, music_cache_key
+    with music_lock:
+        version = music_version
+        items = list(music_items.values())
+        payload = json.dumps(items, indent=4, ensure_ascii=False)
+    write_file_atomic(MUSIC_FILE, payload)
+    with music_lock:
+        music_saved_version = max(music_saved_version, version)
+        if music_saved_version == music_version:
+            music_cache_key = music_file_key()
+    log_event(logging.DEBUG, "music_saved", file=MUSIC_FILE, items=len(items))
+
+music_flusher = WriteBehindFlusher("music", flush_music, WRITE_BEHIND_MAX_DELAY)
+
+# Call after changing the dict returned by load_music()
+def save_music(durable=False):
+    global music_version
+    with music_lock:
+        music_version += 1
+        bump_version("music")
+    if music_flusher.save(durable):
+        return True
+    flash("Failed to save music database. Please try again.", "error")
+    return False
+
+# ---------- Search Index ----------
+# In-memory inverted index over the searchable fields, term -> {(collection,
+# id): term frequency}, with a sorted term list for prefix lookups. Repository
+# writes made by this process update it in place; a collection whose data
+# version moved for any other reason (another worker, a reload of music.json)
+# is re-indexed on the next search. Every query word must match a whole word
+# or the start of one; results are ranked with BM25.
+SEARCH_FIELDS = {
+    "ideas": ("text",),
+    "memories": ("text", "category"),
+    "notes": ("text",),
+    "gallery": ("note",),
+    "music": ("song", "artist", "placement"),
+}
+SEARCH_PREFIX_TERMS = 50
+SEARCH_LIMIT = 50
+BM25_K1 = 1.2
+BM25_B = 0.75
+PREFIX_WEIGHT = 0.5
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text):
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return TOKEN_RE.findall("".join(ch for ch in text if not unicodedata.combining(ch)))
+
+class SearchIndex:
+    """Inverted index over SEARCH_FIELDS with prefix matching and BM25 ranking."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = {}
+        self.terms = []
+        # (collection, id) -> (term counts, document length)
+        self.docs = {}
+        self.keys = {collection: set() for collection in SEARCH_FIELDS}
+        self.total_length = 0
+        # collection -> data version the index reflects
+        self.versions = {}
+
+    def add(self, collection, item):
+        key = (collection, item["id"])
+        words = [w for field in SEARCH_FIELDS[collection] if item.get(field) for w in tokenize(item[field])]
+        counts = Counter(words)
+        for term, tf in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.terms, term)
+            postings[key] = tf
+        self.docs[key] = (counts, len(words))
+        self.keys[collection].add(key)
+        self.total_length += len(words)
+
+    def remove(self, key):
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        self.keys[key[0]].discard(key)
+        self.total_length -= doc[1]
+        for term in doc[0]:
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+
+    def rebuild(self, collection):
+        version = data_versions.get(collection, 0)
+        items = repo.all(collection)
+        for key in list(self.keys[collection]):
+            self.remove(key)
+        for item in items:
+            self.add(collection, item)
+        self.versions[collection] = version
+
+    # Called by the repositories after a write; item is None once deleted
+    def changed(self, collection, item_id, item):
+        if collection not in SEARCH_FIELDS:
+            return
+        with self.lock:
+            current = data_versions.get(collection, 0)
+            if self.versions.get(collection) != current - 1:
+                # Not built yet, or something else changed too
+                self.versions.pop(collection, None)
+                return
+            self.remove((collection, item_id))
+            if item is not None:
+                self.add(collection, item)
+            self.versions[collection] = current
+
+    # Index terms matching word: (term, weight), the whole word first
+    def expand(self, word):
+        matches = []
+        i = bisect.bisect_left(self.terms, word)
+        while i < len(self.terms) and len(matches) < SEARCH_PREFIX_TERMS and self.terms[i].startswith(word):
+            matches.append((self.terms[i], 1.0 if self.terms[i] == word else PREFIX_WEIGHT))
+            i += 1
+        return matches
+
+    def score(self, key, expansions, avg_length):
+        best = 0.0
+        length = self.docs[key][1]
+        for term, weight in expansions:
+            postings = self.postings[term]
+            tf = postings.get(key)
+            if tf:
+                idf = math.log(1 + (len(self.docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+                best = max(best, weight * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)))
+        return best
+
+    # [(collection, id, score)], best first
+    def search(self, query, limit=SEARCH_LIMIT):
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        with self.lock:
+            for collection in SEARCH_FIELDS:
+                if self.versions.get(collection) != data_versions.get(collection, 0):
+                    self.rebuild(collection)
+            if not self.docs:
+                return []
+            avg_length = max(self.total_length / len(self.docs), 1)
+            expanded = [self.expand(word) for word in words]
+            if not all(expanded):
+                return []
+            # Start from the word with the fewest matching documents and only
+            # look the remaining words up for those candidates
+            expanded.sort(key=lambda exps: sum(len(self.postings[term]) for term, _ in exps))
+            candidates = {key for term, _ in expanded[0] for key in self.postings[term]}
+            scores = {}
+            for key in candidates:
+                total = 0.0
+                for expansions in expanded:
+                    s = self.score(key, expansions, avg_length)
+                    if not s:
+                        break
+                    total += s
+                else:
+                    scores[key] = total
+            top = heapq.nlargest(limit, scores.items(), key=lambda entry: entry[1])
+        return [(collection, item_id, score) for (collection, item_id), score in top]
+
+search_index = SearchIndex()
+
+# ---------- Music Groups ----------
+# The music page lists songs by placement. MusicGroups keeps placement ->
+# song ids (oldest first) and id -> placement current as songs are added,
+# edited and removed, so the page only fetches the songs it shows. As with
+# the search index, a change it was not told about (another worker, a
+# reload of music.json) makes it stale, and it is rebuilt from the
+# placement column on the next read. Pages are PAGE_SIZE songs long.
+
+class MusicGroups:
+    """Placement -> song ids, updated in place by repository writes."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.groups = {}
+        self.placements = {}
+        # Data version of "music" the groups reflect
+        self.version = None
+
+    def add(self, item_id, placement):
+        placement = placement or "General"
+        ids = self.groups.setdefault(placement, [])
+        if not ids or ids[-1] < item_id:
+            ids.append(item_id)
+        else:
+            bisect.insort(ids, item_id)
+        self.placements[item_id] = placement
+
+    def remove(self, item_id):
+        placement = self.placements.pop(item_id, None)
+        if placement is None:
+            return
+        ids = self.groups[placement]
+        del ids[bisect.bisect_left(ids, item_id)]
+        if not ids:
+            del self.groups[placement]
+
+    def rebuild(self):
+        version = data_versions.get("music", 0)
+        self.groups, self.placements = {}, {}
+        for item_id, placement in repo.column("music", "placement"):
+            self.add(item_id, placement)
+        self.version = version
+
+    def current(self):
+        if self.version != data_versions.get("music", 0):
+            self.rebuild()
+
+    # Called by the repositories after a write; item is None once deleted
+    def changed(self, collection, item_id, item):
+        if collection != "music":
+            return
+        with self.lock:
+            current = data_versions.get("music", 0)
+            if self.version != current - 1:
+                self.version = None
+                return
+            self.remove(item_id)
+            if item is not None:
+                self.add(item_id, item.get("placement"))
+            self.version = current
+
+    # [(placement, first page of ids, number of songs)], placements in the
+    # order their oldest song was added
+    def overview(self, limit=None):
+        limit = limit or PAGE_SIZE
+        with self.lock:
+            self.current()
+            groups = sorted(self.groups.items(), key=lambda group: group[1][0])
+            return [(placement, ids[:limit], len(ids)) for placement, ids in groups]
+
+    # Up to limit ids of a placement after the song with id `after`, plus
+    # the cursor for the next page or None
+    def page(self, placement, after=None, limit=None):
+        limit = limit or PAGE_SIZE
+        with self.lock:
+            self.current()
+            ids = self.groups.get(placement, [])
+            start = 0 if after is None else bisect.bisect_right(ids, after)
+            page_ids = ids[start:start + limit]
+            more = start + limit < len(ids)
+        return page_ids, (page_ids[-1] if more and page_ids else None)
+
+    def count(self, placement):
+        with self.lock:
+            self.current()
+            return len(self.groups.get(placement, ()))
+
+    def placement(self, item_id):
+        with self.lock:
+            self.current()
+            return self.placements.get(item_id)
+
+music_groups = MusicGroups()
+
+# Keeps the in-memory indexes in step with a repository write
+def record_changed(collection, item_id, item):
+    search_index.changed(collection, item_id, item)
+    music_groups.changed(collection, item_id, item)
+    blob_references.changed(collection, item_id, item)
+
+# ---------- Storage Backends ----------
+# Routes only talk to `repo`. STORAGE_BACKEND=json (default) keeps the data in
+# DB_FILE/JOURNAL_FILE and MUSIC_FILE; STORAGE_BACKEND=sqlite keeps every
+# collection in its own indexed table in SQLITE_FILE. Run
+# `flask --app app migrate-to-sqlite` once to copy the JSON data over.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+SQLITE_FILE = os.environ.get("SQLITE_FILE", "data.sqlite3")
+
+# Columns per collection; records are plain dicts with these keys
+COLLECTION_FIELDS = {
+    "ideas": ("text", "status", "timestamp"),
+    "memories": ("text", "category", "timestamp", "photo"),
+    "notes": ("text", "timestamp"),
+    "gallery": ("filename", "uploaded_at", "note", "hash", "size", "mtime", "width", "height"),
+    "music": ("song", "artist", "url", "thumbnail", "placement"),
+}
+# SQLite column types; every other field is TEXT
+COLUMN_TYPES = {"size": "INTEGER", "mtime": "INTEGER", "width": "INTEGER", "height": "INTEGER"}
+# Music is listed oldest first; every other collection newest first
+APPEND_COLLECTIONS = {"music"}
+
+# Records per page on the list pages and the /api/<collection> endpoint
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 24))
+MAX_PAGE_SIZE = 100
+
+def report_storage_error(e):
+    log_event(logging.ERROR, "storage_error", error=e)
+    if has_request_context():
+        flash("Failed to save database. Please try again.", "error")
+
+class JsonRepository:
+    """Collections kept in memory and persisted to the JSON files."""
+
+    def __init__(self):
+        # collection -> (data version, value), recomputed after a change
+        self.id_lists = {}
+        self.text_lengths = {}
+
+    def store(self, collection):
+        return load_music() if collection == "music" else db[collection]
+
+    def lock(self, collection):
+        return music_lock if collection == "music" else db_lock
+
+    def save(self, collection, durable):
+        return save_music(durable) if collection == "music" else save_db(durable)
+
+    def all(self, collection):
+        if collection == "users":
+            return db["users"]
+        items = list(self.store(collection).values())
+        return items if collection in APPEND_COLLECTIONS else items[::-1]
+
+    def get(self, collection, item_id):
+        return self.store(collection).get(item_id)
+
+    def count(self, collection):
+        return len(self.store(collection))
+
+    def find(self, collection, field, value):
+        with self.lock(collection):
+            items = [item for item in self.store(collection).values() if item.get(field) == value]
+        return items if collection in APPEND_COLLECTIONS else items[::-1]
+
+    # (id, value of field) for every record, ascending ids
+    def column(self, collection, field):
+        with self.lock(collection):
+            return sorted((item_id, item.get(field)) for item_id, item in self.store(collection).items())
+
+    # The records with these ids, in the same order; the stored dicts, not copies
+    def get_many(self, collection, ids):
+        store = self.store(collection)
+        return [store[item_id] for item_id in ids if item_id in store]
+
+    # Ascending ids, shared by every reader until the collection changes again
+    def ids(self, collection):
+        with self.lock(collection):
+            store = self.store(collection)
+            version = data_versions.get(collection, 0)
+            cached = self.id_lists.get(collection)
+            if cached is None or cached[0] != version:
+                cached = (version, list(store))
+                self.id_lists[collection] = cached
+            return cached[1]
+
+    # Id of the record at a position in display order
+    def id_at(self, collection, idx):
+        ids = self.ids(collection)
+        if not 0 <= idx < len(ids):
+            return None
+        return ids[idx] if collection in APPEND_COLLECTIONS else ids[-1 - idx]
+
+    # Position of a record in display order
+    def position(self, collection, item_id):
+        ids = self.ids(collection)
+        i = bisect.bisect_left(ids, item_id)
+        if i == len(ids) or ids[i] != item_id:
+            return None
+        return i if collection in APPEND_COLLECTIONS else len(ids) - 1 - i
+
+    # Ids of the records shown before and after item_id, or None at either end
+    def neighbors(self, collection, item_id):
+        ids = self.ids(collection)
+        i = bisect.bisect_left(ids, item_id)
+        lower = ids[i - 1] if i > 0 else None
+        higher = ids[i + 1] if i + 1 < len(ids) else None
+        return (lower, higher) if collection in APPEND_COLLECTIONS else (higher, lower)
+
+    # Up to limit records in display order after the record with id `after`
+    # (from the start when None), plus the cursor for the next page or None
+    def page(self, collection, after=None, limit=PAGE_SIZE):
+        ids = self.ids(collection)
+        store = self.store(collection)
+        if collection in APPEND_COLLECTIONS:
+            start = 0 if after is None else bisect.bisect_right(ids, after)
+            page_ids = ids[start:start + limit]
+            more = start + limit < len(ids)
+        else:
+            end = len(ids) if after is None else bisect.bisect_left(ids, after)
+            page_ids = ids[max(0, end - limit):end][::-1]
+            more = end - limit > 0
+        items = [store[item_id] for item_id in page_ids]
+        return items, (page_ids[-1] if more and page_ids else None)
+
+    def text_length(self, collection):
+        with self.lock(collection):
+            version = data_versions.get(collection, 0)
+            cached = self.text_lengths.get(collection)
+            if cached is None or cached[0] != version:
+                cached = (version, sum(len(item.get("text") or "") for item in self.store(collection).values()))
+                self.text_lengths[collection] = cached
+            return cached[1]
+
+    # Multi-worker mode: make the change on top of what other workers wrote and
+    # have it on disk before they can write again (write-behind is off there)
+    @contextmanager
+    def writing(self):
+        if not MULTI_WORKER:
+            yield
+            return
+        with shared_lock:
+            refresh_db()
+            yield
+
+    def refresh(self):
+        if MULTI_WORKER:
+            refresh_db()
+        else:
+            reload_if_restored()
+
+    def insert(self, collection, item, durable=False):
+        with self.writing():
+            if collection == "music":
+                with music_lock:
+                    store = load_music()
+                    item = dict(item, id=max(store, default=0) + 1)
+                    store[item["id"]] = item
+            else:
+                item = {"id": db_insert(collection, item)}
+            saved = self.save(collection, durable)
+            record_changed(collection, item["id"], self.get(collection, item["id"]))
+            return item["id"] if saved else None
+
+    # Several records with a single save
+    def insert_many(self, collection, items, durable=False):
+        with self.writing():
+            if collection == "music":
+                with music_lock:
+                    store = load_music()
+                    ids = []
+                    for item in items:
+                        item = dict(item, id=max(store, default=0) + 1)
+                        store[item["id"]] = item
+                        ids.append(item["id"])
+            else:
+                ids = [db_insert(collection, item) for item in items]
+            saved = self.save(collection, durable)
+            for item_id in ids:
+                record_changed(collection, item_id, self.get(collection, item_id))
+            return ids if saved else None
+
+    def update(self, collection, item_id, fields, durable=False):
+        with self.writing():
+            if collection == "music":
+                with music_lock:
+                    store = load_music()
+                    store[item_id] = dict(store[item_id], **fields)
+            else:
+                db_update(collection, item_id, **fields)
+            saved = self.save(collection, durable)
+            record_changed(collection, item_id, self.get(collection, item_id))
+            return saved
+
+    def replace(self, collection, item_id, item, durable=False):
+        with self.writing():
+            if collection == "music":
+                with music_lock:
+                    load_music()[item_id] = dict(item, id=item_id)
+            else:
+                db_replace(collection, item_id, item)
+            saved = self.save(collection, durable)
+            record_changed(collection, item_id, self.get(collection, item_id))
+            return saved
+
+    def delete(self, collection, item_id, durable=False):
+        with self.writing():
+            if collection == "music":
+                with music_lock:
+                    load_music().pop(item_id)
+            else:
+                db_delete(collection, item_id)
+            saved = self.save(collection, durable)
+            record_changed(collection, item_id, None)
+            return saved
+
+    # Replace a whole collection; records get fresh ids in oldest-first order
+    def reset(self, collection, items):
+        with db_lock:
+            next_id = db["_next_ids"].get(collection, 1)
+            items = [{k: v for k, v in item.items() if k != "id"} for item in items]
+            db[collection], db["_next_ids"][collection] = index_records(items, next_id)
+            bump_version(collection)
+
+    # Replace the users and whole collections at once, records oldest first
+    # with their ids kept; db goes out as a fresh DB_FILE. Under shared_lock in
+    # either mode, like restore_snapshot(): a running single worker reloads
+    # from the RESTORED_FILE marker instead of writing over it.
+    def restore(self, records):
+        global music_items
+        with shared_lock, self.writing():
+            # What the running worker saved since this process loaded db
+            if JOURNAL_ENABLED and not MULTI_WORKER:
+                refresh_db()
+            with db_lock:
+                for collection, items in records.items():
+                    if collection == "users":
+                        db["users"] = list(items)
+                    elif collection != "music":
+                        db[collection] = {item["id"]: item for item in items}
+                        db["_next_ids"][collection] = max(db["_next_ids"].get(collection, 1), max(db[collection], default=0) + 1)
+                    bump_version(collection)
+            try:
+                replace_db_file()
+                mark_restored(collections=sorted(records))
+            except OSError as e:
+                report_storage_error(e)
+                return False
+            if "music" not in records:
+                return True
+            with music_lock:
+                music_items = {item["id"]: item for item in records["music"]}
+            return save_music(durable=True)
+
+    def get_meta(self, key, default=None):
+        return db.get("_meta", {}).get(key, default)
+
+    def set_meta(self, key, value, durable=False):
+        with self.writing():
+            db_set_meta(key, value)
+            return save_db(durable)
+
+    def sync(self):
+        return save_db(durable=True) and music_flusher.flush()
+
+    def close(self):
+        db_flusher.flush()
+        music_flusher.flush()
+
+class SqliteRepository:
+    """One indexed table per collection in an SQLite database in WAL mode."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = thread_local()
+        conn = self.connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT NOT NULL, role TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for collection, fields in COLLECTION_FIELDS.items():
+                columns = ", ".join(f"{field} {COLUMN_TYPES.get(field, 'TEXT')}" for field in fields)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {collection} (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+                # Add fields introduced after the table was created
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({collection})")}
+                for field in fields:
+                    if field not in existing:
+                        conn.execute(f"ALTER TABLE {collection} ADD COLUMN {field} {COLUMN_TYPES.get(field, 'TEXT')}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_timestamp ON memories (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_timestamp ON notes (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_gallery_filename ON gallery (filename)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_photo ON memories (photo)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_music_placement ON music (placement)")
+
+    # One connection per thread; sqlite3 connections must not be shared
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def order(self, collection):
+        return "ASC" if collection in APPEND_COLLECTIONS else "DESC"
+
+    def row_to_item(self, collection, row):
+        item = {field: row[field] for field in COLLECTION_FIELDS[collection]}
+        item["id"] = row["id"]
+        return item
+
+    def write(self, sql, params=(), durable=False):
+        conn = self.connection()
+        started = time.perf_counter()
+        try:
+            if durable:
+                conn.execute("PRAGMA synchronous=FULL")
+            with conn:
+                return conn.execute(sql, params)
+        except sqlite3.Error as e:
+            report_storage_error(e)
+            return None
+        finally:
+            if durable:
+                conn.execute("PRAGMA synchronous=NORMAL")
+            STORAGE_WRITE_SECONDS.observe(time.perf_counter() - started, "sqlite")
+
+    def all(self, collection):
+        if collection == "users":
+            return [dict(row) for row in self.connection().execute("SELECT username, password, role FROM users")]
+        rows = self.connection().execute(f"SELECT * FROM {collection} ORDER BY id {self.order(collection)}")
+        return [self.row_to_item(collection, row) for row in rows]
+
+    def get(self, collection, item_id):
+        row = self.connection().execute(f"SELECT * FROM {collection} WHERE id = ?", (item_id,)).fetchone()
+        return self.row_to_item(collection, row) if row else None
+
+    def count(self, collection):
+        return self.connection().execute(f"SELECT COUNT(*) FROM {collection}").fetchone()[0]
+
+    def find(self, collection, field, value):
+        if field not in COLLECTION_FIELDS[collection]:
+            return []
+        rows = self.connection().execute(
+            f"SELECT * FROM {collection} WHERE {field} = ? ORDER BY id {self.order(collection)}", (value,)
+        )
+        return [self.row_to_item(collection, row) for row in rows]
+
+    def column(self, collection, field):
+        if field not in COLLECTION_FIELDS[collection]:
+            return []
+        return [tuple(row) for row in self.connection().execute(f"SELECT id, {field} FROM {collection} ORDER BY id")]
+
+    def get_many(self, collection, ids):
+        found = {}
+        conn = self.connection()
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f"SELECT * FROM {collection} WHERE id IN ({', '.join('?' for _ in chunk)})", chunk)
+            found.update((row["id"], self.row_to_item(collection, row)) for row in rows)
+        return [found[item_id] for item_id in ids if item_id in found]
+
+    def id_at(self, collection, idx):
+        if idx < 0:
+            return None
+        row = self.connection().execute(
+            f"SELECT id FROM {collection} ORDER BY id {self.order(collection)} LIMIT 1 OFFSET ?", (idx,)
+        ).fetchone()
+        return row["id"] if row else None
+
+    def position(self, collection, item_id):
+        if self.get(collection, item_id) is None:
+            return None
+        before = "<" if collection in APPEND_COLLECTIONS else ">"
+        return self.connection().execute(f"SELECT COUNT(*) FROM {collection} WHERE id {before} ?", (item_id,)).fetchone()[0]
+
+    def neighbors(self, collection, item_id):
+        conn = self.connection()
+        lower = conn.execute(f"SELECT MAX(id) FROM {collection} WHERE id < ?", (item_id,)).fetchone()[0]
+        higher = conn.execute(f"SELECT MIN(id) FROM {collection} WHERE id > ?", (item_id,)).fetchone()[0]
+        return (lower, higher) if collection in APPEND_COLLECTIONS else (higher, lower)
+
+    def page(self, collection, after=None, limit=PAGE_SIZE):
+        if collection in APPEND_COLLECTIONS:
+            condition, params = ("id > ?", [after]) if after is not None else ("1", [])
+        else:
+            condition, params = ("id < ?", [after]) if after is not None else ("1", [])
+        rows = self.connection().execute(
+            f"SELECT * FROM {collection} WHERE {condition} ORDER BY id {self.order(collection)} LIMIT ?",
+            [*params, limit + 1],
+        ).fetchall()
+        items = [self.row_to_item(collection, row) for row in rows[:limit]]
+        return items, (items[-1]["id"] if len(rows) > limit else None)
+
+    def text_length(self, collection):
+        return self.connection().execute(f"SELECT COALESCE(SUM(LENGTH(text)), 0) FROM {collection}").fetchone()[0]
+
+    def insert(self, collection, item, durable=False):
+        fields = COLLECTION_FIELDS[collection]
+        cursor = self.write(
+            f"INSERT INTO {collection} ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})",
+            [item.get(field) for field in fields],
+            durable,
+        )
+        bump_version(collection)
+        if cursor is None:
+            return None
+        record_changed(collection, cursor.lastrowid, dict(item, id=cursor.lastrowid))
+        return cursor.lastrowid
+
+    # Several records in one transaction
+    def insert_many(self, collection, items, durable=False):
+        fields = COLLECTION_FIELDS[collection]
+        sql = f"INSERT INTO {collection} ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})"
+        conn = self.connection()
+        started = time.perf_counter()
+        try:
+            if durable:
+                conn.execute("PRAGMA synchronous=FULL")
+            with conn:
+                ids = [conn.execute(sql, [item.get(field) for field in fields]).lastrowid for item in items]
+        except sqlite3.Error as e:
+            report_storage_error(e)
+            return None
+        finally:
+            if durable:
+                conn.execute("PRAGMA synchronous=NORMAL")
+            STORAGE_WRITE_SECONDS.observe(time.perf_counter() - started, "sqlite")
+        bump_version(collection)
+        for item_id, item in zip(ids, items):
+            record_changed(collection, item_id, dict(item, id=item_id))
+        return ids
+
+    def update(self, collection, item_id, fields, durable=False):
+        fields = {k: v for k, v in fields.items() if k in COLLECTION_FIELDS[collection]}
+        if not fields:
+            return False
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        cursor = self.write(f"UPDATE {collection} SET {assignments} WHERE id = ?", [*fields.values(), item_id], durable)
+        bump_version(collection)
+        record_changed(collection, item_id, self.get(collection, item_id))
+        return bool(cursor and cursor.rowcount)
+
+    def replace(self, collection, item_id, item, durable=False):
+        return self.update(collection, item_id, {field: item.get(field) for field in COLLECTION_FIELDS[collection]}, durable)
 
-# DB file paths
-DB_FILE = "data.json"
-MUSIC_FILE = "music.json"
+    def delete(self, collection, item_id, durable=False):
+        cursor = self.write(f"DELETE FROM {collection} WHERE id = ?", (item_id,), durable)
+        bump_version(collection)
+        record_changed(collection, item_id, None)
+        return bool(cursor and cursor.rowcount)
 
-# Function to save the main database to a JSON file
-def save_db():
-    try:
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(db, f, indent=4, ensure_ascii=False)
-        print(f"Database saved to {DB_FILE} at {datetime.now().strftime('%H:%M:%S')}")
+    # Replace a whole collection, oldest record first so ids follow the display order.
+    # Records that already have an id keep it; the others get fresh ones.
+    def reset(self, collection, items):
+        fields = ("id",) + COLLECTION_FIELDS[collection]
+        ordered = items if collection in APPEND_COLLECTIONS else list(reversed(items))
+        conn = self.connection()
+        with conn:
+            conn.execute(f"DELETE FROM {collection}")
+            conn.executemany(
+                f"INSERT INTO {collection} ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})",
+                [[item.get(field) for field in fields] for item in ordered],
+            )
+        bump_version(collection)
+
+    # Replace the users and whole collections in one transaction, records
+    # oldest first with their ids kept; items may be iterators
+    def restore(self, records):
+        conn = self.connection()
+        try:
+            with conn:
+                for collection, items in records.items():
+                    fields = ("username", "password", "role") if collection == "users" else ("id",) + COLLECTION_FIELDS[collection]
+                    conn.execute(f"DELETE FROM {collection}")
+                    conn.executemany(
+                        f"INSERT INTO {collection} ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})",
+                        ([item.get(field) for field in fields] for item in items),
+                    )
+        except sqlite3.Error as e:
+            report_storage_error(e)
+            return False
+        for collection in records:
+            bump_version(collection)
         return True
-    except Exception as e:
-        print(f"Error saving database: {e} at {datetime.now().strftime('%H:%M:%S')}")
-        flash(f"Failed to save database: {e}", "error")
-        return False
 
-# Function to load the main database from a JSON file
-def load_db():
-    if os.path.exists(DB_FILE):
+    # SQLite already keeps workers consistent; data_version only moves when
+    # another connection committed, which is when in-process caches go stale
+    def refresh(self):
+        if not MULTI_WORKER:
+            return
+        version = self.connection().execute("PRAGMA data_version").fetchone()[0]
+        if getattr(self.local, "data_version", version) != version:
+            for collection in COLLECTION_FIELDS:
+                bump_version(collection)
+        self.local.data_version = version
+
+    def get_meta(self, key, default=None):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_meta(self, key, value, durable=False):
+        cursor = self.write(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+            durable,
+        )
+        return cursor is not None
+
+    def reset_users(self, users):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                [(u["username"], u["password"], u["role"]) for u in users],
+            )
+
+    def sync(self):
         try:
-            with open(DB_FILE, "r", encoding="utf-8") as f:
-                loaded_db = json.load(f)
-                if isinstance(loaded_db.get("ideas", []), list) and all(isinstance(i, str) for i in loaded_db.get("ideas", [])):
-                    loaded_db["ideas"] = [{"text": i, "status": "Planned"} for i in loaded_db["ideas"]]
-                return loaded_db
-        except json.JSONDecodeError as e:
-            print(f"Error decoding {DB_FILE}: {e}. Using default data at {datetime.now().strftime('%H:%M:%S')}")
-    return {
-        "users": [
-            {"username": "BUNBUN", "password": "09132025", "role": "erl"},
-            {"username": "BUNNY", "password": "09132025", "role": "love"}
-        ],
-        "ideas": [{"text": "Go for a picnic", "status": "Planned"}, {"text": "Watch a movie together", "status": "Planned"}],
-        "memories": [{"text": "Our first date", "category": "Romantic", "timestamp": "2025-09-13T12:00:00", "photo": ""}],
-        "notes": [{"text": "Don’t forget the anniversary gift!", "timestamp": datetime.now().isoformat()}, {"text": "Plan next weekend", "timestamp": datetime.now().isoformat()}],
-        "gallery": []
-    }
+            self.connection().execute("PRAGMA wal_checkpoint(FULL)")
+            return True
+        except sqlite3.Error as e:
+            report_storage_error(e)
+            return False
 
-# Load existing images from disk on startup
-def load_gallery():
-    files = os.listdir(app.config["UPLOAD_FOLDER"])
-    gallery = []
-    for filename in sorted(files, reverse=True):
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        if os.path.isfile(filepath):
-            gallery.append({
-                "filename": filename,
-                "uploaded_at": datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat(),
-                "note": ""
-            })
-    return gallery
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
 
 # Load the database on startup
-db = load_db()
-db["gallery"] = load_gallery()
+if STORAGE_BACKEND == "sqlite":
+    db = None
+    repo = SqliteRepository(SQLITE_FILE)
+    if not repo.count("users"):
+        repo.reset_users(load_db()["users"])
+else:
+    db = load_db()
+    if JOURNAL_ENABLED:
+        maybe_compact_journal()
+    repo = JsonRepository()
+# Under the lock so workers starting together do not each add the same files
+with shared_lock:
+    repo.refresh()
+    reconcile_gallery()
+
+@app.before_request
+def refresh_shared_state():
+    repo.refresh()
+
+# Write out anything still waiting in the flushers when the process exits
+@atexit.register
+def close_repository():
+    repo.close()
+
+@app.cli.command("migrate-to-sqlite")
+def migrate_to_sqlite():
+    """Copy data.json (with its journal) and music.json into SQLITE_FILE."""
+    target = SqliteRepository(SQLITE_FILE)
+    # The gallery table is reconciled with UPLOAD_FOLDER on every start, so it does not count
+    if any(target.count(collection) for collection in COLLECTION_FIELDS if collection != "gallery"):
+        log_event(logging.WARNING, "migrate_skipped", file=SQLITE_FILE, reason="already has data")
+        return
+    source = db if db is not None else load_db()
+    target.reset_users(source["users"])
+    for collection in COLLECTION_FIELDS:
+        records = load_music() if collection == "music" else source.get(collection, {})
+        items = list(records.values())
+        if collection not in APPEND_COLLECTIONS:
+            items.reverse()
+        target.reset(collection, items)
+        log_event(logging.INFO, "migrated", collection=collection, records=len(items), file=SQLITE_FILE)
+    # Have the next start reconcile the migrated gallery against UPLOAD_FOLDER
+    target.set_meta(GALLERY_WATERMARK_KEY, 0)
+    target.close()
+
+
+@app.cli.command("snapshots")
+@click.option("--take", is_flag=True, help="Take a snapshot now.")
+@click.option("--full", is_flag=True, help="With --take, a full snapshot rather than a delta.")
+@click.option("--restore", "point", help="Go back to a snapshot: its seq, or a time to take the last one at or before it.")
+@click.option("--yes", is_flag=True, help="Restore without asking.")
+def snapshots_command(take, full, point, yes):
+    """List the snapshots of the database, take one, or restore one."""
+    if not SNAPSHOTS_ENABLED or db is None:
+        raise click.ClickException("Snapshots are off (SNAPSHOTS=0 or the SQLite backend).")
+    if take:
+        taken = take_snapshot(full)
+        click.echo(f"Took a {taken['kind']} snapshot at seq {taken['seq']}." if taken else "Nothing changed since the last snapshot.")
+        return
+    if point is not None:
+        points = list_snapshots()
+        if point.isdigit():
+            index = next((i for i, p in enumerate(points) if p["seq"] == int(point)), None)
+        else:
+            try:
+                cutoff = datetime.fromisoformat(point).timestamp()
+            except ValueError:
+                raise click.BadParameter(f"not a seq or an ISO time: {point}", param_hint="--restore")
+            index = next((i for i in range(len(points) - 1, -1, -1) if points[i]["time"] <= cutoff), None)
+        if index is None:
+            raise click.ClickException(f"No snapshot matches {point}.")
+        when = datetime.fromtimestamp(points[index]["time"]).isoformat(timespec="seconds")
+        if not yes:
+            click.confirm(f"Restore the database to seq {points[index]['seq']} ({when})?", abort=True)
+        restore_snapshot(points, index)
+        click.echo(f"Restored seq {points[index]['seq']} ({when}).")
+        return
+    for p in list_snapshots():
+        when = datetime.fromtimestamp(p["time"]).isoformat(timespec="seconds")
+        click.echo(f"{p['seq']:>10}  {when}  {p['kind']:<5}  {os.path.getsize(p['path']):>10}")
+
+
+@app.cli.command("generate-variants")
+@click.option("--force", is_flag=True, help="Regenerate variants that already exist.")
+def generate_variants_command(force):
+    """Create the downscaled image variants for existing uploads and memory photos."""
+    if thumbnails is None:
+        log_event(logging.ERROR, "variants_unavailable", reason="Pillow is not installed")
+        return
+    targets = [
+        (folder, entry.name)
+        for folder, path in IMAGE_FOLDERS.items()
+        for entry in os.scandir(path)
+        if entry.is_file() and not entry.name.startswith(".")
+    ]
+    futures = [submit_variants(folder, filename, force) for folder, filename in targets]
+    done = 0
+    for (folder, filename), future in zip(targets, futures):
+        try:
+            if future.result():
+                done += 1
+        except Exception as e:
+            log_event(logging.ERROR, "variants_failed", folder=folder, file=filename, error=e)
+    log_event(logging.INFO, "variants_generated", images=done, total=len(targets))
+
+
+@app.cli.command("dedup-media")
+def dedup_media():
+    """Rename uploads and memory photos to their content hash, merging duplicates."""
+    renamed = merged = 0
+    for folder, path in IMAGE_FOLDERS.items():
+        collection, field = BLOB_REFERENCES[folder]
+        for entry in list(os.scandir(path)):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            name = blob_name(hash_file(entry.path), entry.name)
+            if name == entry.name:
+                continue
+            if commit_blob(entry.path, folder, name):
+                renamed += 1
+                old_variants, new_variants = variant_dir(folder, entry.name), variant_dir(folder, name)
+                if os.path.isdir(old_variants) and not os.path.exists(new_variants):
+                    os.rename(old_variants, new_variants)
+            else:
+                merged += 1
+            remove_variants(folder, entry.name)
+            for item in repo.find(collection, field, entry.name):
+                if collection == "gallery" and repo.find(collection, field, name):
+                    repo.delete(collection, item["id"])
+                else:
+                    repo.update(collection, item["id"], {field: name})
+    repo.sync()
+    log_event(logging.INFO, "media_deduplicated", renamed=renamed, merged=merged)
+
+
+@app.cli.command("build-assets")
+def build_assets():
+    """Build the CSS/JS bundles and write .gz (and, with brotli, .br) copies of the static text assets."""
+    bundles = 0
+    os.makedirs(os.path.join(app.static_folder, ASSET_DIST_FOLDER), exist_ok=True)
+    for bundle, sources in ASSET_BUNDLES.items():
+        if bundle_is_built(bundle):
+            continue
+        text = "\n".join(open(os.path.join(app.static_folder, source), encoding="utf-8").read() for source in sources)
+        text = minify_css(text) if bundle.endswith(".css") else minify_js(text)
+        write_file_atomic(os.path.join(app.static_folder, ASSET_DIST_FOLDER, bundle), text)
+        bundles += 1
+    log_event(logging.INFO, "bundles_built", bundles=bundles, folder=f"static/{ASSET_DIST_FOLDER}")
+    built = 0
+    for root, dirs, files in os.walk(app.static_folder):
+        # Photos are already compressed
+        dirs[:] = [
+            d for d in dirs
+            if os.path.relpath(os.path.join(root, d), app.static_folder).replace(os.sep, "/") + "/" not in MEDIA_PREFIXES
+        ]
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_TYPES:
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            copies = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                copies.append((".br", lambda d: brotli.compress(d, quality=11)))
+            for suffix, compress in copies:
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                    continue
+                with open(target + ".tmp", "wb") as f:
+                    f.write(compress(data))
+                os.replace(target + ".tmp", target)
+                built += 1
+    if brotli is None:
+        log_event(logging.WARNING, "brotli_unavailable", wrote="gzip only")
+    log_event(logging.INFO, "precompressed", files=built)
 
 
 # Login required decorator
@@ -93,10 +2924,75 @@ def login_required(f):
         if 'username' not in session or not session['username']:
             flash("Please log in to access this page.", "warning")
             return redirect(url_for('login'))
-        print(f"Authenticated user: {session['username']}, Role: {session.get('role')} at {datetime.now().strftime('%H:%M:%S')}")
+        log_event(logging.DEBUG, "authenticated", user=session["username"], role=session.get("role"))
         return f(*args, **kwargs)
     return decorated_function
 
+# ---------- Page Cache ----------
+# GET responses of the list pages are kept in memory per (URL, user, role)
+# together with the data_versions of the collections they show. A hit with
+# the same versions is served without rendering; any change to one of those
+# collections bumps its version, so the next view re-renders. Entries are
+# evicted least recently used once they add up to PAGE_CACHE_BYTES (0 turns
+# the cache off). Requests with flash messages pending are never cached.
+PAGE_CACHE_BYTES = int(os.environ.get("PAGE_CACHE_BYTES", 16 * 1024 * 1024))
+
+class PageCache:
+    """LRU map of rendered responses, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, versions):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != versions:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key, versions, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[key] = (versions, body, mimetype)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted[1])
+
+page_cache = PageCache(PAGE_CACHE_BYTES)
+
+# collections: the collections the page shows, or a function of the view
+# arguments returning them. per_day: the page also changes with the date.
+def cached_page(*collections, per_day=False):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != "GET" or not PAGE_CACHE_BYTES or "_flashes" in session:
+                return f(*args, **kwargs)
+            names = collections[0](**kwargs) if callable(collections[0]) else collections
+            versions = tuple(data_versions.get(c, 0) for c in names)
+            if per_day:
+                versions += (datetime.now().date().isoformat(),)
+            key = (request.full_path, session.get("username"), session.get("role"))
+            cached = page_cache.get(key, versions)
+            if cached is not None:
+                return app.response_class(cached[0], mimetype=cached[1])
+            response = make_response(f(*args, **kwargs))
+            # Only plain 200 responses that did not show a flash message
+            if response.status_code == 200 and not response.direct_passthrough and not get_flashed_messages():
+                page_cache.put(key, versions, response.get_data(), response.mimetype)
+            return response
+        return decorated_function
+    return decorator
+
 # ---------- Auth Routes ----------
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -106,15 +3002,15 @@ def login():
         session.clear()
         u = request.form.get("username", "").strip()
         p = request.form.get("password", "").strip()
-        for user in db["users"]:
+        for user in repo.all("users"):
             if user["username"] == u and user["password"] == p:
                 session["username"] = u
                 session["role"] = user["role"]
                 flash(f"Signed in as {u} ({user['role']})", "success")
-                print(f"Login success: {u}, Role: {user['role']} at {datetime.now().strftime('%H:%M:%S')}")
+                log_event(logging.INFO, "login_succeeded", user=u, role=user["role"])
                 return redirect(url_for("dashboard"))
         flash("Invalid username or password.", "error")  # Changed from "danger" to "error"
-        print(f"Login failed for username: {u} at {datetime.now().strftime('%H:%M:%S')}")
+        log_event(logging.WARNING, "login_failed", user=u)
     return render_template("login.html")
 
 @app.route("/logout")
@@ -124,11 +3020,65 @@ def logout():
     flash("Logged out successfully.", "info")
     return redirect(url_for("login"))
 
+# ---------- Media Routes ----------
+# Photos and anything else under MEDIA_PREFIXES, for logged-in users only.
+# They never change under a given name (new content gets a new name), so
+# they are cached for a year as immutable, but only by the browser.
+# MEDIA_OFFLOAD hands the bytes to a front proxy once the login check passed:
+#   x-accel-redirect  nginx; MEDIA_ACCEL_PREFIX is an internal location
+#                     aliased to the static folder, e.g.
+#                     location /protected-media/ { internal; alias /app/static/; }
+#   x-sendfile        Apache mod_xsendfile or lighttpd, given the absolute path
+# Without it the file is sent from here with Range support; gunicorn writes
+# whole files and ranges alike with sendfile(2).
+MEDIA_OFFLOAD = os.environ.get("MEDIA_OFFLOAD", "").lower()
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+MEDIA_BLOCK_BYTES = 256 * 1024
+
+# Werkzeug answers a Range request by copying the slice through Python. A
+# file wrapper positioned at the start of the range lets gunicorn sendfile()
+# it instead, stopping at the Content-Length.
+def sendfile_range(response, path):
+    file_wrapper = request.environ.get("wsgi.file_wrapper")
+    if file_wrapper is None or not request.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn/"):
+        return
+    f = open(path, "rb")
+    f.seek(response.content_range.start)
+    response.response.close()
+    response.response = file_wrapper(f, MEDIA_BLOCK_BYTES)
+
+@app.route("/media/<path:filename>")
+@login_required
+def media(filename):
+    path = safe_join(app.static_folder, filename)
+    if not filename.startswith(MEDIA_PREFIXES) or path is None or not os.path.isfile(path):
+        raise NotFound()
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if MEDIA_OFFLOAD == "x-accel-redirect":
+        response = Response(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = MEDIA_ACCEL_PREFIX + quote(filename)
+    elif MEDIA_OFFLOAD == "x-sendfile":
+        response = Response(mimetype=mimetype)
+        response.headers["X-Sendfile"] = os.path.abspath(path)
+    else:
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            # Content-addressed uploads already have the strongest possible ETag
+            etag=stem if re.fullmatch(r"[0-9a-f]{64}", stem) else True,
+            max_age=0,
+        )
+        if response.status_code == 206:
+            sendfile_range(response, path)
+    cache_forever(response, public=False)
+    return response
+
 # ---------- Debug and Diagnose Routes ----------
 @app.route("/debug")
 @login_required  # Added login_required for security
 def debug():
-    return f"Session: {dict(session)}<br>DB Users: {db['users']}<br>Memories: {db['memories']}<br>Gallery: {db['gallery']}"
+    return f"Session: {dict(session)}<br>DB Users: {repo.all('users')}<br>Memories: {repo.all('memories')}<br>Gallery: {repo.all('gallery')}"
 
 @app.route("/diagnose")
 @login_required
@@ -137,19 +3087,92 @@ def diagnose():
         f"Time: {datetime.now().strftime('%H:%M:%S')}<br>"
         f"User: {session.get('username')}<br>"
         f"Role: {session.get('role')}<br>"
-        f"Memories Count: {len(db['memories'])}<br>"
-        f"Gallery Length: {len(db['gallery'])}<br>"
+        f"Storage Backend: {STORAGE_BACKEND}<br>"
+        f"Multi-worker Mode: {MULTI_WORKER}<br>"
+        f"Log Level: {logging.getLevelName(logger.level)} ({DroppingQueueHandler.dropped} dropped)<br>"
+        f"Memories Count: {repo.count('memories')}<br>"
+        f"Gallery Length: {repo.count('gallery')}<br>"
+        f"Background Jobs: {' '.join(f'{k}={v}' for k, v in jobs.status(limit=0)[0].items())}<br>"
         f"DB File Exists: {os.path.exists(DB_FILE)}<br>"
         f"Music File Exists: {os.path.exists(MUSIC_FILE)}<br>"
         f"Upload Folder Exists: {os.path.exists(UPLOAD_FOLDER)}<br>"
         f"Memories Folder Exists: {os.path.exists(MEMORIES_PHOTO_FOLDER)}<br>"
-        f"DB Write Test: {save_db()}"
+        f"Data Folder Writable: {os.access(os.path.dirname(os.path.abspath(DB_FILE)), os.W_OK)}"
     )
 
+@app.route("/metrics")
+def metrics():
+    if METRICS_TOKEN:
+        if request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+            return Response("Unauthorized\n", 401, {"WWW-Authenticate": "Bearer"})
+    elif not session.get("username"):
+        return Response("Unauthorized\n", 401)
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+# ---------- Pagination ----------
+# List pages render one page of records; ?cursor=<id> continues after that
+# record. /api/<collection> serves the same pages as JSON, with the cards
+# already rendered, for the infinite scroll in base.html.
+PAGE_TEMPLATES = {
+    "ideas": "_idea_items.html",
+    "memories": "_memory_items.html",
+    "notes": "_note_items.html",
+    "gallery": "_gallery_items.html",
+    "music": "_music_items.html",
+}
+
+def requested_page(collection):
+    cursor = request.args.get("cursor", type=int)
+    limit = request.args.get("limit", PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # Music is paged one placement at a time
+    if collection == "music" and request.args.get("placement"):
+        ids, next_cursor = music_groups.page(request.args["placement"], cursor, limit)
+        return repo.get_many("music", ids), next_cursor
+    return repo.page(collection, cursor, limit)
+
+@app.route("/api/<collection>")
+@login_required
+@cached_page(lambda collection: (collection, "variants", "jobs") if collection == "gallery" else (collection, "variants"))
+def api_page(collection):
+    if collection not in PAGE_TEMPLATES:
+        return jsonify({"error": f"Unknown collection: {collection}"}), 404
+    items, next_cursor = requested_page(collection)
+    return jsonify({
+        "items": items,
+        "next_cursor": next_cursor,
+        "next_url": url_for("api_page", collection=collection, cursor=next_cursor, placement=request.args.get("placement")) if next_cursor else None,
+        "html": render_template(PAGE_TEMPLATES[collection], items=items)
+    })
+
+# ---------- Search ----------
+# Where a result lives: the list page starting at that record, or its own page
+def search_result_url(collection, item_id):
+    if collection == "gallery":
+        return url_for("view_image", item_id=item_id)
+    if collection == "music":
+        return url_for("music", placement=music_groups.placement(item_id), cursor=item_id - 1) + f"#music-{item_id}"
+    return url_for(collection, cursor=item_id + 1) + f"#{collection}-{item_id}"
+
+@app.route("/search")
+@login_required
+def search():
+    query = request.args.get("q", "").strip()
+    limit = max(1, min(request.args.get("limit", SEARCH_LIMIT, type=int), MAX_PAGE_SIZE))
+    results = []
+    for collection, item_id, score in search_index.search(query, limit):
+        item = repo.get(collection, item_id)
+        if item is not None:
+            results.append({"collection": collection, "item": item, "score": round(score, 3), "url": search_result_url(collection, item_id)})
+    if request.args.get("format") == "json" or request.accept_mimetypes.best == "application/json":
+        return jsonify({"query": query, "results": results, "html": render_template("_search_results.html", results=results, query=query)})
+    return render_template("search.html", results=results, query=query)
+
 # ---------- Dashboard ----------
 @app.route("/")
 @app.route("/dashboard")
 @login_required
+@cached_page("gallery", "variants", per_day=True)
 def dashboard():
     username = session.get("username")
     if not username:
@@ -172,7 +3195,7 @@ def dashboard():
             next_anniv = datetime(today.year + 1, 1, anniv_day)
         else:
             next_anniv = datetime(today.year, anniv_month + 1, anniv_day)
-    gallery_preview = [{"idx": i, "filename": img["filename"]} for i, img in enumerate(db["gallery"][:6])]
+    gallery_preview, _ = repo.page("gallery", limit=6)
     return render_template(
         "dashboard.html",
         profile=profile,
@@ -185,6 +3208,7 @@ def dashboard():
 # ---------- Ideas ----------
 @app.route("/ideas", methods=["GET", "POST"])
 @login_required
+@cached_page("ideas")
 def ideas():
     if request.method == "POST":
         role = session.get("role")
@@ -194,83 +3218,80 @@ def ideas():
         idea = request.form.get("idea", "").strip()
         status = request.form.get("status", "Planned").strip()
         if idea:
-            db["ideas"].insert(0, {"text": idea, "status": status})
-            if save_db():
+            if repo.insert("ideas", {"text": idea, "status": status}):
                 flash("Idea added successfully!", "success")
             else:
                 flash("Failed to save idea. Please try again.", "error")
         else:
             flash("Idea cannot be empty.", "warning")
-    return render_template("ideas.html", ideas=db["ideas"])
+    items, next_cursor = requested_page("ideas")
+    return render_template("ideas.html", ideas=items, next_cursor=next_cursor, total=repo.count("ideas"))
 
-@app.route("/edit_idea/<int:idx>", methods=["POST"])
+@app.route("/ideas/<int:item_id>/edit", methods=["POST"])
 @login_required
-def edit_idea(idx):
+def edit_idea(item_id):
     role = session.get("role")
     if not role or role not in ["erl", "love"]:
         flash("Only admins can edit ideas.", "warning")
         return redirect(url_for("ideas"))
-    if 0 <= idx < len(db["ideas"]):
+    idea = repo.get("ideas", item_id)
+    if idea is not None:
         new_text = request.form.get("new_text", "").strip()
-        if new_text and new_text != db["ideas"][idx]["text"]:
-            db["ideas"][idx]["text"] = new_text
-            db["ideas"][idx]["timestamp"] = datetime.now().isoformat()
-            if save_db():
+        if new_text and new_text != idea["text"]:
+            if repo.update("ideas", item_id, {"text": new_text, "timestamp": datetime.now().isoformat()}):
                 flash("Idea updated successfully!", "success")
             else:
                 flash("Failed to update idea. Please try again.", "error")
         else:
             flash("New text cannot be empty or unchanged.", "warning")
     else:
-        flash("Invalid idea index.", "warning")
-        print(f"Error: Invalid index {idx} for edit_idea at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Idea not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="edit_idea", id=item_id)
     return redirect(url_for("ideas"))
 
-@app.route("/delete_idea/<int:idx>", methods=["POST"])
+@app.route("/ideas/<int:item_id>/delete", methods=["POST"])
 @login_required
-def delete_idea(idx):
+def delete_idea(item_id):
     role = session.get("role")
     if not role or role != "erl":
         flash("Only admins can delete ideas.", "warning")
         return redirect(url_for("ideas"))
-    if 0 <= idx < len(db["ideas"]):
-        db["ideas"].pop(idx)
-        if save_db():
+    if repo.get("ideas", item_id) is not None:
+        if repo.delete("ideas", item_id):
             flash("Idea deleted successfully.", "info")
         else:
             flash("Failed to delete idea. Please try again.", "error")
     else:
-        flash("Invalid idea index.", "warning")
-        print(f"Error: Invalid index {idx} for delete_idea at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Idea not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="delete_idea", id=item_id)
     return redirect(url_for("ideas"))
 
-@app.route("/toggle_idea_status/<int:idx>", methods=["POST"])
+@app.route("/ideas/<int:item_id>/status", methods=["POST"])
 @login_required
-def toggle_idea_status(idx):
+def toggle_idea_status(item_id):
     role = session.get("role")
     if not role or role not in ["erl", "love"]:
         flash("Only admins can toggle idea status.", "warning")
         return redirect(url_for("ideas"))
-    if 0 <= idx < len(db["ideas"]):
+    idea = repo.get("ideas", item_id)
+    if idea is not None:
         new_status = request.form.get("new_status", "Planned").strip()
         if new_status in ["Planned", "Completed"]:
-            if isinstance(db["ideas"][idx], str):
-                db["ideas"][idx] = {"text": db["ideas"][idx], "status": "Planned"}
-            db["ideas"][idx]["status"] = new_status
-            if save_db():
+            if repo.update("ideas", item_id, {"status": new_status}):
                 flash(f"Idea marked as {new_status} successfully!", "success")
             else:
                 flash("Failed to update status. Please try again.", "error")
         else:
             flash("Invalid status value.", "warning")
     else:
-        flash("Invalid idea index.", "warning")
-        print(f"Error: Invalid index {idx} for toggle_idea_status at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Idea not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="toggle_idea_status", id=item_id)
     return redirect(url_for("ideas"))
 
 # ---------- Memories ----------
 @app.route("/memories", methods=["GET", "POST"])
 @login_required
+@cached_page("memories", "variants")
 def memories():
     if request.method == "POST":
         role = session.get("role")
@@ -281,84 +3302,82 @@ def memories():
         category = request.form.get("category", "Uncategorized").strip()
         photo_filename = ""
         file = request.files.get("photo")
-        if file and file.filename:
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{filename}"
-            filepath = os.path.join(app.config["MEMORIES_PHOTO_FOLDER"], unique_filename)
-            try:
-                file.save(filepath)
-                photo_filename = unique_filename
-            except Exception as e:
-                flash(f"Failed to save photo: {e}", "error")
-                print(f"Error saving photo: {e} at {datetime.now().strftime('%H:%M:%S')}")
-                return redirect(url_for("memories"))
-        if memory_text:
-            db["memories"].insert(0, {
-                "text": memory_text,
-                "category": category,
-                "timestamp": datetime.now().isoformat(),
-                "photo": photo_filename
-            })
-            if save_db():
-                flash("Memory added successfully!", "success")
+        try:
+            # A finished chunked upload, or the photo posted with the form
+            staged = stage_finished_upload(request.form.get("uploaded"), "memories")
+            if staged is None and file and file.filename:
+                staged = stage_upload(file, "memories")
+        except Exception as e:
+            flash(f"Failed to save photo: {e}", "error")
+            log_event(logging.ERROR, "photo_save_failed", error=e)
+            return redirect(url_for("memories"))
+        with blob_lock:
+            if staged:
+                photo_filename = staged[1]
+                if commit_blob(staged[0], "memories", photo_filename):
+                    queue_variants("memories", photo_filename)
+            if memory_text:
+                if repo.insert("memories", {
+                    "text": memory_text,
+                    "category": category,
+                    "timestamp": datetime.now().isoformat(),
+                    "photo": photo_filename
+                }):
+                    flash("Memory added successfully!", "success")
+                else:
+                    flash("Failed to save memory. Please try again.", "error")
+                    release_blob("memories", photo_filename)
             else:
-                flash("Failed to save memory. Please try again.", "error")
-        else:
-            flash("Memory text cannot be empty.", "warning")
-    return render_template("memories.html", memories=db["memories"])
+                flash("Memory text cannot be empty.", "warning")
+                release_blob("memories", photo_filename)
+    items, next_cursor = requested_page("memories")
+    return render_template("memories.html", memories=items, next_cursor=next_cursor, total=repo.count("memories"), max_upload_bytes=MAX_UPLOAD_BYTES)
 
-@app.route("/edit_memory/<int:idx>", methods=["POST"])
+@app.route("/memories/<int:item_id>/edit", methods=["POST"])
 @login_required
-def edit_memory(idx):
+def edit_memory(item_id):
     role = session.get("role")
     if not role or role not in ["erl", "love"]:
         flash("Only admins can edit memories.", "warning")
         return redirect(url_for("memories"))
-    if 0 <= idx < len(db["memories"]):
+    memory = repo.get("memories", item_id)
+    if memory is not None:
         new_text = request.form.get("new_text", "").strip()
-        if new_text and new_text != db["memories"][idx]["text"]:
-            db["memories"][idx]["text"] = new_text
-            db["memories"][idx]["timestamp"] = datetime.now().isoformat()
-            if save_db():
+        if new_text and new_text != memory["text"]:
+            if repo.update("memories", item_id, {"text": new_text, "timestamp": datetime.now().isoformat()}):
                 flash("Memory updated successfully!", "success")
             else:
                 flash("Failed to update memory. Please try again.", "error")
         else:
             flash("New text cannot be empty or unchanged.", "warning")
     else:
-        flash("Invalid memory index.", "warning")
-        print(f"Error: Invalid index {idx} for edit_memory at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Memory not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="edit_memory", id=item_id)
     return redirect(url_for("memories"))
 
-@app.route("/delete_memory/<int:idx>", methods=["POST"])
+@app.route("/memories/<int:item_id>/delete", methods=["POST"])
 @login_required
-def delete_memory(idx):
+def delete_memory(item_id):
     role = session.get("role")
     if not role or role != "erl":
         flash("Only admins can delete memories.", "warning")
         return redirect(url_for("memories"))
-    if 0 <= idx < len(db["memories"]):
-        photo = db["memories"][idx].get("photo")
-        if photo:
-            filepath = os.path.join(app.config["MEMORIES_PHOTO_FOLDER"], photo)
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    print(f"Error deleting photo {photo}: {e} at {datetime.now().strftime('%H:%M:%S')}")
-        db["memories"].pop(idx)
-        if save_db():
+    memory = repo.get("memories", item_id)
+    if memory is not None:
+        if repo.delete("memories", item_id, durable=True):
+            release_blob("memories", memory.get("photo"))
             flash("Memory deleted successfully.", "info")
         else:
             flash("Failed to delete memory. Please try again.", "error")
     else:
-        flash("Invalid memory index.", "warning")
-        print(f"Error: Invalid index {idx} for delete_memory at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Memory not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="delete_memory", id=item_id)
     return redirect(url_for("memories"))
 
 # ---------- Notes ----------
 @app.route("/notes", methods=["GET", "POST"])
 @login_required
+@cached_page("notes")
 def notes():
     if request.method == "POST":
         role = session.get("role")
@@ -367,98 +3386,350 @@ def notes():
             return redirect(url_for("notes"))
         note = request.form.get("note", "").strip()
         if note:
-            db["notes"].insert(0, {"text": note, "timestamp": datetime.now().isoformat()})
-            if save_db():
+            if repo.insert("notes", {"text": note, "timestamp": datetime.now().isoformat()}):
                 flash("Note added successfully!", "success")
             else:
                 flash("Failed to save note. Please try again.", "error")
         else:
             flash("Note cannot be empty.", "warning")
-    return render_template("notes.html", notes=db["notes"])
+    items, next_cursor = requested_page("notes")
+    return render_template(
+        "notes.html",
+        notes=items,
+        next_cursor=next_cursor,
+        total=repo.count("notes"),
+        total_chars=repo.text_length("notes")
+    )
 
-@app.route("/delete_note/<int:idx>", methods=["POST"])
+@app.route("/notes/<int:item_id>/delete", methods=["POST"])
 @login_required
-def delete_note(idx):
+def delete_note(item_id):
     role = session.get("role")
     if not role or role != "erl":
         flash("Only admins can delete notes.", "warning")
         return redirect(url_for("notes"))
-    if 0 <= idx < len(db["notes"]):
-        db["notes"].pop(idx)
-        if save_db():
+    if repo.get("notes", item_id) is not None:
+        if repo.delete("notes", item_id):
             flash("Note deleted successfully.", "info")
         else:
             flash("Failed to delete note. Please try again.", "error")
     else:
-        flash("Invalid note index.", "warning")
-        print(f"Error: Invalid index {idx} for delete_note at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Note not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="delete_note", id=item_id)
     return redirect(url_for("notes"))
 
-@app.route("/delete_image_note/<int:idx>", methods=["POST"])
+@app.route("/gallery/<int:item_id>/delete_note", methods=["POST"])
 @login_required
-def delete_image_note(idx):
+def delete_image_note(item_id):
     role = session.get("role")
     if not role or role not in ["erl", "love"]:
         flash("Only admins can delete image notes.", "warning")
-        return redirect(url_for("view_image", idx=idx))
-    if 0 <= idx < len(db["gallery"]):
-        db["gallery"][idx]["note"] = ""
-        if save_db():
+        return redirect(url_for("view_image", item_id=item_id))
+    if repo.get("gallery", item_id) is not None:
+        if repo.update("gallery", item_id, {"note": ""}):
             flash("Image note deleted successfully.", "info")
         else:
             flash("Failed to delete image note. Please try again.", "error")
     else:
-        flash("Invalid image index.", "warning")
-        print(f"Error: Invalid index {idx} for delete_image_note at {datetime.now().strftime('%H:%M:%S')}")
-    return redirect(url_for("view_image", idx=idx))
+        flash("Image not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="delete_image_note", id=item_id)
+    return redirect(url_for("view_image", item_id=item_id))
+
+# ---------- Chunked Uploads ----------
+# Large files are sent in slices instead of one form post:
+#   POST   /uploads                 {"folder", "filename", "size", "sha256"?} -> {"id", "offset", "chunk_size"}
+#   GET    /uploads/<id>            -> {"offset", "size"}: where to resume
+#   PUT    /uploads/<id>            one chunk as the raw body, at the Upload-Offset header
+#   POST   /uploads/<id>/complete   -> {"id", "name"}
+#   DELETE /uploads/<id>            abandons the upload
+# Chunks are appended to UPLOAD_SESSION_FOLDER/<id>.part. A chunk that does
+# not arrive whole (or whose X-Chunk-SHA256 does not match) is cut off
+# again, so the part file always ends at the last good offset. Everything
+# is on disk, so any worker can take the next chunk. The finished file is
+# hashed and checked against the declared size and sha256, then stays in
+# the session until its id goes back with the form (field "uploaded") in
+# place of the file itself. Only then is it stored like any other upload,
+# under blob_lock together with the record pointing at it; one the form
+# never comes for expires with the session.
+UPLOAD_SESSION_FOLDER = "upload_sessions"
+UPLOAD_CHUNK_BYTES = min(4 * 1024 * 1024, MAX_REQUEST_BYTES // 2)
+MAX_UPLOAD_BYTES = int(float(os.environ.get("MAX_UPLOAD_MB", "1024")) * 1024 * 1024)
+UPLOAD_SESSION_TTL = int(os.environ.get("UPLOAD_SESSION_TTL", 24 * 3600))
+UPLOAD_ID_RE = re.compile(r"[0-9a-f]{32}")
+os.makedirs(UPLOAD_SESSION_FOLDER, exist_ok=True)
+
+def upload_paths(upload_id):
+    base = os.path.join(UPLOAD_SESSION_FOLDER, upload_id)
+    return base + ".json", base + ".part"
+
+def load_upload(upload_id):
+    if not UPLOAD_ID_RE.fullmatch(upload_id):
+        return None
+    meta_path, part_path = upload_paths(upload_id)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            upload = json.load(f)
+        upload["offset"] = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return None
+    return upload if upload.get("user") == session.get("username") else None
+
+def discard_upload(upload_id):
+    for path in upload_paths(upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+# Uploads nobody has touched for UPLOAD_SESSION_TTL seconds
+def expire_uploads():
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    for entry in os.scandir(UPLOAD_SESSION_FOLDER):
+        name, ext = os.path.splitext(entry.name)
+        if ext == ".json" and UPLOAD_ID_RE.fullmatch(name):
+            try:
+                last_used = max(os.path.getmtime(path) for path in upload_paths(name) if os.path.exists(path))
+            except ValueError:
+                continue
+            if last_used < cutoff:
+                discard_upload(name)
+
+# A finished upload sent back with the form, moved next to folder outside
+# blob_lock like stage_upload(). Returns (temp path, name) for commit_blob(),
+# or None when there is no such upload or it was already used.
+def stage_finished_upload(upload_id, folder):
+    upload = load_upload(upload_id or "")
+    if upload is None or upload["folder"] != folder or not upload.get("name"):
+        return None
+    _, part_path = upload_paths(upload_id)
+    # commit_blob moves the file, so it must be on the same filesystem as folder
+    staged = os.path.join(IMAGE_FOLDERS[folder], f".upload-{upload_id}")
+    try:
+        blocking(shutil.move, part_path, staged)
+    except FileNotFoundError:
+        # Posted twice
+        return None
+    discard_upload(upload_id)
+    return staged, upload["name"]
+
+def upload_error(message, status, **extra):
+    return jsonify(dict(extra, error=message)), status
+
+def can_upload():
+    return session.get("role") in ("erl", "love")
+
+@app.route("/uploads", methods=["POST"])
+@login_required
+def create_upload():
+    if not can_upload():
+        return upload_error("Only admins can upload.", 403)
+    data = request.get_json(silent=True) or {}
+    folder = data.get("folder")
+    filename = secure_filename(str(data.get("filename") or ""))
+    size = data.get("size")
+    sha256 = data.get("sha256")
+    if folder not in IMAGE_FOLDERS or not filename:
+        return upload_error("folder and filename are required.", 400)
+    if not isinstance(size, int) or size <= 0:
+        return upload_error("size must be a positive number of bytes.", 400)
+    if size > MAX_UPLOAD_BYTES:
+        return upload_error("File is too large.", 413, max_bytes=MAX_UPLOAD_BYTES)
+    if sha256 is not None and not re.fullmatch(r"[0-9a-f]{64}", str(sha256)):
+        return upload_error("sha256 must be a hex digest.", 400)
+    expire_uploads()
+    upload_id = uuid.uuid4().hex
+    meta_path, part_path = upload_paths(upload_id)
+    open(part_path, "wb").close()
+    write_file_atomic(meta_path, json.dumps({
+        "folder": folder, "filename": filename, "size": size, "sha256": sha256,
+        "user": session.get("username"), "created": time.time(),
+    }))
+    return jsonify({"id": upload_id, "offset": 0, "size": size, "chunk_size": UPLOAD_CHUNK_BYTES}), 201
+
+@app.route("/uploads/<upload_id>", methods=["GET"])
+@login_required
+def upload_status(upload_id):
+    upload = load_upload(upload_id)
+    if upload is None:
+        return upload_error("Unknown upload.", 404)
+    return jsonify({"id": upload_id, "offset": upload["offset"], "size": upload["size"], "chunk_size": UPLOAD_CHUNK_BYTES})
+
+@app.route("/uploads/<upload_id>", methods=["PUT"])
+@login_required
+def upload_chunk(upload_id):
+    upload = load_upload(upload_id)
+    if upload is None:
+        return upload_error("Unknown upload.", 404)
+    offset = request.headers.get("Upload-Offset", type=int)
+    length = request.content_length
+    if offset is None or length is None:
+        return upload_error("Upload-Offset and Content-Length are required.", 400)
+    if length > MAX_REQUEST_BYTES:
+        return upload_error("Chunk is too large.", 413, max_bytes=MAX_REQUEST_BYTES)
+    if offset + length > upload["size"]:
+        return upload_error("Chunk goes past the declared size.", 400, offset=upload["offset"])
+    expected_sha256 = request.headers.get("X-Chunk-SHA256")
+    _, part_path = upload_paths(upload_id)
+    with open(part_path, "r+b") as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return upload_error("Another chunk is being written.", 409, offset=upload["offset"])
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            return upload_error("Offset does not match the upload.", 409, offset=current)
+        f.seek(offset)
+        digest = hashlib.sha256()
+        received = 0
+        try:
+            for block in iter(lambda: request.stream.read(HASH_CHUNK_SIZE), b""):
+                digest.update(block)
+                blocking(f.write, block)
+                received += len(block)
+        except Exception as e:
+            log_event(logging.WARNING, "upload_chunk_interrupted", id=upload_id, offset=offset, error=e)
+        if received != length or (expected_sha256 and digest.hexdigest() != expected_sha256.lower()):
+            f.truncate(offset)
+            return upload_error("Chunk was incomplete or corrupt; resend it.", 400, offset=offset)
+        f.flush()
+        blocking(os.fsync, f.fileno())
+    return jsonify({"id": upload_id, "offset": offset + received, "size": upload["size"]})
+
+@app.route("/uploads/<upload_id>/complete", methods=["POST"])
+@login_required
+def complete_upload(upload_id):
+    upload = load_upload(upload_id)
+    if upload is None:
+        return upload_error("Unknown upload.", 404)
+    if upload["offset"] != upload["size"]:
+        return upload_error("Upload is not finished.", 409, offset=upload["offset"])
+    _, part_path = upload_paths(upload_id)
+    try:
+        digest = blocking(hash_file, part_path)
+    except FileNotFoundError:
+        # Already posted with the form
+        return upload_error("Unknown upload.", 404)
+    if upload.get("sha256") and digest != upload["sha256"]:
+        discard_upload(upload_id)
+        return upload_error("File does not match its sha256; upload it again.", 422)
+    folder = upload["folder"]
+    name = blob_name(digest, upload["filename"])
+    if not upload.get("name"):
+        UPLOAD_BYTES.observe(upload["size"], folder)
+        UPLOAD_SECONDS.observe(time.time() - upload["created"], folder)
+    # Kept here until the form comes back with the id
+    meta_path, _ = upload_paths(upload_id)
+    write_file_atomic(meta_path, json.dumps(dict({k: v for k, v in upload.items() if k != "offset"}, name=name)))
+    return jsonify({"id": upload_id, "name": name, "folder": folder})
+
+@app.route("/uploads/<upload_id>", methods=["DELETE"])
+@login_required
+def cancel_upload(upload_id):
+    if load_upload(upload_id) is None:
+        return upload_error("Unknown upload.", 404)
+    discard_upload(upload_id)
+    return "", 204
+
+@app.errorhandler(413)
+def request_too_large(e):
+    if request.path.startswith("/uploads") or request.accept_mimetypes.best == "application/json":
+        return upload_error("Request is too large.", 413, max_bytes=MAX_REQUEST_BYTES)
+    flash(f"That upload is larger than {MAX_REQUEST_BYTES // (1024 * 1024)} MB.", "error")
+    return redirect(request.path)
 
 # ---------- Gallery ----------
+# Upload processing status, polled by the gallery page while jobs are waiting
+@app.route("/jobs")
+@login_required
+def job_status():
+    counts, pending = jobs.status()
+    folder = request.args.get("folder")
+    if folder:
+        pending = [job for job in pending if job.get("folder", "uploads") == folder]
+    return jsonify({"counts": counts, "pending": pending})
+
 @app.route("/gallery", methods=["GET", "POST"])
 @login_required
+@cached_page("gallery", "variants", "jobs")
 def gallery():
     if request.method == "POST":
         role = session.get("role")
         if not role or role not in ["erl", "love"]:
             flash("Only admins can upload images.", "warning")
             return redirect(url_for("gallery"))
-        file = request.files.get("image")
-        if file and file.filename:
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{filename}"
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], unique_filename)
+        staged = []
+        # Finished chunked uploads, then the files posted with the form
+        for upload_id in request.form.getlist("uploaded"):
             try:
-                file.save(filepath)
-                db["gallery"].insert(0, {"filename": unique_filename, "uploaded_at": datetime.now().isoformat(), "note": ""})
-                if save_db():
-                    flash("Image uploaded successfully!", "success")
+                finished = stage_finished_upload(upload_id, "uploads")
+            except Exception as e:
+                flash(f"Failed to save an uploaded image: {e}", "error")
+                log_event(logging.ERROR, "image_save_failed", upload=upload_id, error=e)
+                continue
+            if finished:
+                staged.append(finished)
+        for file in request.files.getlist("image"):
+            if not file or not file.filename:
+                continue
+            try:
+                staged.append(stage_upload(file, "uploads"))
+            except Exception as e:
+                flash(f"Failed to save image {file.filename}: {e}", "error")
+                log_event(logging.ERROR, "image_save_failed", file=file.filename, error=e)
+        with blob_lock:
+            filenames = []
+            for temp_path, filename in staged:
+                if commit_blob(temp_path, "uploads", filename):
+                    queue_variants("uploads", filename)
+                filenames.append(filename)
+            new_files = [name for name in dict.fromkeys(filenames) if not blob_refs("uploads", name)]
+            if len(new_files) < len(filenames):
+                duplicates = len(filenames) - len(new_files)
+                flash("That image is already in the gallery." if duplicates == 1 else f"{duplicates} of the images are already in the gallery.", "info")
+            if new_files:
+                uploaded_at = datetime.now().isoformat()
+                records = [dict(gallery_record(name, digest=os.path.splitext(name)[0], probe=False), uploaded_at=uploaded_at) for name in new_files]
+                if repo.insert_many("gallery", records):
+                    if thumbnails is not None:
+                        for name in new_files:
+                            jobs.enqueue("probe", filename=name)
+                    flash("Image uploaded successfully!" if len(new_files) == 1 else f"{len(new_files)} images uploaded successfully!", "success")
                 else:
                     flash("Failed to save image. Please try again.", "error")
-            except Exception as e:
-                flash(f"Failed to save image: {e}", "error")
-                print(f"Error saving image: {e} at {datetime.now().strftime('%H:%M:%S')}")
-        else:
-            flash("No image selected.", "warning")
-    return render_template("gallery.html", gallery=db["gallery"])
+                    for name in new_files:
+                        release_blob("uploads", name)
+            elif not filenames:
+                flash("No image selected.", "warning")
+    items, next_cursor = requested_page("gallery")
+    return render_template(
+        "gallery.html",
+        gallery=items,
+        next_cursor=next_cursor,
+        total=repo.count("gallery"),
+        max_upload_bytes=MAX_UPLOAD_BYTES,
+        processing=len(files_processing("uploads"))
+    )
 
-@app.route("/image/<int:idx>", methods=["GET", "POST"])
+@app.route("/gallery/<int:item_id>", methods=["GET", "POST"])
 @login_required
-def view_image(idx):
-    if not (0 <= idx < len(db["gallery"])):
+def view_image(item_id):
+    image = repo.get("gallery", item_id)
+    if image is None:
         flash("Image not found.", "warning")
-        print(f"Error: Invalid index {idx} for view_image at {datetime.now().strftime('%H:%M:%S')}")
+        log_event(logging.WARNING, "unknown_id", endpoint="view_image", id=item_id)
         return redirect(url_for("gallery"))
-    image = db["gallery"][idx]
     if request.method == "POST":
         role = session.get("role")
         if not role or role not in ["erl", "love"]:
             flash("Only admins can add notes.", "warning")
-            return redirect(url_for("view_image", idx=idx))
+            return redirect(url_for("view_image", item_id=item_id))
         note = request.form.get("note", "").strip()
         if note:
             try:
                 old_note = image.get("note", "")
-                image["note"] = note
-                if save_db():
+                if repo.update("gallery", item_id, {"note": note}):
+                    image = repo.get("gallery", item_id)
                     if old_note:
                         flash("Note updated successfully!", "success")
                     else:
@@ -467,33 +3738,36 @@ def view_image(idx):
                     raise Exception("Database save failed")
             except Exception as e:
                 flash(f"Failed to save note: {e}. Please try again.", "error")
-                print(f"Error adding note: {e} at {datetime.now().strftime('%H:%M:%S')}")
+                log_event(logging.ERROR, "image_note_failed", error=e)
         else:
             flash("Note cannot be empty.", "warning")
-    return render_template("image_view.html", image=image, idx=idx)
+    prev_id, next_id = repo.neighbors("gallery", item_id)
+    return render_template(
+        "image_view.html",
+        image=image,
+        idx=repo.position("gallery", item_id),
+        total=repo.count("gallery"),
+        prev_id=prev_id,
+        next_id=next_id
+    )
 
-@app.route("/delete_image/<int:idx>", methods=["POST"])
+@app.route("/gallery/<int:item_id>/delete", methods=["POST"])
 @login_required
-def delete_image(idx):
+def delete_image(item_id):
     role = session.get("role")
     if not role or role != "erl":
         flash("Only admins can delete images.", "warning")
         return redirect(url_for("gallery"))
-    if 0 <= idx < len(db["gallery"]):
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], db["gallery"][idx]["filename"])
-        if os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-            except Exception as e:
-                print(f"Error deleting image {filepath}: {e} at {datetime.now().strftime('%H:%M:%S')}")
-        db["gallery"].pop(idx)
-        if save_db():
+    image = repo.get("gallery", item_id)
+    if image is not None:
+        if repo.delete("gallery", item_id, durable=True):
+            release_blob("uploads", image["filename"])
             flash("Image deleted successfully.", "info")
         else:
             flash("Failed to delete image. Please try again.", "error")
     else:
-        flash("Invalid image index.", "warning")
-        print(f"Error: Invalid index {idx} for delete_image at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Image not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="delete_image", id=item_id)
     return redirect(url_for("gallery"))
 
 # ---------- Music Routes ----------
@@ -501,48 +3775,6 @@ def delete_image(idx):
 
 # ... (other imports and code from your app.py remain unchanged) ...
 
-# Music data handling
-def load_music():
-    if os.path.exists(MUSIC_FILE):
-        try:
-            with open(MUSIC_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if not isinstance(data, list):
-                    print(f"Error: {MUSIC_FILE} contains invalid data format, expected list at {datetime.now().strftime('%H:%M:%S')}")
-                    return []
-                sanitized_data = []
-                for item in data:
-                    if not isinstance(item, dict):
-                        print(f"Error: Invalid item in {MUSIC_FILE}: {item} at {datetime.now().strftime('%H:%M:%S')}")
-                        continue
-                    item.setdefault("song", "")
-                    item.setdefault("artist", "")
-                    item.setdefault("url", None)
-                    item.setdefault("thumbnail", None)
-                    item.setdefault("placement", "General")
-                    sanitized_data.append(item)
-                print(f"Loaded {len(sanitized_data)} music items from {MUSIC_FILE} at {datetime.now().strftime('%H:%M:%S')}")
-                return sanitized_data
-        except json.JSONDecodeError as e:
-            print(f"Error decoding {MUSIC_FILE}: {e}. Using empty list at {datetime.now().strftime('%H:%M:%S')}")
-            return []
-        except Exception as e:
-            print(f"Unexpected error loading {MUSIC_FILE}: {e} at {datetime.now().strftime('%H:%M:%S')}")
-            return []
-    print(f"{MUSIC_FILE} not found, using empty list at {datetime.now().strftime('%H:%M:%S')}")
-    return []
-
-def save_music(music_items):
-    try:
-        with open(MUSIC_FILE, "w", encoding="utf-8") as f:
-            json.dump(music_items, f, indent=4, ensure_ascii=False)
-        print(f"Music database saved to {MUSIC_FILE} with {len(music_items)} items at {datetime.now().strftime('%H:%M:%S')}")
-        return True
-    except Exception as e:
-        print(f"Error saving music database: {e} at {datetime.now().strftime('%H:%M:%S')}")
-        flash(f"Failed to save music database: {e}", "error")
-        return False
-
 def is_valid_youtube_url(url):
     pattern = r'^(https?:\/\/)?(www\.)?(youtube\.com|youtu\.be)\/.+$'
     return bool(re.match(pattern, url))
@@ -570,10 +3802,21 @@ def extract_thumbnail(url):
         return f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
     return None
 
+# The placements with their first songs, or one page of a single placement
+# (?placement=...&cursor=...); each with the cursor for its next page
+def music_groups_shown():
+    placement = request.args.get("placement")
+    if placement:
+        items, next_cursor = requested_page("music")
+        return [{"placement": placement, "items": items, "count": music_groups.count(placement), "next_cursor": next_cursor}]
+    return [
+        {"placement": placement, "items": repo.get_many("music", ids), "count": count, "next_cursor": ids[-1] if count > len(ids) else None}
+        for placement, ids, count in music_groups.overview()
+    ]
+
 @app.route("/music", methods=["GET", "POST"])
 @login_required
 def music():
-    music_items = load_music()
     if request.method == "POST":
         role = session.get("role")
         if not role or role not in ["erl", "love"]:
@@ -598,66 +3841,54 @@ def music():
         embed_url = convert_youtube_url(url)
         thumbnail = extract_thumbnail(url)
 
-        music_items.append({
+        if repo.insert("music", {
             "song": song,
             "artist": artist,
             "url": embed_url,
             "thumbnail": thumbnail,
             "placement": placement
-        })
-        if save_music(music_items):
+        }):
             flash("Music added successfully!", "success")
         else:
             flash("Failed to save music. Please try again.", "error")
         return redirect(url_for("music"))
 
-    grouped_items = {}
-    for global_index, item in enumerate(music_items):
-        placement = item.get("placement", "General")
-        if placement not in grouped_items:
-            grouped_items[placement] = []
-        item_copy = item.copy()
-        item_copy["global_index"] = global_index
-        grouped_items[placement].append(item_copy)
-
-    print(f"Rendering music.html with {len(music_items)} items: {grouped_items} at {datetime.now().strftime('%H:%M:%S')}")
-    return render_template("music.html", grouped_items=grouped_items)
+    groups = music_groups_shown()
+    log_event(logging.DEBUG, "render_music", groups=lambda: {group["placement"]: len(group["items"]) for group in groups})
+    return render_template("music.html", groups=groups, placement=request.args.get("placement"))
 
-@app.route("/remove_music/<int:index>", methods=["POST"])
+@app.route("/music/<int:item_id>/remove", methods=["POST"])
 @login_required
-def remove_music(index):
-    music_items = load_music()
+def remove_music(item_id):
     role = session.get("role")
     if not role or role != "erl":
         flash("Only admins can delete music.", "warning")
         return redirect(url_for("music"))
-    if 0 <= index < len(music_items):
-        music_items.pop(index)
-        if save_music(music_items):
+    if repo.get("music", item_id) is not None:
+        if repo.delete("music", item_id):
             flash("Music removed successfully.", "info")
         else:
             flash("Failed to remove music. Please try again.", "error")
     else:
-        flash("Invalid music index.", "warning")
-        print(f"Error: Invalid index {index} for remove_music at {datetime.now().strftime('%H:%M:%S')}")
+        flash("Music not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="remove_music", id=item_id)
     return redirect(url_for("music"))
 
-@app.route("/edit_music/<int:index>", methods=["GET", "POST"])
+@app.route("/music/<int:item_id>/edit", methods=["GET", "POST"])
 @login_required
-def edit_music(index):
-    music_items = load_music()
+def edit_music(item_id):
     role = session.get("role")
     if not role or role not in ["erl", "love"]:
         flash("Only admins can edit music.", "warning")
         return redirect(url_for("music"))
 
-    if not (0 <= index < len(music_items)):
-        flash("Invalid music index.", "warning")
-        print(f"Error: Invalid index {index} for edit_music, music_items length: {len(music_items)} at {datetime.now().strftime('%H:%M:%S')}")
+    item = repo.get("music", item_id)
+    if item is None:
+        flash("Music not found.", "warning")
+        log_event(logging.WARNING, "unknown_id", endpoint="edit_music", id=item_id, count=lambda: repo.count("music"))
         return redirect(url_for("music"))
 
     # Ensure item has all required fields
-    item = music_items[index]
     item.setdefault("song", "")
     item.setdefault("artist", "")
     item.setdefault("url", None)
@@ -673,10 +3904,10 @@ def edit_music(index):
 
         if not (song and artist and url):
             flash("Song, artist, and URL are required.", "warning")
-            return redirect(url_for("edit_music", index=index))
+            return redirect(url_for("edit_music", item_id=item_id))
         if not is_valid_youtube_url(url):
             flash("Invalid YouTube URL.", "warning")
-            return redirect(url_for("edit_music", index=index))
+            return redirect(url_for("edit_music", item_id=item_id))
 
         if placement == "Custom" and custom.strip():
             placement = custom
@@ -685,27 +3916,91 @@ def edit_music(index):
         new_thumbnail = extract_thumbnail(url) if url != item.get("url") else item.get("thumbnail")
 
         try:
-            music_items[index] = {
+            if repo.replace("music", item_id, {
                 "song": song,
                 "artist": artist,
                 "url": embed_url,
                 "thumbnail": new_thumbnail,
                 "placement": placement
-            }
-            if save_music(music_items):
+            }):
                 flash("Music updated successfully!", "success")
             else:
                 flash("Failed to update music. Please try again.", "error")
         except Exception as e:
             flash(f"Error updating music: {e}", "error")
-            print(f"Error updating music: {e} at {datetime.now().strftime('%H:%M:%S')}")
+            log_event(logging.ERROR, "music_update_failed", error=e)
         return redirect(url_for("music"))
 
-    print(f"Rendering edit_music.html with item: {item}, index: {index} at {datetime.now().strftime('%H:%M:%S')}")
-    return render_template("edit_music.html", item=item, index=index)
+    log_event(logging.DEBUG, "render_edit_music", id=item_id, item=lambda: item)
+    return render_template("edit_music.html", item=item)
+
+# ---------- Legacy Index Routes ----------
+# Links and forms rendered before records had ids address them by list
+# position. Resolve the position once and hand over to the id-based route;
+# 307 keeps the method and form body of POST requests.
+def redirect_by_position(collection, idx, endpoint, fallback):
+    item_id = repo.id_at(collection, idx)
+    if item_id is None:
+        flash("Item not found.", "warning")
+        log_event(logging.WARNING, "invalid_index", endpoint=endpoint, index=idx)
+        return redirect(url_for(fallback))
+    return redirect(url_for(endpoint, item_id=item_id), code=307)
+
+@app.route("/edit_idea/<int:idx>", methods=["POST"])
+@login_required
+def legacy_edit_idea(idx):
+    return redirect_by_position("ideas", idx, "edit_idea", "ideas")
+
+@app.route("/delete_idea/<int:idx>", methods=["POST"])
+@login_required
+def legacy_delete_idea(idx):
+    return redirect_by_position("ideas", idx, "delete_idea", "ideas")
+
+@app.route("/toggle_idea_status/<int:idx>", methods=["POST"])
+@login_required
+def legacy_toggle_idea_status(idx):
+    return redirect_by_position("ideas", idx, "toggle_idea_status", "ideas")
+
+@app.route("/edit_memory/<int:idx>", methods=["POST"])
+@login_required
+def legacy_edit_memory(idx):
+    return redirect_by_position("memories", idx, "edit_memory", "memories")
+
+@app.route("/delete_memory/<int:idx>", methods=["POST"])
+@login_required
+def legacy_delete_memory(idx):
+    return redirect_by_position("memories", idx, "delete_memory", "memories")
+
+@app.route("/delete_note/<int:idx>", methods=["POST"])
+@login_required
+def legacy_delete_note(idx):
+    return redirect_by_position("notes", idx, "delete_note", "notes")
+
+@app.route("/delete_image_note/<int:idx>", methods=["POST"])
+@login_required
+def legacy_delete_image_note(idx):
+    return redirect_by_position("gallery", idx, "delete_image_note", "gallery")
+
+@app.route("/image/<int:idx>", methods=["GET", "POST"])
+@login_required
+def legacy_view_image(idx):
+    return redirect_by_position("gallery", idx, "view_image", "gallery")
+
+@app.route("/delete_image/<int:idx>", methods=["POST"])
+@login_required
+def legacy_delete_image(idx):
+    return redirect_by_position("gallery", idx, "delete_image", "gallery")
+
+@app.route("/remove_music/<int:index>", methods=["POST"])
+@login_required
+def legacy_remove_music(index):
+    return redirect_by_position("music", index, "remove_music", "music")
+
+@app.route("/edit_music/<int:index>", methods=["GET", "POST"])
+@login_required
+def legacy_edit_music(index):
+    return redirect_by_position("music", index, "edit_music", "music")
 
-# ... (rest of your app.py remains unchanged) ...
-# ... (rest of your app.py remains unchanged) ...
 # ---------- Game Routes ----------
 @app.route("/game")
 @login_required
@@ -753,8 +4048,377 @@ def cat():
 @app.route("/jigsaw")
 @login_required
 def jigsaw():
-    gallery = db["gallery"]  # Pass the gallery data to the template
-    return render_template("jigsaw.html", gallery=gallery)
+    return render_template("jigsaw.html", gallery=repo.all("gallery"), grids=PUZZLE_GRIDS)
+
+# ---------- Jigsaw Puzzles ----------
+# A puzzle is made once per (image hash, grid size) by thumbnails.make_puzzle
+# in the variant pool and kept under PUZZLE_FOLDER/<hash>-<grid>-<size>/: a small
+# board image whose size divides evenly into the pieces, and a manifest with
+# their rectangles. The page fetches the manifest when a game starts instead
+# of slicing the original. Each use touches the directory's mtime; once the
+# folder grows past PUZZLE_CACHE_BYTES the least recently used puzzles go.
+PUZZLE_FOLDER = "static/puzzles"
+PUZZLE_GRIDS = (3, 6, 12)
+PUZZLE_SIZE = int(os.environ.get("PUZZLE_SIZE", "720"))
+PUZZLE_CACHE_BYTES = int(float(os.environ.get("PUZZLE_CACHE_MB", "64")) * 1024 * 1024)
+PUZZLE_TIMEOUT = 30
+os.makedirs(PUZZLE_FOLDER, exist_ok=True)
+puzzle_lock = threading.Lock()
+
+# The board size is part of the name, so a name never changes content
+def puzzle_name(digest, grid):
+    return f"{digest}-{grid}-{PUZZLE_SIZE}"
+
+def evict_puzzles():
+    with puzzle_lock:
+        entries = []
+        total = 0
+        for entry in os.scandir(PUZZLE_FOLDER):
+            if not entry.is_dir() or ".tmp-" in entry.name:
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            entries.append((entry.stat().st_mtime, size, entry.path))
+            total += size
+        entries.sort()
+        # The newest puzzle stays even when it alone is over the budget
+        for _, size, path in entries[:-1]:
+            if total <= PUZZLE_CACHE_BYTES:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+# Called when the last record of an upload is gone
+def remove_puzzles(filename):
+    prefix = os.path.splitext(filename)[0] + "-"
+    for entry in os.scandir(PUZZLE_FOLDER):
+        if entry.name.startswith(prefix):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+# The manifest of the puzzle for a gallery record, made first if needed
+def load_puzzle(image, grid):
+    digest = image.get("hash") or os.path.splitext(image["filename"])[0]
+    name = puzzle_name(digest, grid)
+    target = os.path.join(PUZZLE_FOLDER, name)
+    try:
+        with open(os.path.join(target, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        os.utime(target)
+    except (OSError, ValueError):
+        manifest = get_variant_pool().submit(
+            thumbnails.make_puzzle,
+            os.path.join(UPLOAD_FOLDER, image["filename"]),
+            target,
+            grid,
+            PUZZLE_SIZE,
+            VARIANT_QUALITY
+        ).result(timeout=PUZZLE_TIMEOUT)
+        log_event(logging.INFO, "puzzle_created", file=image["filename"], grid=grid)
+        evict_puzzles()
+    return dict(manifest, image=url_for("media", filename=f"puzzles/{name}/{manifest['image']}"))
+
+@app.route("/jigsaw/<int:item_id>/<int:grid>")
+@login_required
+def jigsaw_puzzle(item_id, grid):
+    image = repo.get("gallery", item_id)
+    if image is None or grid not in PUZZLE_GRIDS:
+        return jsonify({"error": "Unknown image or grid size."}), 404
+    if thumbnails is None:
+        # Without Pillow the page slices the original itself
+        return jsonify({"image": url_for("media", filename=f"uploads/{image['filename']}"), "grid": grid})
+    try:
+        return jsonify(load_puzzle(image, grid))
+    except Exception as e:
+        log_event(logging.ERROR, "puzzle_failed", file=image["filename"], grid=grid, error=e)
+        return jsonify({"error": "Could not make the puzzle."}), 500
+
+# ---------- Export and Import ----------
+# The whole archive as one tar stream:
+#   archive.json                 format version and export time
+#   records/<collection>.ndjson  one record per line, oldest first, ids kept
+#   media/<folder>/<name>        each upload and memory photo a record points at
+#   SHA256SUMS                   checksums of everything above, `sha256sum -c` style
+# GET /export streams it while it is being written and `flask export-archive`
+# writes it to a file; either way only a collection spooled to a temp file
+# and a few chunks of a photo are held at a time. `flask import-archive`
+# reads it back as a stream too: media go to temp files in their folder and
+# records to a temp file, and nothing changes until every checksum matched.
+# Then the media are moved into place, all records are replaced in a single
+# write, and files no record uses any more are removed. Variants are not
+# archived; run generate-variants after an import. The app can keep running:
+# with the JSON backend its workers reload db as after a snapshot restore.
+ARCHIVE_FORMAT = 1
+ARCHIVE_COLLECTIONS = ("users",) + tuple(COLLECTION_FIELDS)
+USER_FIELDS = ("username", "password", "role")
+ARCHIVE_CHUNK_BYTES = 256 * 1024
+ARCHIVE_QUEUE_CHUNKS = 16
+ARCHIVE_SPOOL_BYTES = 1024 * 1024
+ARCHIVE_RECORDS_RE = re.compile(r"records/(\w+)\.ndjson")
+ARCHIVE_MEDIA_RE = re.compile(r"media/(\w+)/([^/]+)")
+
+class ArchiveError(Exception):
+    pass
+
+# The archived form of a record: its id and known fields, the same for both backends
+def archive_item(collection, item):
+    if collection == "users":
+        return {field: item.get(field) for field in USER_FIELDS}
+    return dict({"id": item["id"]}, **{field: item.get(field) for field in COLLECTION_FIELDS[collection]})
+
+# Records of a collection oldest first, a page of them in memory at a time
+def archive_records(collection):
+    if collection == "users":
+        yield from repo.all("users")
+        return
+    ids = [item_id for item_id, _ in repo.column(collection, COLLECTION_FIELDS[collection][0])]
+    for start in range(0, len(ids), 500):
+        yield from repo.get_many(collection, ids[start:start + 500])
+
+class HashingReader:
+    """Wraps a file and hashes what is read from it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
+# Writes the archive to the binary file out. Returns what went in.
+def write_archive(out):
+    checksums = []
+    counts = {}
+    media = {folder: set() for folder in IMAGE_FOLDERS}
+    with tarfile.open(fileobj=out, mode="w|", bufsize=ARCHIVE_CHUNK_BYTES) as tar:
+        def add(name, f, size, mtime=None):
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = mtime or time.time()
+            reader = HashingReader(f)
+            tar.addfile(info, reader)
+            checksums.append((reader.digest.hexdigest(), name))
+
+        header = json.dumps({"format": ARCHIVE_FORMAT, "exported_at": datetime.now().isoformat()}).encode("utf-8")
+        add("archive.json", io.BytesIO(header), len(header))
+        for collection in ARCHIVE_COLLECTIONS:
+            references = [(folder, field) for folder, (c, field) in BLOB_REFERENCES.items() if c == collection]
+            counts[collection] = 0
+            with tempfile.SpooledTemporaryFile(ARCHIVE_SPOOL_BYTES) as spool:
+                for item in archive_records(collection):
+                    spool.write((json.dumps(archive_item(collection, item), ensure_ascii=False) + "\n").encode("utf-8"))
+                    counts[collection] += 1
+                    for folder, field in references:
+                        if item.get(field):
+                            media[folder].add(item[field])
+                size = spool.tell()
+                spool.seek(0)
+                add(f"records/{collection}.ndjson", spool, size)
+        counts["media"] = 0
+        for folder, names in media.items():
+            for name in sorted(names):
+                try:
+                    f = open(os.path.join(IMAGE_FOLDERS[folder], name), "rb")
+                except OSError as e:
+                    log_event(logging.WARNING, "archive_media_missing", folder=folder, file=name, error=e)
+                    continue
+                with f:
+                    stat = os.fstat(f.fileno())
+                    add(f"media/{folder}/{name}", f, stat.st_size, stat.st_mtime)
+                counts["media"] += 1
+        sums = "".join(f"{digest}  {name}\n" for digest, name in checksums).encode("utf-8")
+        add("SHA256SUMS", io.BytesIO(sums), len(sums))
+    return counts
+
+class ArchiveStream:
+    """Iterates over the archive as write_archive() produces it in a thread.
+    At most ARCHIVE_QUEUE_CHUNKS chunks wait for the client; when it goes
+    away the writer gives up at its next write."""
+
+    def __init__(self):
+        self.queue = queue.Queue(ARCHIVE_QUEUE_CHUNKS)
+        self.closed = False
+
+    def put(self, chunk):
+        while not self.closed:
+            try:
+                self.queue.put(chunk, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def write(self, data):
+        if not self.put(bytes(data)):
+            raise OSError("export cancelled")
+        return len(data)
+
+    def produce(self):
+        try:
+            counts = write_archive(self)
+            log_event(logging.INFO, "archive_exported", **counts)
+        except Exception as e:
+            if not self.closed:
+                log_event(logging.ERROR, "export_failed", error=e)
+        finally:
+            self.put(None)
+
+    def __iter__(self):
+        threading.Thread(target=self.produce, name="archive-export", daemon=True).start()
+        try:
+            while (chunk := self.queue.get()) is not None:
+                yield chunk
+        finally:
+            self.closed = True
+
+@app.route("/export")
+@login_required
+def export_archive():
+    if session.get("role") != "erl":
+        flash("Only admins can export the archive.", "warning")
+        return redirect(url_for("dashboard"))
+    response = Response(ArchiveStream(), mimetype="application/x-tar")
+    response.headers["Content-Disposition"] = f'attachment; filename="our-journey-{datetime.now():%Y%m%d-%H%M%S}.tar"'
+    return response
+
+@app.cli.command("export-archive")
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+def export_archive_command(path):
+    """Write every record and the media they use to a tar archive at PATH ("-" for stdout)."""
+    with click.open_file(path, "wb") as out:
+        counts = write_archive(out)
+    log_event(logging.INFO, "archive_exported", file=path, **counts)
+
+# One record read back from an archive, checked and reduced to its known fields
+def check_archive_item(collection, line, seen):
+    try:
+        item = json.loads(line)
+    except ValueError:
+        raise ArchiveError(f"records/{collection}.ndjson: unreadable line")
+    key = item.get("username" if collection == "users" else "id") if isinstance(item, dict) else None
+    if collection == "users":
+        valid = all(isinstance(item.get(field), str) for field in USER_FIELDS) if key else False
+    else:
+        valid = isinstance(key, int) and not isinstance(key, bool) and key > 0
+    if not valid:
+        raise ArchiveError(f"records/{collection}.ndjson: invalid record")
+    if key in seen:
+        raise ArchiveError(f"records/{collection}.ndjson: duplicate record {key}")
+    seen.add(key)
+    return archive_item(collection, item)
+
+def copy_hashed(source, target):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        target.write(chunk)
+    return digest.hexdigest()
+
+# Reads an archive from the binary file source and replaces the current
+# records and media with it. Returns what came in; raises ArchiveError and
+# leaves everything as it was when the archive is incomplete or damaged.
+def read_archive(source):
+    digests = {}
+    checksums = header = None
+    records = {}
+    media = []
+    referenced = {folder: set() for folder in IMAGE_FOLDERS}
+    added = []
+    try:
+        try:
+            with tarfile.open(fileobj=source, mode="r|*") as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    f = tar.extractfile(member)
+                    records_match = ARCHIVE_RECORDS_RE.fullmatch(member.name)
+                    media_match = ARCHIVE_MEDIA_RE.fullmatch(member.name)
+                    if member.name == "SHA256SUMS":
+                        checksums = {}
+                        for line in f.read().decode("utf-8").splitlines():
+                            digest, _, name = line.partition("  ")
+                            checksums[name] = digest
+                    elif member.name == "archive.json":
+                        data = f.read()
+                        digests[member.name] = hashlib.sha256(data).hexdigest()
+                        header = json.loads(data)
+                    elif records_match and records_match.group(1) in ARCHIVE_COLLECTIONS:
+                        collection = records_match.group(1)
+                        references = [(folder, field) for folder, (c, field) in BLOB_REFERENCES.items() if c == collection]
+                        digest = hashlib.sha256()
+                        seen = set()
+                        spool = records[collection] = tempfile.TemporaryFile()
+                        for line in f:
+                            digest.update(line)
+                            item = check_archive_item(collection, line, seen)
+                            spool.write((json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8"))
+                            for folder, field in references:
+                                if item.get(field):
+                                    referenced[folder].add(item[field])
+                        digests[member.name] = digest.hexdigest()
+                    elif media_match and media_match.group(1) in IMAGE_FOLDERS:
+                        folder, name = media_match.groups()
+                        if secure_filename(name) != name or name.startswith("."):
+                            raise ArchiveError(f"{member.name}: invalid file name")
+                        temp_path = os.path.join(IMAGE_FOLDERS[folder], f".import-{uuid.uuid4().hex}")
+                        media.append((folder, name, temp_path))
+                        with open(temp_path, "wb") as out:
+                            digests[member.name] = copy_hashed(f, out)
+                        if BLOB_NAME_RE.fullmatch(name) and not name.startswith(digests[member.name]):
+                            raise ArchiveError(f"{member.name}: content does not match its name")
+                    else:
+                        log_event(logging.WARNING, "archive_member_skipped", member=member.name)
+        except (tarfile.TarError, EOFError, ValueError) as e:
+            raise ArchiveError(f"unreadable archive: {e}")
+        if not isinstance(header, dict) or header.get("format") != ARCHIVE_FORMAT:
+            raise ArchiveError("not an archive of this app, or of an unknown format")
+        if checksums is None:
+            raise ArchiveError("SHA256SUMS is missing; the archive is incomplete")
+        for name in set(checksums) | set(digests):
+            if checksums.get(name) != digests.get(name):
+                raise ArchiveError(f"{name}: checksum mismatch or file missing")
+
+        for folder, name, temp_path in media:
+            if commit_blob(temp_path, folder, name):
+                added.append((folder, name))
+        for spool in records.values():
+            spool.seek(0)
+        if not repo.restore({collection: (json.loads(line) for line in spool) for collection, spool in records.items()}):
+            raise ArchiveError("could not save the records")
+        added.clear()
+    finally:
+        for spool in records.values():
+            spool.close()
+        for folder, name, temp_path in media:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        # Media moved in for records that could not be saved
+        for folder, name in added:
+            os.remove(os.path.join(IMAGE_FOLDERS[folder], name))
+
+    removed = 0
+    for folder, path in IMAGE_FOLDERS.items():
+        for entry in list(os.scandir(path)):
+            if entry.is_file() and not entry.name.startswith(".") and entry.name not in referenced[folder]:
+                release_blob(folder, entry.name)
+                removed += 1
+    # The gallery records came with the files; nothing for the next start to rescan
+    repo.set_meta(GALLERY_WATERMARK_KEY, os.stat(UPLOAD_FOLDER).st_mtime_ns, durable=True)
+    counts = {collection: repo.count(collection) for collection in records}
+    return dict(counts, media=len(media), removed=removed)
+
+@app.cli.command("import-archive")
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+@click.confirmation_option(prompt="This replaces every record and removes media the archive does not use. Continue?")
+def import_archive_command(path):
+    """Replace all records and media with a tar archive from export-archive ("-" for stdin)."""
+    with click.open_file(path, "rb") as source:
+        try:
+            counts = read_archive(source)
+        except ArchiveError as e:
+            log_event(logging.ERROR, "import_failed", file=path, error=e)
+            raise click.ClickException(str(e))
+    log_event(logging.INFO, "archive_imported", file=path, **counts)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
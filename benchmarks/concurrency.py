@@ -0,0 +1,148 @@
+"""Concurrency check for multi-worker mode: parallel writes from several processes.
+
+A dataset is generated into a scratch directory (see dataset.py) and
+--workers processes start the app on top of it with MULTI_WORKER=1, the way
+gunicorn workers share one data.json. Each runs --threads threads that post
+notes and read the notes page in a loop, so writes, flushes and the
+per-request journal refresh overlap inside and across processes. The check
+fails when the processes do not finish within --timeout (a deadlock holds
+the cross-process lock and stalls all of them) or when a fresh process does
+not count exactly the notes that were posted.
+
+Usage (from the repository root):
+
+    python benchmarks/concurrency.py
+    python benchmarks/concurrency.py --workers 4 --threads 8 --posts 50
+
+STORAGE_BACKEND and the other settings are taken from the environment.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+LOGIN = {"username": "BUNBUN", "password": "09132025"}
+
+
+def load_app():
+    sys.path.insert(0, ROOT)
+    import app as A
+    return A
+
+
+def worker(args):
+    """Posts args.posts notes from each of args.threads threads; prints how many went through."""
+    A = load_app()
+    start = threading.Barrier(args.threads)
+    posted, failures = [], []
+    lock = threading.Lock()
+
+    def run(index):
+        client = A.app.test_client()
+        if client.post("/login", data=LOGIN).status_code != 302:
+            raise RuntimeError("login failed")
+        start.wait()
+        done = 0
+        for n in range(args.posts):
+            status = client.post("/notes", data={"note": f"worker {os.getpid()} thread {index} note {n}"}).status_code
+            if status < 400:
+                done += 1
+            else:
+                with lock:
+                    failures.append(status)
+            client.get("/notes").get_data()
+        with lock:
+            posted.append(done)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    A.repo.sync()
+    print(json.dumps({"posted": sum(posted), "failures": failures}))
+
+
+def count_notes():
+    A = load_app()
+    print(json.dumps({"notes": A.repo.count("notes")}))
+
+
+def run_in(directory, env, *flags):
+    command = [sys.executable, os.path.abspath(__file__), *flags]
+    # A session of its own, so a hung worker goes down with the processes it started
+    return subprocess.Popen(command, cwd=directory, env=env, stdout=subprocess.PIPE, text=True, start_new_session=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, default=3, help="processes sharing the dataset")
+    parser.add_argument("--threads", type=int, default=10, help="threads per process")
+    parser.add_argument("--posts", type=int, default=20, help="notes each thread posts")
+    parser.add_argument("--records", type=int, default=100, help="records in the generated dataset")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before the processes count as hung")
+    parser.add_argument("--keep", action="store_true", help="keep the generated dataset")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--count", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+    if args.count:
+        count_notes()
+        return
+
+    sys.path.insert(0, HERE)
+    import dataset
+    directory = tempfile.mkdtemp(prefix="concurrency-")
+    env = dict(os.environ, MULTI_WORKER="1")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    try:
+        dataset.generate(directory, args.records, images=10)
+        before = json.loads(run_in(directory, env, "--count").communicate()[0])["notes"]
+        flags = ("--worker", "--threads", str(args.threads), "--posts", str(args.posts))
+        processes = [run_in(directory, env, *flags) for _ in range(args.workers)]
+        results, hung = [], 0
+        deadline = time.monotonic() + args.timeout
+        for process in processes:
+            try:
+                output = process.communicate(timeout=max(0, deadline - time.monotonic()))[0]
+            except subprocess.TimeoutExpired:
+                hung += 1
+                os.killpg(process.pid, signal.SIGKILL)
+                process.communicate()
+                continue
+            if process.returncode == 0:
+                results.append(json.loads(output.strip().splitlines()[-1]))
+        if hung:
+            print(f"FAIL: {hung} of {args.workers} workers still running after {args.timeout:.0f}s")
+            sys.exit(1)
+        if len(results) != args.workers:
+            print(f"FAIL: {args.workers - len(results)} workers exited with an error")
+            sys.exit(1)
+        posted = sum(result["posted"] for result in results)
+        failures = [status for result in results for status in result["failures"]]
+        after = json.loads(run_in(directory, env, "--count").communicate()[0])["notes"]
+        print(f"workers={args.workers} threads={args.threads} posted={posted} failed={len(failures)} notes {before} -> {after}")
+        if failures or after != before + posted:
+            print(f"FAIL: expected {before + posted} notes")
+            sys.exit(1)
+        print("OK")
+    finally:
+        if args.keep:
+            print(f"dataset kept in {directory}", file=sys.stderr)
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Synthetic datasets for the benchmarks: data.json, music.json and the image folders.
+
+The files are laid out the way app.py expects them in its working directory,
+so the app can be started on top of a generated dataset unchanged.
+"""
+import hashlib
+import io
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+WORDS = (
+    "sunset beach coffee movie dinner walk park rain picnic concert road trip "
+    "museum garden breakfast city lights birthday gift surprise dance song "
+    "mountain lake camping stars library bookstore market festival river "
+    "bridge train airport hotel balcony sunrise ocean forest bike kitchen "
+    "pasta ramen pizza dessert cake flowers letter photo laugh hug promise "
+    "anniversary holiday weekend morning evening night snow autumn spring"
+).split()
+CATEGORIES = ("Romantic", "Adventure", "Family", "Travel", "Food", "Celebration", "Other")
+STATUSES = ("Planned", "In Progress", "Done")
+PLACEMENTS = ("Romantic", "Chill", "Party", "Road Trip", "Throwback", "Study", "Workout", "General")
+START = datetime(2025, 9, 13, 8, 0, 0)
+
+
+def sentence(rng, low=4, high=24):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+
+def tiny_jpeg(index):
+    """A small JPEG whose bytes are unique to index, so every file hashes differently."""
+    if Image is None:
+        raise RuntimeError("Pillow is needed to generate images")
+    image = Image.new("RGB", (32, 24), ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256))
+    for bit in range(24):
+        if index >> bit & 1:
+            image.putpixel((bit, 0), (255, 255, 255))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=70)
+    return out.getvalue()
+
+
+def write_images(folder, start, count):
+    """Writes count content-addressed images into folder and returns their names."""
+    os.makedirs(folder, exist_ok=True)
+    names = []
+    for index in range(start, start + count):
+        data = tiny_jpeg(index)
+        name = hashlib.sha256(data).hexdigest() + ".jpg"
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(data)
+        names.append(name)
+    return names
+
+
+def generate(directory, records, images=None, seed=1):
+    """Fills directory with records ideas, memories, notes and songs and images
+    gallery photos (records by default). About one memory in ten has a photo.
+    Returns a summary of what was written."""
+    rng = random.Random(seed)
+    images = records if images is None else images
+    if Image is None:
+        images = 0
+    os.makedirs(os.path.join(directory, "static", "uploads"), exist_ok=True)
+    os.makedirs(os.path.join(directory, "static", "memories"), exist_ok=True)
+    gallery_files = write_images(os.path.join(directory, "static", "uploads"), 0, images)
+    memory_files = write_images(os.path.join(directory, "static", "memories"), images, images // 10)
+
+    def timestamp(i):
+        return (START + timedelta(minutes=17 * i)).isoformat()
+
+    # data.json keeps every collection newest first
+    data = {
+        "users": [
+            {"username": "BUNBUN", "password": "09132025", "role": "erl"},
+            {"username": "BUNNY", "password": "09132025", "role": "love"},
+        ],
+        "ideas": [{"text": sentence(rng), "status": rng.choice(STATUSES)} for _ in range(records)][::-1],
+        "memories": [
+            {
+                "text": sentence(rng, 8, 60),
+                "category": rng.choice(CATEGORIES),
+                "timestamp": timestamp(i),
+                "photo": memory_files[i // 10] if i % 10 == 0 and i // 10 < len(memory_files) else None,
+            }
+            for i in range(records)
+        ][::-1],
+        "notes": [{"text": sentence(rng, 2, 40), "timestamp": timestamp(i)} for i in range(records)][::-1],
+        "gallery": [
+            {"filename": name, "uploaded_at": timestamp(i), "note": sentence(rng, 2, 10) if i % 3 == 0 else ""}
+            for i, name in enumerate(gallery_files)
+        ][::-1],
+    }
+    music = []
+    for i in range(records):
+        video_id = "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-") for _ in range(11))
+        music.append({
+            "song": sentence(rng, 1, 5),
+            "artist": sentence(rng, 1, 3),
+            "url": f"https://youtube.com/embed/{video_id}",
+            "thumbnail": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+            "placement": rng.choice(PLACEMENTS),
+        })
+    with open(os.path.join(directory, "data.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    with open(os.path.join(directory, "music.json"), "w", encoding="utf-8") as f:
+        json.dump(music, f, indent=4, ensure_ascii=False)
+    return {"records": records, "images": len(gallery_files), "memory_photos": len(memory_files)}
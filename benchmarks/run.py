@@ -0,0 +1,438 @@
+"""Load and micro-benchmarks for app.py over synthetic datasets.
+
+For every scale a dataset is generated into a scratch directory (see
+dataset.py) and a fresh Python process starts the app on top of it, so
+startup, memory and caches are measured per scale. That process
+
+  * times the import of app.py (load_db, the first gallery reconcile),
+  * micro-benchmarks reconcile_gallery(), a full data.json snapshot,
+    repo.sync(), the music save and the music groups,
+  * sends every route in app.url_map through the Flask test client
+    (first request and repeated ones separately, since list pages are
+    cached after the first view), timing each template render as well,
+  * runs a concurrent load of page views and note posts from several
+    threads, and
+  * reports its peak RSS.
+
+Usage (from the repository root):
+
+    python benchmarks/run.py --scales 100,10000,100000
+    python benchmarks/run.py --scales 10000 --output base.json
+    python benchmarks/run.py --scales 10000 --compare base.json
+    python benchmarks/run.py --url http://127.0.0.1:8000 --concurrency 32
+
+--compare exits with status 1 when a median got slower than --threshold
+allows. --url skips the dataset and only load-tests a running server.
+STORAGE_BACKEND and the other settings are taken from the environment.
+"""
+import argparse
+import http.cookiejar
+import io
+import itertools
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+LOGIN = {"username": "BUNBUN", "password": "09132025"}
+YOUTUBE_URL = "https://youtube.com/watch?v=dQw4w9WgXcQ"
+
+# Form bodies for the POST routes, by endpoint
+POST_FORMS = {
+    "login": LOGIN,
+    "ideas": {"idea": "Benchmark idea", "status": "Planned"},
+    "edit_idea": {"new_text": "Edited by the benchmark"},
+    "toggle_idea_status": {"new_status": "Done"},
+    "memories": {"memory": "Benchmark memory", "category": "Travel"},
+    "edit_memory": {"new_text": "Edited by the benchmark"},
+    "notes": {"note": "Benchmark note"},
+    "view_image": {"note": "Benchmark note"},
+    "music": {"song": "Benchmark", "artist": "Bench", "url": YOUTUBE_URL, "placement": "Chill"},
+    "edit_music": {"song": "Benchmark", "artist": "Bench", "url": YOUTUBE_URL, "placement": "Chill"},
+}
+# Routes that remove their record get a fresh one for every request
+DISPOSABLE = {
+    "delete_idea": ("ideas", {"text": "Disposable", "status": "Planned"}),
+    "delete_memory": ("memories", {"text": "Disposable", "category": "Other", "timestamp": "2025-09-13T08:00:00", "photo": None}),
+    "delete_note": ("notes", {"text": "Disposable", "timestamp": "2025-09-13T08:00:00"}),
+    "delete_image": ("gallery", {"filename": "disposable.jpg", "uploaded_at": "2025-09-13T08:00:00", "note": ""}),
+    "remove_music": ("music", {"song": "Disposable", "artist": "Bench", "url": YOUTUBE_URL, "thumbnail": None, "placement": "Chill"}),
+}
+# Pages the load generator picks from, with a share of note posts mixed in
+LOAD_PAGES = ("/", "/ideas", "/memories", "/notes", "/gallery", "/music", "/search?q=sun", "/api/notes")
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples):
+    """Milliseconds: median, 99th percentile and count."""
+    return {
+        "p50": round(percentile(samples, 0.5) * 1000, 3) if samples else None,
+        "p99": round(percentile(samples, 0.99) * 1000, 3) if samples else None,
+        "n": len(samples),
+    }
+
+
+def timed(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+# ---------- Worker (runs inside the dataset directory) ----------
+
+def login(client):
+    response = client.post("/login", data=LOGIN)
+    if response.status_code != 302:
+        raise RuntimeError(f"login failed with status {response.status_code}")
+    return client
+
+
+def route_requests(A, rule, method):
+    """Yields (label, url, setup) for one rule; setup makes per-request state."""
+    section = rule.rule.strip("/").split("/")[0]
+    collection = section if section in ("ideas", "memories", "notes", "gallery", "music") else None
+    fillers = {}
+    for arg in rule.arguments:
+        if arg == "collection":
+            fillers[arg] = list(A.PAGE_TEMPLATES)
+        elif arg in ("idx", "index"):
+            fillers[arg] = [0]
+        elif arg == "filename":
+            fillers[arg] = ["css/base.css"]
+        elif arg == "item_id" and collection:
+            count = A.repo.count(collection)
+            fillers[arg] = [A.repo.id_at(collection, count // 2)] if count else []
+        else:
+            return
+    names = list(fillers)
+    for values in itertools.product(*(fillers[name] for name in names)):
+        args = dict(zip(names, values))
+        label = f"{method} {rule.rule}" + "".join(f" [{v}]" for k, v in args.items() if k == "collection")
+        with A.app.test_request_context():
+            url = A.url_for(rule.endpoint, **args)
+        if method == "POST" and rule.endpoint in DISPOSABLE:
+            target, record = DISPOSABLE[rule.endpoint]
+
+            def setup(rule=rule, args=args, target=target, record=record):
+                item_id = A.repo.insert(target, dict(record))
+                with A.app.test_request_context():
+                    return A.url_for(rule.endpoint, **{**args, "item_id": item_id})
+            yield label, url, setup
+        else:
+            yield label, url, None
+
+
+def bench_routes(A, client, iterations):
+    from dataset import tiny_jpeg
+    results = {}
+    covered = set()
+    uploads = itertools.count(10_000_000)
+    for rule in sorted(A.app.url_map.iter_rules(), key=lambda r: r.rule):
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            for label, url, setup in route_requests(A, rule, method):
+                covered.add(rule.rule)
+                # Logging out or in again must not touch the benchmark session
+                own_client = A.app.test_client() if rule.endpoint in ("login", "logout") else client
+                samples, statuses = [], set()
+                for _ in range(iterations + 1):
+                    target = setup() if setup else url
+                    kwargs = {}
+                    if method == "POST":
+                        form = dict(POST_FORMS.get(rule.endpoint, {}))
+                        if rule.endpoint == "gallery":
+                            form["image"] = (io.BytesIO(tiny_jpeg(next(uploads))), "bench.jpg")
+                            kwargs["content_type"] = "multipart/form-data"
+                        kwargs["data"] = form
+                    started = time.perf_counter()
+                    response = own_client.open(target, method=method, **kwargs)
+                    response.get_data()
+                    samples.append(time.perf_counter() - started)
+                    statuses.add(response.status_code)
+                    response.close()
+                result = summarize(samples[1:])
+                result["first"] = round(samples[0] * 1000, 3)
+                result["status"] = sorted(statuses)
+                results[label] = result
+    skipped = sorted({rule.rule for rule in A.app.url_map.iter_rules()} - covered)
+    return results, skipped
+
+
+def bench_micro(A, iterations):
+    results = {}
+
+    def reconcile():
+        A.repo.set_meta(A.GALLERY_WATERMARK_KEY, 0)
+        A.reconcile_gallery()
+    results["reconcile_gallery (full scan)"] = timed(reconcile, max(3, iterations // 5))
+    if A.STORAGE_BACKEND != "sqlite":
+        results["save_db (full snapshot)"] = timed(lambda: A.write_file_atomic(A.DB_FILE, A.serialize_db()), max(3, iterations // 5))
+
+        def save_music():
+            A.save_music()
+            A.music_flusher.flush()
+        results["save_music"] = timed(save_music, max(3, iterations // 5))
+    results["repo.sync (durable)"] = timed(A.repo.sync, iterations)
+    def rebuild_groups():
+        with A.music_groups.lock:
+            A.music_groups.rebuild()
+    results["music_groups.rebuild"] = timed(rebuild_groups, max(3, iterations // 5))
+    results["music_groups.overview"] = timed(A.music_groups.overview, iterations)
+    results["repo.all(music)"] = timed(lambda: A.repo.all("music"), iterations)
+    return results
+
+
+def bench_load(make_client, concurrency, duration, write_ratio):
+    """Threads each with their own logged-in client; returns latency and throughput."""
+    samples, errors = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def run(seed):
+        rng = random.Random(seed)
+        client = make_client()
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if rng.random() < write_ratio:
+                status = client.post("/notes", {"note": "Load test note"})
+            else:
+                status = client.get(rng.choice(LOAD_PAGES))
+            local.append(time.perf_counter() - started)
+            failed += status >= 400
+        with lock:
+            samples.extend(local)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    result = summarize(samples)
+    result["throughput"] = round(len(samples) / elapsed, 1)
+    result["errors"] = sum(errors)
+    result["concurrency"] = concurrency
+    return result
+
+
+class TestClientSession:
+    def __init__(self, A):
+        self.client = login(A.app.test_client())
+
+    def get(self, url):
+        response = self.client.get(url)
+        response.get_data()
+        return response.status_code
+
+    def post(self, url, data):
+        return self.client.post(url, data=data).status_code
+
+
+class HttpSession:
+    """The same interface over HTTP, for load-testing a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect()
+        )
+        self.post("/login", LOGIN)
+
+    def request(self, url, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(self.base_url + url, body, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+        except OSError:
+            return 599
+
+    def get(self, url):
+        return self.request(url)
+
+    def post(self, url, data):
+        return self.request(url, data)
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def worker(args):
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, HERE)
+    started = time.perf_counter()
+    import app as A
+    startup = time.perf_counter() - started
+    from flask import before_render_template, template_rendered
+
+    renders = {}
+    render_stack = []
+
+    @before_render_template.connect_via(A.app)
+    def start_render(sender, template, context, **extra):
+        render_stack.append(time.perf_counter())
+
+    @template_rendered.connect_via(A.app)
+    def finish_render(sender, template, context, **extra):
+        if render_stack:
+            renders.setdefault(template.name, []).append(time.perf_counter() - render_stack.pop())
+
+    client = login(A.app.test_client())
+    routes, skipped = bench_routes(A, client, args.iterations)
+    results = {
+        "backend": A.STORAGE_BACKEND,
+        "startup_ms": round(startup * 1000, 1),
+        "micro": bench_micro(A, args.iterations),
+        "routes": routes,
+        "templates": {name: summarize(samples) for name, samples in sorted(renders.items())},
+        "load": bench_load(lambda: TestClientSession(A), args.concurrency, args.duration, args.write_ratio),
+        "skipped_routes": skipped,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    with open("results.json", "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+# ---------- Orchestration ----------
+
+def run_scale(scale, args):
+    import dataset
+    directory = tempfile.mkdtemp(prefix=f"bench-{scale}-")
+    try:
+        images = min(scale, args.max_images)
+        started = time.perf_counter()
+        summary = dataset.generate(directory, scale, images)
+        print(f"scale {scale}: generated {summary} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        env = dict(os.environ)
+        env.setdefault("LOG_LEVEL", "WARNING")
+        command = [sys.executable, os.path.abspath(__file__), "--worker",
+                   "--iterations", str(args.iterations), "--concurrency", str(args.concurrency),
+                   "--duration", str(args.duration), "--write-ratio", str(args.write_ratio)]
+        subprocess.run(command, cwd=directory, env=env, check=True)
+        with open(os.path.join(directory, "results.json"), encoding="utf-8") as f:
+            results = json.load(f)
+        results["dataset"] = summary
+        return results
+    finally:
+        if args.keep:
+            print(f"scale {scale}: dataset kept in {directory}", file=sys.stderr)
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def report(all_results):
+    for scale, results in all_results.items():
+        print(f"\n== {scale} records ({results.get('backend', '?')} backend) ==")
+        print(f"startup {results['startup_ms']} ms, peak RSS {results['peak_rss_mb']} MB")
+        load = results["load"]
+        print(f"load: {load['throughput']} req/s with {load['concurrency']} threads, "
+              f"p50 {format_ms(load['p50'])} ms, p99 {format_ms(load['p99'])} ms, {load['errors']} errors")
+        for title, key in (("micro-benchmarks", "micro"), ("templates", "templates"), ("routes", "routes")):
+            print(f"\n{title:<52}{'p50 ms':>10}{'p99 ms':>10}{'first ms':>10}  status")
+            for name, row in results[key].items():
+                status = ",".join(map(str, row.get("status", [])))
+                print(f"{name:<52}{format_ms(row['p50']):>10}{format_ms(row['p99']):>10}{format_ms(row.get('first')):>10}  {status}")
+        if results.get("skipped_routes"):
+            print(f"\nnot benchmarked: {', '.join(results['skipped_routes'])}")
+
+
+def medians(results):
+    values = {"startup": results["startup_ms"], "load p50": results["load"]["p50"]}
+    for key in ("micro", "templates", "routes"):
+        for name, row in results[key].items():
+            values[f"{key}: {name}"] = row["p50"]
+    return values
+
+
+def compare(all_results, baseline, threshold, floor_ms):
+    regressions = []
+    for scale, results in all_results.items():
+        if scale not in baseline:
+            continue
+        before = medians(baseline[scale])
+        for name, value in medians(results).items():
+            old = before.get(name)
+            if old is None or value is None:
+                continue
+            if value > old * (1 + threshold) and value - old > floor_ms:
+                regressions.append(f"{scale}: {name} {old:.2f} -> {value:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scales", default="100,10000,100000", help="comma-separated record counts")
+    parser.add_argument("--max-images", type=int, default=10000, help="cap on generated gallery images per scale")
+    parser.add_argument("--iterations", type=int, default=20, help="requests per route and micro-benchmark runs")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads in the load test")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per scale")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="share of note posts in the load")
+    parser.add_argument("--url", help="load-test a running server instead of generated datasets")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="results JSON from an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown counted as a regression")
+    parser.add_argument("--floor-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--keep", action="store_true", help="keep the generated datasets")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+    if args.url:
+        result = bench_load(lambda: HttpSession(args.url), args.concurrency, args.duration, args.write_ratio)
+        print(json.dumps(result, indent=2))
+        return
+
+    sys.path.insert(0, HERE)
+    all_results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        all_results[str(scale)] = run_scale(scale, args)
+    report(all_results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(all_results, baseline, args.threshold, args.floor_ms)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
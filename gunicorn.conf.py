@@ -0,0 +1,66 @@
+# Read by `gunicorn app:app` from the working directory (see Procfile).
+#
+# SERVER_MODE picks the worker class:
+#   async   - gevent workers; each holds up to WORKER_CONNECTIONS clients, so
+#             slow uploads and downloads wait on the network without pinning
+#             a worker (default with gevent installed and a single worker)
+#   threads - gthread workers with WORKER_THREADS threads each
+#   sync    - one request at a time per worker
+# WEB_CONCURRENCY sets the number of worker processes (-w/--workers overrides
+# it); the hooks below switch on the app's multi-worker mode to match.
+import os
+import signal
+import sys
+
+try:
+    import gevent  # noqa: F401
+except ImportError:
+    gevent = None
+
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# SQLite waits for another process's write lock inside the C library, which
+# would stall every connection of a gevent worker; several workers share
+# the job queue (and the SQLite backend), so they default to threads. The
+# default only sees WEB_CONCURRENCY: with -w, set SERVER_MODE as well
+SERVER_MODE = os.environ.get("SERVER_MODE", "async" if gevent is not None and workers == 1 else "threads")
+if SERVER_MODE not in ("async", "threads", "sync"):
+    raise RuntimeError(f"SERVER_MODE must be async, threads or sync, not {SERVER_MODE!r}")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = {"async": "gevent", "threads": "gthread", "sync": "sync"}[SERVER_MODE]
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", "500"))
+threads = int(os.environ.get("WORKER_THREADS", "8")) if SERVER_MODE == "threads" else 1
+# A chunked upload request is at most UPLOAD_CHUNK_BYTES, so this only has to
+# cover one chunk over a slow link
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = int(os.environ.get("WORKER_KEEPALIVE", "5"))
+# The app has to be imported inside each worker, after the gevent worker has
+# patched the standard library; it also starts its threads per process
+preload_app = False
+accesslog = "-" if os.environ.get("ACCESS_LOG") == "1" else None
+
+
+# The image variant pool's processes belong to the worker; end them with it
+# rather than leaving them to the pool's own exit handling
+def worker_exit(server, worker):
+    app = sys.modules.get("app")
+    if app is not None:
+        app.close_variant_pool(wait=False)
+
+
+# MULTI_WORKER has to follow the number of workers gunicorn actually runs,
+# -w and TTIN included, not just WEB_CONCURRENCY. The app reads it on import,
+# which happens in each worker after the fork (preload_app is off).
+def pre_fork(server, worker):
+    if server.num_workers > 1:
+        os.environ["MULTI_WORKER"] = "1"
+
+
+# A worker started alone keeps data.json in memory without taking the lock;
+# once TTIN adds a second, replace it with one in multi-worker mode
+def nworkers_changed(server, new_value, old_value):
+    if old_value is not None and old_value <= 1 < new_value:
+        os.environ["MULTI_WORKER"] = "1"
+        for pid in list(server.WORKERS):
+            server.kill_worker(pid, signal.SIGTERM)
@@ -0,0 +1,278 @@
+(function() {
+  'use strict';
+
+  // Mobile Menu
+  function closeMobileMenu() {
+    const menubar = document.getElementById('mobileMenubar');
+    const toggle = document.getElementById('menubarToggle');
+    if (menubar && toggle) {
+      menubar.classList.remove('active');
+      toggle.setAttribute('aria-expanded', 'false');
+      document.body.style.overflow = '';
+    }
+  }
+
+  function initMobileMenu() {
+    const toggle = document.getElementById('menubarToggle');
+    const menubar = document.getElementById('mobileMenubar');
+    if (!toggle || !menubar) return;
+
+    toggle.addEventListener('click', function(e) {
+      e.stopPropagation();
+      const isOpen = menubar.classList.contains('active');
+
+      if (isOpen) {
+        closeMobileMenu();
+      } else {
+        menubar.classList.add('active');
+        toggle.setAttribute('aria-expanded', 'true');
+      }
+    });
+
+    menubar.querySelectorAll('.menubar-item, .logout-btn, .login-btn').forEach(function(item) {
+      item.addEventListener('click', function() {
+        setTimeout(closeMobileMenu, 150);
+      });
+    });
+
+    document.addEventListener('keydown', function(e) {
+      if (e.key === 'Escape' && menubar.classList.contains('active')) {
+        closeMobileMenu();
+      }
+    });
+  }
+
+  // Page Loader
+  function hidePageLoader() {
+    const loader = document.getElementById('pageLoader');
+    if (loader) {
+      setTimeout(function() {
+        loader.classList.add('hidden');
+        setTimeout(function() {
+          if (loader.parentNode) {
+            loader.parentNode.removeChild(loader);
+          }
+        }, 600);
+      }, 400);
+    }
+  }
+
+  // Rose Animation
+  function createRose() {
+    const container = document.getElementById('rosesContainer');
+    if (!container) return;
+
+    const roses = ['🌹', '💕', '💖', '💗', '🌺', '🌸', '🌷'];
+    const rose = document.createElement('div');
+    rose.className = 'rose';
+    rose.textContent = roses[Math.floor(Math.random() * roses.length)];
+    rose.style.left = Math.random() * 100 + '%';
+    rose.style.fontSize = (Math.random() * 10 + 16) + 'px';
+    rose.style.animationDuration = (Math.random() * 6 + 7) + 's';
+    rose.style.animationDelay = Math.random() * 3 + 's';
+
+    container.appendChild(rose);
+    setTimeout(function() {
+      if (rose.parentNode) {
+        rose.parentNode.removeChild(rose);
+      }
+    }, 15000);
+  }
+
+  // Flash Messages
+  function initFlashMessages() {
+    const flashes = document.querySelectorAll('.flash');
+    flashes.forEach(function(flash) {
+      setTimeout(function() {
+        flash.style.animation = 'flashSlideOut 0.4s cubic-bezier(0.4, 0, 0.2, 1) forwards';
+        setTimeout(function() {
+          if (flash.parentNode) {
+            flash.parentNode.removeChild(flash);
+          }
+        }, 400);
+      }, 6000);
+    });
+  }
+
+  // Highlight Active Navigation
+  function highlightActiveNav() {
+    const path = window.location.pathname;
+    const links = document.querySelectorAll('.nav-link, .menubar-item');
+
+    links.forEach(function(link) {
+      const href = link.getAttribute('href');
+      if (href && path.includes(href.split('/').pop())) {
+        link.setAttribute('aria-current', 'page');
+      }
+    });
+  }
+
+  // Skip Link
+  const skipLink = document.querySelector('.skip-link');
+  if (skipLink) {
+    skipLink.addEventListener('click', function(e) {
+      e.preventDefault();
+      const target = document.getElementById('main-content');
+      if (target) {
+        target.scrollIntoView({ behavior: 'smooth', block: 'start' });
+        target.focus();
+      }
+    });
+  }
+
+  // Performance Observer
+  if ('PerformanceObserver' in window) {
+    const perfObserver = new PerformanceObserver(function(list) {
+      for (const entry of list.getEntries()) {
+        if (entry.entryType === 'navigation') {
+          console.log('Page load time:', entry.loadEventEnd - entry.fetchStart, 'ms');
+        }
+      }
+    });
+    perfObserver.observe({ entryTypes: ['navigation'] });
+  }
+
+  // Initialize
+  document.addEventListener('DOMContentLoaded', function() {
+    initMobileMenu();
+    initFlashMessages();
+    highlightActiveNav();
+    hidePageLoader();
+
+    // Create initial roses
+    for (let i = 0; i < 4; i++) {
+      setTimeout(createRose, i * 800);
+    }
+
+    // Continue creating roses
+    setInterval(createRose, 3500);
+  });
+
+  // Make closeMobileMenu globally accessible
+  window.closeMobileMenu = closeMobileMenu;
+
+  // Infinite scroll: a .load-more-link points at the next page of a list on
+  // the /api/<collection> endpoint; fetch it when the link scrolls into view
+  // (or is clicked) and append the rendered cards to the list.
+  function loadNextPage(link) {
+    const list = document.getElementById(link.dataset.list);
+    const url = link.dataset.nextUrl;
+    if (!list || !url || link.dataset.loading) return;
+    link.dataset.loading = 'true';
+    fetch(url, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+      .then(response => response.json())
+      .then(page => {
+        list.insertAdjacentHTML('beforeend', page.html);
+        list.dispatchEvent(new CustomEvent('page:loaded', { bubbles: true, detail: page }));
+        if (page.next_url) {
+          link.dataset.nextUrl = page.next_url;
+          delete link.dataset.loading;
+          // Re-observe so a link that is still in view loads the next page too
+          if (pageObserver) {
+            pageObserver.unobserve(link);
+            pageObserver.observe(link);
+          }
+        } else {
+          link.remove();
+        }
+      })
+      .catch(() => { delete link.dataset.loading; });
+  }
+
+  const pageObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+        entries.forEach(entry => { if (entry.isIntersecting) loadNextPage(entry.target); });
+      }, { rootMargin: '600px' })
+    : null;
+
+  document.querySelectorAll('.load-more-link[data-next-url]').forEach(link => {
+    link.addEventListener('click', (e) => {
+      e.preventDefault();
+      loadNextPage(link);
+    });
+    if (pageObserver) pageObserver.observe(link);
+  });
+
+  // Chunked uploads: send a file to /uploads in slices, resuming from the
+  // server's offset after a dropped connection or a page reload (the upload
+  // id is remembered per file in localStorage). Resolves to {id, name}; the
+  // id goes back with the form in an "uploaded" field, which is when the
+  // server stores the file.
+  const UPLOAD_RETRIES = 5;
+
+  function sha256Hex(blob) {
+    if (!window.crypto || !crypto.subtle) return Promise.resolve(null);
+    return blob.arrayBuffer()
+      .then(buffer => crypto.subtle.digest('SHA-256', buffer))
+      .then(hash => Array.from(new Uint8Array(hash), b => b.toString(16).padStart(2, '0')).join(''));
+  }
+
+  function uploadJson(url, options) {
+    return fetch(url, Object.assign({ credentials: 'same-origin', headers: { 'Accept': 'application/json' } }, options))
+      .then(response => response.json().catch(() => ({})).then(body => ({ status: response.status, body: body })));
+  }
+
+  function startUpload(file, folder, key) {
+    const saved = localStorage.getItem(key);
+    const resume = saved
+      ? uploadJson(`/uploads/${saved}`).then(r => (r.status === 200 ? r.body : null))
+      : Promise.resolve(null);
+    return resume.then(upload => {
+      if (upload) return upload;
+      return uploadJson('/uploads', {
+        method: 'POST',
+        headers: { 'Accept': 'application/json', 'Content-Type': 'application/json' },
+        body: JSON.stringify({ folder: folder, filename: file.name, size: file.size })
+      }).then(r => {
+        if (r.status !== 201) throw new Error(r.body.error || 'Could not start the upload.');
+        localStorage.setItem(key, r.body.id);
+        return r.body;
+      });
+    });
+  }
+
+  function sendChunk(upload, file, offset, attempt) {
+    const chunk = file.slice(offset, Math.min(offset + upload.chunk_size, file.size));
+    return sha256Hex(chunk)
+      .then(hash => {
+        const headers = { 'Accept': 'application/json', 'Upload-Offset': String(offset) };
+        if (hash) headers['X-Chunk-SHA256'] = hash;
+        return uploadJson(`/uploads/${upload.id}`, { method: 'PUT', headers: headers, body: chunk });
+      })
+      .then(r => {
+        if (r.status === 200) return r.body.offset;
+        // The server says where it actually is; carry on from there
+        if (r.status === 409 && typeof r.body.offset === 'number') return r.body.offset;
+        throw new Error(r.body.error || `Upload failed (${r.status}).`);
+      })
+      .catch(error => {
+        if (attempt >= UPLOAD_RETRIES) throw error;
+        const delay = 500 * Math.pow(2, attempt);
+        return new Promise(resolve => setTimeout(resolve, delay))
+          .then(() => uploadJson(`/uploads/${upload.id}`))
+          .then(r => (r.status === 200 ? r.body.offset : offset))
+          .catch(() => offset)
+          .then(resumeAt => (resumeAt === offset ? sendChunk(upload, file, offset, attempt + 1) : resumeAt));
+      });
+  }
+
+  function chunkedUpload(file, folder, onProgress) {
+    const key = `upload:${folder}:${file.name}:${file.size}:${file.lastModified}`;
+    return startUpload(file, folder, key).then(upload => {
+      function next(offset) {
+        if (onProgress) onProgress(offset, file.size);
+        if (offset >= file.size) return Promise.resolve();
+        return sendChunk(upload, file, offset, 0).then(next);
+      }
+      return next(upload.offset)
+        .then(() => uploadJson(`/uploads/${upload.id}/complete`, { method: 'POST' }))
+        .then(r => {
+          localStorage.removeItem(key);
+          if (r.status !== 200) throw new Error(r.body.error || 'Upload could not be finished.');
+          return r.body;
+        });
+    });
+  }
+
+  window.chunkedUpload = chunkedUpload;
+})();
@@ -0,0 +1,236 @@
+// Enhanced countdown function with better performance
+function startCountdown() {
+  const targetDate = new Date("2025-10-13T00:00:00").getTime();
+  let countdownInterval;
+
+  function updateCountdown() {
+    const now = new Date().getTime();
+    const diff = targetDate - now;
+
+    if (diff <= 0) {
+      const countdownElement = document.getElementById("countdown");
+      countdownElement.innerHTML = `
+        <div class="anniversary-celebration">
+          🎉 It's Anniversary Day! 💖
+        </div>
+      `;
+      countdownElement.setAttribute('aria-label', "Anniversary day has arrived");
+      clearInterval(countdownInterval);
+
+      // Add celebration animation
+      countdownElement.classList.add('celebrating');
+      return;
+    }
+
+    const days = Math.floor(diff / (1000 * 60 * 60 * 24));
+    const hours = Math.floor((diff % (1000 * 60 * 60 * 24)) / (1000 * 60 * 60));
+    const minutes = Math.floor((diff % (1000 * 60 * 60)) / (1000 * 60));
+    const seconds = Math.floor((diff % (1000 * 60)) / 1000);
+
+    // Animate number changes
+    animateCounterChange('days', days);
+    animateCounterChange('hours', hours);
+    animateCounterChange('minutes', minutes);
+    animateCounterChange('seconds', seconds);
+
+    document.getElementById("countdown").setAttribute('aria-label', 
+      `${days} days, ${hours} hours, ${minutes} minutes, ${seconds} seconds until your next anniversary`);
+  }
+
+  function animateCounterChange(id, newValue) {
+    const element = document.getElementById(id);
+    const currentValue = parseInt(element.textContent);
+    const formattedValue = newValue.toString().padStart(2, '0');
+
+    if (currentValue !== newValue) {
+      element.style.transform = 'scale(1.1)';
+      element.textContent = formattedValue;
+      setTimeout(() => {
+        element.style.transform = 'scale(1)';
+      }, 200);
+    }
+  }
+
+  updateCountdown();
+  countdownInterval = setInterval(updateCountdown, 1000);
+}
+
+// Enhanced accessibility and interactions
+document.addEventListener('DOMContentLoaded', function() {
+  startCountdown();
+
+  // Improved keyboard navigation
+  document.querySelectorAll('.btn, .quick-action-card, .gallery-item').forEach(element => {
+    element.addEventListener('keydown', function(e) {
+      if (e.key === 'Enter' || e.key === ' ') {
+        e.preventDefault();
+        this.click();
+      }
+    });
+
+    // Add focus indicators
+    element.addEventListener('focus', function() {
+      this.style.outline = '2px solid var(--accent)';
+      this.style.outlineOffset = '2px';
+    });
+
+    element.addEventListener('blur', function() {
+      this.style.outline = 'none';
+    });
+  });
+
+  // Intersection Observer for scroll animations
+  const observerOptions = {
+    threshold: 0.1,
+    rootMargin: '0px 0px -50px 0px'
+  };
+
+  const observer = new IntersectionObserver((entries) => {
+    entries.forEach(entry => {
+      if (entry.isIntersecting) {
+        entry.target.style.animation = 'fadeInUp 0.8s ease-out forwards';
+        entry.target.style.opacity = '1';
+      }
+    });
+  }, observerOptions);
+
+  // Observe cards for animation
+  document.querySelectorAll('.card-3d, .quick-action-card').forEach(card => {
+    card.style.opacity = '0';
+    observer.observe(card);
+  });
+
+  // Enhanced card hover effects
+  document.querySelectorAll('.card-3d').forEach(card => {
+    card.addEventListener('mouseenter', function() {
+      this.style.transform = 'translateY(-8px) rotateX(2deg)';
+    });
+
+    card.addEventListener('mouseleave', function() {
+      this.style.transform = 'translateY(0) rotateX(0)';
+    });
+  });
+
+  // Game card color theming
+  document.querySelectorAll('.game-card').forEach(card => {
+    const color = card.dataset.color;
+    if (color) {
+      card.addEventListener('mouseenter', function() {
+        this.style.boxShadow = `0 16px 40px ${color}20`;
+      });
+
+      card.addEventListener('mouseleave', function() {
+        this.style.boxShadow = '';
+      });
+    }
+  });
+
+  // Responsive grid adjustments
+  function adjustGridOnResize() {
+    const container = document.querySelector('.dashboard-container');
+    const width = container.offsetWidth;
+
+    // Adjust countdown layout for small screens
+    const countdown = document.getElementById('countdown');
+    if (width < 480) {
+      countdown.classList.add('mobile-layout');
+    } else {
+      countdown.classList.remove('mobile-layout');
+    }
+  }
+
+  window.addEventListener('resize', debounce(adjustGridOnResize, 250));
+  adjustGridOnResize();
+
+  // Performance optimization: Debounce function
+  function debounce(func, wait) {
+    let timeout;
+    return function executedFunction(...args) {
+      const later = () => {
+        clearTimeout(timeout);
+        func(...args);
+      };
+      clearTimeout(timeout);
+      timeout = setTimeout(later, wait);
+    };
+  }
+
+  // Error handling for missing elements
+  const criticalElements = ['countdown', 'dashboard-title'];
+  criticalElements.forEach(id => {
+    const element = document.getElementById(id);
+    if (!element) {
+      console.warn(`Critical element with id '${id}' not found`);
+    }
+  });
+
+  // Add loading states for dynamic content
+  const dynamicCards = document.querySelectorAll('[data-dynamic]');
+  dynamicCards.forEach(card => {
+    card.classList.add('loading');
+    // Simulate content loading
+    setTimeout(() => {
+      card.classList.remove('loading');
+      card.classList.add('loaded');
+    }, Math.random() * 1000 + 500);
+  });
+
+  // Enhanced gallery interactions
+  document.querySelectorAll('.gallery-item').forEach(item => {
+    item.addEventListener('click', function(e) {
+      e.preventDefault();
+
+      // Add ripple effect
+      const ripple = document.createElement('div');
+      ripple.classList.add('ripple');
+      const rect = this.getBoundingClientRect();
+      const size = Math.max(rect.width, rect.height);
+      ripple.style.width = ripple.style.height = size + 'px';
+      ripple.style.left = (e.clientX - rect.left - size / 2) + 'px';
+      ripple.style.top = (e.clientY - rect.top - size / 2) + 'px';
+
+      this.appendChild(ripple);
+
+      setTimeout(() => {
+        ripple.remove();
+      }, 600);
+
+      // Navigate after animation
+      setTimeout(() => {
+        window.location.href = this.href;
+      }, 200);
+    });
+  });
+
+  // Add milestone progress tracking
+  const milestoneItem = document.querySelector('.milestone-item');
+  if (milestoneItem) {
+    const progressBar = document.createElement('div');
+    progressBar.className = 'milestone-progress';
+    progressBar.innerHTML = '<div class="milestone-progress-bar"></div>';
+    milestoneItem.appendChild(progressBar);
+
+    // Calculate progress (example: towards next 100-day milestone)
+    const currentDays = parseInt(document.querySelector('.stat-box p').textContent) || 0;
+    const nextMilestone = Math.ceil(currentDays / 100) * 100;
+    const progress = ((currentDays % 100) / 100) * 100;
+
+    setTimeout(() => {
+      const bar = progressBar.querySelector('.milestone-progress-bar');
+      bar.style.width = progress + '%';
+    }, 1000);
+  }
+});
+
+// Service Worker for offline functionality (optional)
+if ('serviceWorker' in navigator) {
+  window.addEventListener('load', () => {
+    navigator.serviceWorker.register('/sw.js')
+      .then(registration => {
+        console.log('SW registered: ', registration);
+      })
+      .catch(registrationError => {
+        console.log('SW registration failed: ', registrationError);
+      });
+  });
+}
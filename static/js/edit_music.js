@@ -0,0 +1,11 @@
+document.addEventListener('DOMContentLoaded', () => {
+  const placementSelect = document.querySelector('#placementSelect');
+  const customInput = document.querySelector('input[name="custom_placement"]');
+  if (placementSelect && customInput) {
+    placementSelect.addEventListener('change', e => {
+      customInput.style.display = e.target.value === 'Custom' ? 'block' : 'none';
+    });
+  } else {
+    console.error('placementSelect or customInput not found');
+  }
+});
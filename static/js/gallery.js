@@ -0,0 +1,452 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const fileInput = document.getElementById('fileInput');
+    const uploadForm = document.getElementById('uploadForm');
+    const uploadBtn = document.getElementById('uploadBtn');
+    const preview = document.getElementById('preview');
+    const previewContainer = document.getElementById('previewContainer');
+    const imageInfo = document.getElementById('imageInfo');
+    const errorMessage = document.getElementById('upload-error');
+    const progressContainer = document.getElementById('progressContainer');
+    const progressFill = document.getElementById('progressFill');
+    const progressText = document.getElementById('progressText');
+    const fileLabel = document.querySelector('.file-input-label');
+    const dragOverlay = document.querySelector('.drag-overlay');
+
+    // File input change handler
+    if (fileInput) {
+        fileInput.addEventListener('change', handleFileSelect);
+    }
+
+    // Drag and drop functionality
+    if (fileLabel) {
+        ['dragenter', 'dragover', 'dragleave', 'drop'].forEach(eventName => {
+            fileLabel.addEventListener(eventName, preventDefaults);
+            document.body.addEventListener(eventName, preventDefaults);
+        });
+
+        ['dragenter', 'dragover'].forEach(eventName => {
+            fileLabel.addEventListener(eventName, handleDragEnter);
+        });
+
+        ['dragleave', 'drop'].forEach(eventName => {
+            fileLabel.addEventListener(eventName, handleDragLeave);
+        });
+
+        fileLabel.addEventListener('drop', handleDrop);
+    }
+
+    function preventDefaults(e) {
+        e.preventDefault();
+        e.stopPropagation();
+    }
+
+    function handleDragEnter(e) {
+        fileLabel.classList.add('dragover');
+        if (dragOverlay) {
+            dragOverlay.classList.add('active');
+        }
+    }
+
+    function handleDragLeave(e) {
+        fileLabel.classList.remove('dragover');
+        if (dragOverlay) {
+            dragOverlay.classList.remove('active');
+        }
+    }
+
+    function handleDrop(e) {
+        const dt = e.dataTransfer;
+        const files = dt.files;
+
+        if (files.length > 0) {
+            fileInput.files = files;
+            handleFileSelect();
+        }
+    }
+
+    function handleFileSelect() {
+        const files = Array.from(fileInput.files);
+        const maxBytes = Number(uploadForm.dataset.maxBytes) || Infinity;
+        hideError();
+
+        if (!files.length) {
+            hidePreview();
+            uploadBtn.disabled = true;
+            return;
+        }
+
+        if (files.some(file => !file.type.startsWith('image/'))) {
+            showError('Please select only image files.');
+            hidePreview();
+            uploadBtn.disabled = true;
+            return;
+        }
+
+        if (files.some(file => file.size > maxBytes)) {
+            showError(`Each file must be smaller than ${Math.round(maxBytes / (1024 * 1024))}MB.`);
+            hidePreview();
+            uploadBtn.disabled = true;
+            return;
+        }
+
+        // Show preview of the first file
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            preview.src = e.target.result;
+            showPreview(files);
+            uploadBtn.disabled = false;
+        };
+        reader.readAsDataURL(files[0]);
+    }
+
+    function showPreview(files) {
+        previewContainer.style.display = 'block';
+
+        // Show file info
+        const totalSize = (files.reduce((sum, file) => sum + file.size, 0) / (1024 * 1024)).toFixed(2);
+
+        if (files.length === 1) {
+            imageInfo.innerHTML = `
+                <strong>File:</strong> ${escapeHtml(files[0].name)}<br>
+                <strong>Size:</strong> ${totalSize} MB<br>
+                <strong>Type:</strong> ${escapeHtml(files[0].type)}
+            `;
+        } else {
+            imageInfo.innerHTML = `
+                <strong>Files:</strong> ${files.length} images<br>
+                <strong>Total size:</strong> ${totalSize} MB
+            `;
+        }
+    }
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    function hidePreview() {
+        previewContainer.style.display = 'none';
+        preview.src = '';
+        imageInfo.innerHTML = '';
+    }
+
+    function showError(message) {
+        errorMessage.textContent = message;
+        errorMessage.style.display = 'block';
+    }
+
+    function hideError() {
+        errorMessage.style.display = 'none';
+    }
+
+    // Form submission: send the files in resumable chunks, then post the
+    // form once with the ids of the finished uploads
+    if (uploadForm) {
+        uploadForm.addEventListener('submit', function(e) {
+            const files = Array.from(fileInput.files);
+            if (!window.chunkedUpload || !window.fetch || !files.length) return;
+            e.preventDefault();
+            uploadBtn.classList.add('submitting');
+            uploadBtn.disabled = true;
+            hideError();
+            showProgress();
+
+            const totalBytes = files.reduce((sum, file) => sum + file.size, 0) || 1;
+            let doneBytes = 0;
+            const ids = [];
+            files.reduce((chain, file, index) => chain.then(() =>
+                window.chunkedUpload(file, 'uploads', (sent) => {
+                    const progress = ((doneBytes + sent) / totalBytes) * 100;
+                    progressFill.style.width = progress + '%';
+                    progressText.textContent = files.length > 1
+                        ? `Uploading ${index + 1} of ${files.length}... ${Math.round(progress)}%`
+                        : `Uploading... ${Math.round(progress)}%`;
+                }).then(result => {
+                    doneBytes += file.size;
+                    ids.push(result.id);
+                })
+            ), Promise.resolve())
+                .then(() => {
+                    progressText.textContent = 'Processing...';
+                    ids.forEach(id => {
+                        const input = document.createElement('input');
+                        input.type = 'hidden';
+                        input.name = 'uploaded';
+                        input.value = id;
+                        uploadForm.appendChild(input);
+                    });
+                    fileInput.disabled = true;
+                    uploadForm.submit();
+                })
+                .catch(error => {
+                    showError(`${error.message} Try again to resume the upload.`);
+                    uploadBtn.classList.remove('submitting');
+                    uploadBtn.disabled = false;
+                    progressContainer.style.display = 'none';
+                });
+        });
+    }
+
+    // Upload processing status: poll the job queue while photos are being
+    // processed and clear their badges as they finish
+    const processingBanner = document.getElementById('processingBanner');
+    if (processingBanner && window.fetch) {
+        const processingText = document.getElementById('processingText');
+        const pollProcessing = function() {
+            fetch(processingBanner.dataset.statusUrl, { headers: { 'Accept': 'application/json' } })
+                .then(response => response.ok ? response.json() : Promise.reject(response.status))
+                .then(data => {
+                    const pending = new Set(data.pending.map(job => job.filename));
+                    document.querySelectorAll('.gallery-item.processing').forEach(item => {
+                        if (!pending.has(item.dataset.filename)) {
+                            item.classList.remove('processing');
+                            const badge = item.querySelector('.processing-badge');
+                            if (badge) badge.remove();
+                        }
+                    });
+                    if (!pending.size) {
+                        processingText.textContent = 'All photos are ready.';
+                        setTimeout(() => processingBanner.remove(), 3000);
+                        return;
+                    }
+                    processingText.textContent = pending.size === 1
+                        ? '1 photo is still being processed…'
+                        : `${pending.size} photos are still being processed…`;
+                    setTimeout(pollProcessing, 3000);
+                })
+                .catch(() => setTimeout(pollProcessing, 10000));
+        };
+        setTimeout(pollProcessing, 3000);
+    }
+
+    function showProgress() {
+        progressContainer.style.display = 'block';
+        progressFill.style.width = '0%';
+        progressText.textContent = 'Uploading...';
+    }
+
+    // Gallery view toggle
+    window.toggleView = function() {
+        const galleryGrid = document.getElementById('galleryGrid');
+        const viewIcon = document.getElementById('viewIcon');
+        const viewText = document.getElementById('viewText');
+
+        if (galleryGrid.classList.contains('list-view')) {
+            galleryGrid.classList.remove('list-view');
+            viewIcon.textContent = '📱';
+            viewText.textContent = 'List View';
+        } else {
+            galleryGrid.classList.add('list-view');
+            viewIcon.textContent = '🔲';
+            viewText.textContent = 'Grid View';
+        }
+    };
+
+    // Sort toggle
+    window.toggleSort = function() {
+        const sortOptions = document.getElementById('sortOptions');
+        const isVisible = sortOptions.style.display !== 'none';
+        sortOptions.style.display = isVisible ? 'none' : 'block';
+    };
+
+    // Sort functionality
+    document.querySelectorAll('.sort-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            // Update active state
+            document.querySelectorAll('.sort-btn').forEach(b => b.classList.remove('active'));
+            this.classList.add('active');
+
+            // Sort gallery items
+            const sortType = this.dataset.sort;
+            sortGallery(sortType);
+        });
+    });
+
+    function sortGallery(sortType) {
+        const galleryGrid = document.getElementById('galleryGrid');
+        const items = Array.from(galleryGrid.children);
+
+        items.sort((a, b) => {
+            switch (sortType) {
+                case 'newest':
+                    return new Date(b.dataset.date) - new Date(a.dataset.date);
+                case 'oldest':
+                    return new Date(a.dataset.date) - new Date(b.dataset.date);
+                case 'name':
+                    return a.dataset.filename.localeCompare(b.dataset.filename);
+                case 'size':
+                    // This would require additional data from the server
+                    return a.dataset.filename.localeCompare(b.dataset.filename);
+                default:
+                    return 0;
+            }
+        });
+
+        // Re-append sorted items
+        items.forEach(item => galleryGrid.appendChild(item));
+    }
+
+    // Remove preview
+    window.removePreview = function() {
+        fileInput.value = '';
+        hidePreview();
+        hideError();
+        uploadBtn.disabled = true;
+        uploadBtn.classList.remove('submitting');
+        progressContainer.style.display = 'none';
+    };
+
+    // Delete modal functions
+    window.openDeleteModal = function(index) {
+        const modal = document.getElementById('deleteModal');
+        const deletePreview = document.getElementById('deletePreview');
+        const confirmBtn = document.getElementById('confirmDeleteBtn');
+        const galleryItem = document.querySelector(`[data-index="${index}"]`);
+
+        if (modal && galleryItem) {
+            // Show preview image
+            const img = galleryItem.querySelector('.gallery-image');
+            if (img) {
+                deletePreview.innerHTML = `<img src="${img.src}" alt="Preview">`;
+            }
+
+            // Set form target
+            confirmBtn.setAttribute('form', `delete-form-${index}`);
+
+            // Show modal
+            modal.style.display = 'flex';
+
+            // Focus management
+            setTimeout(() => {
+                const cancelBtn = modal.querySelector('.btn-outline');
+                if (cancelBtn) cancelBtn.focus();
+            }, 100);
+        }
+    };
+
+    window.closeDeleteModal = function() {
+        const modal = document.getElementById('deleteModal');
+        if (modal) {
+            modal.style.display = 'none';
+        }
+    };
+
+    // Image info modal
+    window.showImageInfo = function(index) {
+        const modal = document.getElementById('imageInfoModal');
+        const content = document.getElementById('imageInfoContent');
+        const galleryItem = document.querySelector(`[data-index="${index}"]`);
+
+        if (modal && galleryItem) {
+            const img = galleryItem.querySelector('.gallery-image');
+            const filename = galleryItem.dataset.filename;
+            const date = galleryItem.dataset.date;
+            const note = galleryItem.querySelector('.note-preview');
+
+            let infoHTML = `
+                <div style="text-align: center; margin-bottom: 20px;">
+                    <img src="${img.src}" alt="Preview" style="max-width: 200px; max-height: 150px; border-radius: 8px; object-fit: cover;">
+                </div>
+                <p><strong>Filename:</strong> ${filename}</p>
+                <p><strong>Uploaded:</strong> ${new Date(date).toLocaleDateString()}</p>
+                <p><strong>Index:</strong> #${parseInt(index) + 1}</p>
+            `;
+
+            if (note) {
+                infoHTML += `<p><strong>Note:</strong> ${note.textContent}</p>`;
+            }
+
+            content.innerHTML = infoHTML;
+            modal.style.display = 'flex';
+        }
+    };
+
+    window.closeImageInfoModal = function() {
+        const modal = document.getElementById('imageInfoModal');
+        if (modal) {
+            modal.style.display = 'none';
+        }
+    };
+
+    // Keyboard shortcuts
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'Escape') {
+            closeDeleteModal();
+            closeImageInfoModal();
+        }
+    });
+
+    // Toast notifications
+    function showToast(message, type = 'info') {
+        const toast = document.createElement('div');
+        toast.className = `toast toast-${type}`;
+        toast.textContent = message;
+        toast.style.cssText = `
+            position: fixed;
+            top: 20px;
+            right: 20px;
+            background: var(--card-bg);
+            color: var(--text-light);
+            padding: 16px 20px;
+            border-radius: var(--border-radius-sm);
+            box-shadow: 0 8px 25px var(--shadow);
+            backdrop-filter: blur(20px);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            z-index: 1001;
+            animation: slideInRight 0.3s ease-out;
+        `;
+
+        document.body.appendChild(toast);
+
+        setTimeout(() => {
+            toast.style.animation = 'slideOutRight 0.3s ease-out forwards';
+            setTimeout(() => {
+                if (toast.parentNode) {
+                    toast.parentNode.removeChild(toast);
+                }
+            }, 300);
+        }, 3000);
+    }
+
+    // Check for success messages
+    const urlParams = new URLSearchParams(window.location.search);
+    if (urlParams.get('uploaded') === 'true') {
+        showToast('Image uploaded successfully!', 'success');
+    }
+    if (urlParams.get('deleted') === 'true') {
+        showToast('Image deleted successfully', 'info');
+    }
+
+    // Add CSS for toast animations
+    const style = document.createElement('style');
+    style.textContent = `
+        @keyframes slideInRight {
+            from { transform: translateX(100%); opacity: 0; }
+            to { transform: translateX(0); opacity: 1; }
+        }
+        @keyframes slideOutRight {
+            from { transform: translateX(0); opacity: 1; }
+            to { transform: translateX(100%); opacity: 0; }
+        }
+    `;
+    document.head.appendChild(style);
+
+    // Lazy loading for images
+    if ('IntersectionObserver' in window) {
+        const imageObserver = new IntersectionObserver((entries) => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
+                    const img = entry.target;
+                    img.src = img.dataset.src || img.src;
+                    img.classList.remove('lazy');
+                    imageObserver.unobserve(img);
+                }
+            });
+        });
+
+        document.querySelectorAll('.gallery-image[data-src]').forEach(img => {
+            imageObserver.observe(img);
+        });
+    }
+});
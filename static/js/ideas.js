@@ -0,0 +1,89 @@
+document.addEventListener('DOMContentLoaded', () => {
+  const editButtons = document.querySelectorAll('.edit-btn');
+  editButtons.forEach(button => {
+    button.addEventListener('click', () => editIdea(button));
+  });
+});
+
+function filterIdeas() {
+  const input = document.getElementById("idea-search").value.toLowerCase();
+  const cards = document.getElementsByClassName("idea-card");
+  for (let card of cards) {
+    const text = card.dataset.text;
+    const status = card.dataset.status;
+    if (text.includes(input) || status.includes(input)) {
+      card.style.display = "";
+    } else {
+      card.style.display = "none";
+    }
+  }
+}
+
+function sortIdeas() {
+  const select = document.getElementById("idea-sort");
+  const value = select.value;
+  const list = document.getElementById("idea-list");
+  const cards = Array.from(list.getElementsByClassName("idea-card"));
+  cards.sort((a, b) => {
+    if (value === "text-asc") {
+      return a.dataset.text.localeCompare(b.dataset.text);
+    } else if (value === "text-desc") {
+      return b.dataset.text.localeCompare(a.dataset.text);
+    } else if (value === "status") {
+      return a.dataset.status.localeCompare(b.dataset.status);
+    }
+    return 0;
+  });
+  list.innerHTML = "";
+  cards.forEach(card => list.appendChild(card));
+}
+
+function editIdea(button, index) {
+  const card = button.closest(".idea-card");
+  const textElement = card.querySelector(".idea-text");
+  const currentText = textElement.textContent;
+  const form = card.querySelector(".edit-form");
+  const input = form.querySelector("input[name='new_text']");
+
+  if (button.textContent === "Edit") {
+    const textarea = document.createElement("textarea");
+    textarea.value = currentText;
+    textarea.rows = 2;
+    textarea.style.width = "100%";
+    textarea.style.padding = "5px";
+    textarea.style.borderRadius = "5px";
+    textarea.style.border = "1px solid var(--accent)";
+    textarea.style.background = "rgba(255, 255, 255, 0.1)";
+    textarea.style.color = "#ffffff";
+    textElement.replaceWith(textarea);
+    button.textContent = "Save";
+  } else {
+    const textarea = card.querySelector("textarea");
+    const newText = textarea.value.trim();
+    if (newText && newText !== currentText) {
+      input.value = newText;
+      form.submit();
+    } else if (!newText) {
+      alert("Idea cannot be empty!");
+      return;
+    } else {
+      textarea.replaceWith(textElement);
+      textElement.textContent = currentText;
+      button.textContent = "Edit";
+    }
+  }
+}
+
+function toggleStatus(button, index, currentStatus) {
+  const newStatus = currentStatus === 'Completed' ? 'Planned' : 'Completed';
+  const form = document.createElement('form');
+  form.method = 'post';
+  form.action = window.pageData.toggleStatusUrl.replace('/0/', '/' + index + '/');
+  const input = document.createElement('input');
+  input.type = 'hidden';
+  input.name = 'new_status';
+  input.value = newStatus;
+  form.appendChild(input);
+  document.body.appendChild(form);
+  form.submit();
+}
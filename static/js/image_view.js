@@ -0,0 +1,483 @@
+document.addEventListener('DOMContentLoaded', function() {
+    let currentZoom = 1;
+    let isDragging = false;
+    let dragStart = { x: 0, y: 0 };
+    let imagePosition = { x: 0, y: 0 };
+
+    const mainImage = document.getElementById('mainImage');
+    const imageContainer = document.getElementById('imageContainer');
+    const zoomControls = document.getElementById('zoomControls');
+    const zoomLevel = document.getElementById('zoomLevel');
+    const infoPanel = document.getElementById('infoPanel');
+    const noteForm = document.getElementById('noteForm');
+    const noteInput = document.getElementById('noteInput');
+    const charCount = document.getElementById('charCount');
+
+    // Initialize loading and image handling
+    let imageLoaded = false;
+    let loadingTimeout;
+
+    if (mainImage) {
+        // Show loading immediately
+        showLoading();
+
+        // Set a timeout for slow loading
+        loadingTimeout = setTimeout(() => {
+            if (!imageLoaded) {
+                updateLoadingText('Image is taking longer than expected...');
+                // Add retry option after 5 seconds
+                setTimeout(() => {
+                    if (!imageLoaded) {
+                        addRetryOption();
+                    }
+                }, 5000);
+            }
+        }, 3000);
+
+        mainImage.addEventListener('load', function() {
+            imageLoaded = true;
+            clearTimeout(loadingTimeout);
+            updateImageInfo();
+            hideLoading();
+        });
+
+        mainImage.addEventListener('error', function() {
+            imageLoaded = false;
+            clearTimeout(loadingTimeout);
+            showError();
+        });
+
+        // Force load if image is already cached
+        if (mainImage.complete) {
+            imageLoaded = true;
+            updateImageInfo();
+            hideLoading();
+        }
+    }
+
+    function showLoading() {
+        const loading = document.getElementById('imageLoading');
+        if (loading) {
+            loading.style.display = 'flex';
+        }
+    }
+
+    function updateLoadingText(text) {
+        const loadingText = document.querySelector('.loading-text');
+        if (loadingText) {
+            loadingText.textContent = text;
+        }
+    }
+
+    function addRetryOption() {
+        const loading = document.getElementById('imageLoading');
+        if (loading && !imageLoaded) {
+            const retryBtn = document.createElement('button');
+            retryBtn.className = 'btn btn-small btn-outline';
+            retryBtn.innerHTML = '<span class="btn-text">Retry Loading</span>';
+            retryBtn.onclick = function() {
+                loading.removeChild(retryBtn);
+                retryImageLoad();
+            };
+            loading.appendChild(retryBtn);
+        }
+    }
+
+    // Character counter for notes
+    if (noteInput && charCount) {
+        noteInput.addEventListener('input', function() {
+            const length = this.value.length;
+            charCount.textContent = length;
+
+            // Prevent exceeding limit
+            if (length > 500) {
+                this.value = this.value.substring(0, 500);
+                charCount.textContent = '500';
+            }
+
+            // Update color based on usage
+            const percentage = (length / 500) * 100;
+            if (percentage > 90) {
+                charCount.style.color = 'var(--danger)';
+            } else if (percentage > 70) {
+                charCount.style.color = 'var(--warning)';
+            } else {
+                charCount.style.color = 'var(--text-muted)';
+            }
+        });
+    }
+
+    // Image zoom functionality
+    if (mainImage) {
+        mainImage.addEventListener('click', function(e) {
+            if (currentZoom === 1) {
+                zoomImage(1); // Zoom to 200%
+            } else {
+                resetZoom();
+            }
+        });
+
+        // Mouse wheel zoom
+        mainImage.addEventListener('wheel', function(e) {
+            e.preventDefault();
+            const zoomDelta = e.deltaY > 0 ? -0.2 : 0.2;
+            zoomImage(zoomDelta);
+        });
+
+        // Drag functionality when zoomed
+        mainImage.addEventListener('mousedown', function(e) {
+            if (currentZoom > 1) {
+                isDragging = true;
+                dragStart.x = e.clientX - imagePosition.x;
+                dragStart.y = e.clientY - imagePosition.y;
+                this.style.cursor = 'grabbing';
+            }
+        });
+
+        document.addEventListener('mousemove', function(e) {
+            if (isDragging) {
+                e.preventDefault();
+                imagePosition.x = e.clientX - dragStart.x;
+                imagePosition.y = e.clientY - dragStart.y;
+                updateImageTransform();
+            }
+        });
+
+        document.addEventListener('mouseup', function() {
+            if (isDragging) {
+                isDragging = false;
+                mainImage.style.cursor = currentZoom > 1 ? 'zoom-out' : 'zoom-in';
+            }
+        });
+    }
+
+    // Global functions
+    window.zoomImage = function(delta) {
+        currentZoom = Math.max(0.5, Math.min(3, currentZoom + delta));
+        updateImageTransform();
+        updateZoomControls();
+    };
+
+    window.resetZoom = function() {
+        currentZoom = 1;
+        imagePosition = { x: 0, y: 0 };
+        updateImageTransform();
+        updateZoomControls();
+    };
+
+    function updateImageTransform() {
+        if (mainImage) {
+            mainImage.style.transform = `scale(${currentZoom}) translate(${imagePosition.x / currentZoom}px, ${imagePosition.y / currentZoom}px)`;
+            mainImage.classList.toggle('zoomed', currentZoom > 1);
+        }
+    }
+
+    function updateZoomControls() {
+        if (zoomLevel) {
+            zoomLevel.textContent = Math.round(currentZoom * 100) + '%';
+        }
+        if (zoomControls) {
+            zoomControls.style.display = currentZoom > 1 ? 'flex' : 'none';
+        }
+    }
+
+    function updateImageInfo() {
+        // Update image dimensions
+        const dimensions = document.getElementById('imageDimensions');
+        if (dimensions && mainImage) {
+            dimensions.textContent = `${mainImage.naturalWidth} × ${mainImage.naturalHeight}`;
+        }
+
+        // Calculate and display file size (approximate)
+        const sizeElement = document.getElementById('imageSize');
+        if (sizeElement) {
+            // This is an approximation - in a real app you'd get this from the server
+            const approxSize = (mainImage.naturalWidth * mainImage.naturalHeight * 3) / 1024; // Rough estimate in KB
+            if (approxSize > 1024) {
+                sizeElement.textContent = (approxSize / 1024).toFixed(1) + ' MB';
+            } else {
+                sizeElement.textContent = approxSize.toFixed(0) + ' KB';
+            }
+        }
+    }
+
+    function hideLoading() {
+        const loading = document.getElementById('imageLoading');
+        if (loading) {
+            loading.style.display = 'none';
+        }
+    }
+
+    function showError() {
+        const loading = document.getElementById('imageLoading');
+        const error = document.getElementById('imageError');
+        if (loading) loading.style.display = 'none';
+        if (error) error.style.display = 'flex';
+    }
+
+    // Navigation functions
+    window.navigateImage = function(direction) {
+        const newUrl = direction < 0 ? window.pageData.prevUrl : window.pageData.nextUrl;
+
+        if (!newUrl) {
+            alert(direction < 0 ? 'This is the first image' : 'This is the last image');
+            return;
+        }
+
+        window.location.href = newUrl;
+    };
+
+    // Keyboard navigation
+    document.addEventListener('keydown', function(e) {
+        switch(e.key) {
+            case 'ArrowLeft':
+                e.preventDefault();
+                navigateImage(-1);
+                break;
+            case 'ArrowRight':
+                e.preventDefault();
+                navigateImage(1);
+                break;
+            case 'Escape':
+                if (document.fullscreenElement) {
+                    document.exitFullscreen();
+                }
+                closeDeleteModal();
+                closeDeleteNoteModal();
+                break;
+            case '+':
+            case '=':
+                e.preventDefault();
+                zoomImage(0.2);
+                break;
+            case '-':
+                e.preventDefault();
+                zoomImage(-0.2);
+                break;
+            case '0':
+                e.preventDefault();
+                resetZoom();
+                break;
+        }
+    });
+
+    // Toggle functions
+    window.toggleFullscreen = function() {
+        const container = document.querySelector('.image-view-container');
+        const btn = document.getElementById('fullscreenBtn');
+
+        if (!document.fullscreenElement) {
+            container.requestFullscreen().then(() => {
+                container.classList.add('fullscreen');
+                btn.querySelector('.btn-text').textContent = 'Exit Fullscreen';
+                btn.querySelector('.btn-icon').textContent = '🔍';
+            });
+        } else {
+            document.exitFullscreen().then(() => {
+                container.classList.remove('fullscreen');
+                btn.querySelector('.btn-text').textContent = 'Fullscreen';
+                btn.querySelector('.btn-icon').textContent = '🔍';
+            });
+        }
+    };
+
+    window.toggleInfo = function() {
+        const panel = document.getElementById('infoPanel');
+        const btn = document.getElementById('infoToggle');
+        const container = document.querySelector('.image-view-container');
+
+        if (!panel || !btn) return;
+
+        const isHidden = panel.classList.contains('hidden');
+
+        if (isHidden) {
+            // Show panel
+            panel.classList.remove('hidden');
+            container.classList.remove('info-hidden');
+            btn.querySelector('.btn-text').textContent = 'Hide Info';
+            btn.querySelector('.btn-icon').textContent = '✖️';
+        } else {
+            // Hide panel
+            panel.classList.add('hidden');
+            container.classList.add('info-hidden');
+            btn.querySelector('.btn-text').textContent = 'Show Info';
+            btn.querySelector('.btn-icon').textContent = 'ℹ️';
+        }
+    };
+
+    // Note functions
+    window.addNote = function() {
+        if (noteForm) {
+            noteForm.style.display = 'block';
+            if (noteInput) noteInput.focus();
+        }
+    };
+
+    window.editNote = function() {
+        if (noteForm) {
+            noteForm.style.display = 'block';
+            if (noteInput) {
+                noteInput.focus();
+                noteInput.setSelectionRange(noteInput.value.length, noteInput.value.length);
+            }
+        }
+    };
+
+    window.cancelNote = function() {
+        if (noteForm) {
+            noteForm.style.display = 'none';
+            // Reset to original value if editing
+            const originalNote = window.pageData.note;
+            if (noteInput && originalNote) {
+                noteInput.value = originalNote;
+                if (charCount) charCount.textContent = originalNote.length;
+            }
+        }
+    };
+
+    // Modal functions
+    window.openDeleteModal = function() {
+        const modal = document.getElementById('deleteModal');
+        if (modal) {
+            modal.style.display = 'flex';
+            setTimeout(() => {
+                const cancelBtn = modal.querySelector('.btn-outline');
+                if (cancelBtn) cancelBtn.focus();
+            }, 100);
+        }
+    };
+
+    window.closeDeleteModal = function() {
+        const modal = document.getElementById('deleteModal');
+        if (modal) modal.style.display = 'none';
+    };
+
+    window.openDeleteNoteModal = function() {
+        const modal = document.getElementById('deleteNoteModal');
+        if (modal) {
+            modal.style.display = 'flex';
+            setTimeout(() => {
+                const cancelBtn = modal.querySelector('.btn-outline');
+                if (cancelBtn) cancelBtn.focus();
+            }, 100);
+        }
+    };
+
+    window.closeDeleteNoteModal = function() {
+        const modal = document.getElementById('deleteNoteModal');
+        if (modal) modal.style.display = 'none';
+    };
+
+    // Utility functions
+    window.downloadImage = function() {
+        const link = document.createElement('a');
+        link.href = window.pageData.downloadUrl;
+        link.download = window.pageData.filename;
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+    };
+
+    window.shareImage = function() {
+        if (navigator.share) {
+            navigator.share({
+                title: 'Photo from Our Journey',
+                text: window.pageData.note.slice(0, 50) || 'Check out this photo!',
+                url: window.location.href
+            });
+        } else {
+            // Fallback: copy URL to clipboard
+            navigator.clipboard.writeText(window.location.href).then(() => {
+                showToast('Link copied to clipboard!');
+            });
+        }
+    };
+
+    window.retryImageLoad = function() {
+        const error = document.getElementById('imageError');
+        const loading = document.getElementById('imageLoading');
+
+        if (error) error.style.display = 'none';
+        if (loading) {
+            loading.style.display = 'flex';
+            updateLoadingText('Retrying...');
+        }
+
+        imageLoaded = false;
+
+        // Force reload the image with cache busting
+        if (mainImage) {
+            const originalSrc = mainImage.src;
+            const cacheBustingSrc = originalSrc + (originalSrc.includes('?') ? '&' : '?') + 'retry=' + Date.now();
+            mainImage.src = '';
+
+            setTimeout(() => {
+                mainImage.src = cacheBustingSrc;
+                // Set another timeout for this retry attempt
+                loadingTimeout = setTimeout(() => {
+                    if (!imageLoaded) {
+                        updateLoadingText('Still loading... This might take a while.');
+                    }
+                }, 3000);
+            }, 100);
+        }
+    };
+
+    // Toast notification function
+    function showToast(message, type = 'info') {
+        const toast = document.createElement('div');
+        toast.textContent = message;
+        toast.style.cssText = `
+            position: fixed;
+            top: 20px;
+            right: 20px;
+            background: var(--card-bg);
+            color: var(--text-light);
+            padding: 12px 20px;
+            border-radius: var(--border-radius-sm);
+            box-shadow: 0 8px 25px var(--shadow);
+            backdrop-filter: blur(20px);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            z-index: 10000;
+            animation: slideInRight 0.3s ease-out;
+            font-size: 0.9rem;
+        `;
+
+        document.body.appendChild(toast);
+
+        setTimeout(() => {
+            toast.style.animation = 'slideOutRight 0.3s ease-out forwards';
+            setTimeout(() => {
+                if (toast.parentNode) {
+                    toast.parentNode.removeChild(toast);
+                }
+            }, 300);
+        }, 3000);
+    }
+
+    // Add toast animation styles
+    const style = document.createElement('style');
+    style.textContent = `
+        @keyframes slideInRight {
+            from { transform: translateX(100%); opacity: 0; }
+            to { transform: translateX(0); opacity: 1; }
+        }
+        @keyframes slideOutRight {
+            from { transform: translateX(0); opacity: 1; }
+            to { transform: translateX(100%); opacity: 0; }
+        }
+    `;
+    document.head.appendChild(style);
+
+    // Check for URL parameters to show notifications
+    const urlParams = new URLSearchParams(window.location.search);
+    if (urlParams.get('note_added') === 'true') {
+        showToast('Note added successfully!', 'success');
+    }
+    if (urlParams.get('note_updated') === 'true') {
+        showToast('Note updated successfully!', 'success');
+    }
+    if (urlParams.get('note_deleted') === 'true') {
+        showToast('Note deleted successfully', 'info');
+    }
+});
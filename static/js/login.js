@@ -0,0 +1,325 @@
+// Enhanced form handling with comprehensive error management
+document.getElementById('loginForm').addEventListener('submit', function(e) {
+    const btn = document.getElementById('loginBtn');
+    const btnText = btn.querySelector('.btn-text');
+    const btnIcon = btn.querySelector('.btn-icon');
+    const form = this;
+
+    // Validate inputs before submission
+    const username = form.querySelector('input[name="username"]').value.trim();
+    const password = form.querySelector('input[name="password"]').value;
+
+    if (!username || !password) {
+        e.preventDefault();
+        showMessage('error', '❌', 'Please fill in all fields');
+        markInputsAsInvalid();
+        shakeForm();
+        return false;
+    }
+
+    // Clear any existing messages and invalid states
+    hideMessage();
+    clearInvalidInputs();
+
+    // Add loading state
+    btn.classList.add('btn-loading');
+    btn.disabled = true;
+    btnText.textContent = 'Signing In';
+    btnIcon.textContent = '⏳';
+
+    // Create loading particles
+    createLoadingParticles(btn);
+
+    // Let the form submit naturally to Flask backend
+});
+
+// Enhanced message system
+function showMessage(type, icon, text) {
+    const container = document.getElementById('message-container');
+    const iconElement = container.querySelector('.message-icon');
+    const textElement = container.querySelector('.message-text');
+
+    // Set message content
+    iconElement.textContent = icon;
+    textElement.textContent = text;
+
+    // Remove existing type classes
+    container.classList.remove('error', 'success', 'warning', 'info');
+
+    // Add new type class
+    container.classList.add(type);
+
+    // Show container
+    container.style.display = 'flex';
+
+    // Auto-hide after 5 seconds for success messages
+    if (type === 'success') {
+        setTimeout(() => {
+            hideMessage();
+        }, 5000);
+    }
+
+    // Create message particles
+    createMessageParticles(container, type);
+
+    // Announce to screen readers
+    container.setAttribute('aria-live', 'assertive');
+    setTimeout(() => {
+        container.setAttribute('aria-live', 'polite');
+    }, 1000);
+}
+
+function hideMessage() {
+    const container = document.getElementById('message-container');
+    container.style.display = 'none';
+}
+
+function shakeForm() {
+    const form = document.getElementById('loginForm');
+    form.classList.add('shake');
+    setTimeout(() => {
+        form.classList.remove('shake');
+    }, 600);
+}
+
+function markInputsAsInvalid() {
+    const inputs = document.querySelectorAll('.magic-input');
+    inputs.forEach(input => {
+        if (!input.value.trim()) {
+            input.classList.add('invalid');
+            setTimeout(() => {
+                input.classList.remove('invalid');
+            }, 2000);
+        }
+    });
+}
+
+function clearInvalidInputs() {
+    const inputs = document.querySelectorAll('.magic-input');
+    inputs.forEach(input => input.classList.remove('invalid'));
+}
+
+// Enhanced particle effects
+function createMessageParticles(element, type) {
+    const rect = element.getBoundingClientRect();
+    const particles = type === 'success' ? ['🎉', '✨', '🌟', '💫'] : ['💥', '⚠️', '❌'];
+
+    for (let i = 0; i < 6; i++) {
+        const particle = document.createElement('div');
+        particle.innerHTML = particles[Math.floor(Math.random() * particles.length)];
+        particle.style.cssText = `
+            position: fixed;
+            left: ${rect.left + Math.random() * rect.width}px;
+            top: ${rect.top}px;
+            font-size: clamp(12px, 3vw, 14px);
+            pointer-events: none;
+            z-index: 10000;
+        `;
+
+        document.body.appendChild(particle);
+
+        particle.animate([
+            { transform: 'translateY(0) scale(0)', opacity: 1 },
+            { transform: `translateY(${-20 - Math.random() * 20}px) scale(1)`, opacity: 0 }
+        ], { 
+            duration: 800, 
+            easing: 'ease-out' 
+        }).onfinish = () => {
+            if (particle.parentNode) {
+                document.body.removeChild(particle);
+            }
+        };
+    }
+}
+
+function createLoadingParticles(element) {
+    const rect = element.getBoundingClientRect();
+    const particles = ['✨', '💫', '⭐', '🌟', '💖'];
+
+    for (let i = 0; i < 8; i++) {
+        const particle = document.createElement('div');
+        particle.innerHTML = particles[Math.floor(Math.random() * particles.length)];
+        particle.style.cssText = `
+            position: fixed;
+            left: ${rect.left + rect.width / 2}px;
+            top: ${rect.top + rect.height / 2}px;
+            font-size: clamp(10px, 2vw, 12px);
+            pointer-events: none;
+            z-index: 10000;
+            color: #fff;
+        `;
+
+        document.body.appendChild(particle);
+
+        const angle = (i * 45) * Math.PI / 180;
+        const distance = 30 + Math.random() * 20;
+
+        particle.animate([
+            { transform: 'translate(-50%, -50%) scale(0)', opacity: 1 },
+            { 
+                transform: `translate(${Math.cos(angle) * distance - 50}%, ${Math.sin(angle) * distance - 50}%) scale(1)`, 
+                opacity: 0 
+            }
+        ], { 
+            duration: 1000, 
+            easing: 'cubic-bezier(0.23, 1, 0.32, 1)' 
+        }).onfinish = () => {
+            if (particle.parentNode) {
+                document.body.removeChild(particle);
+            }
+        };
+    }
+}
+
+function createFocusParticles(element) {
+    const rect = element.getBoundingClientRect();
+    const particle = document.createElement('div');
+    particle.innerHTML = '✨';
+    particle.style.cssText = `
+        position: fixed;
+        left: ${rect.right - 15}px;
+        top: ${rect.top + rect.height / 2}px;
+        font-size: clamp(12px, 3vw, 14px);
+        pointer-events: none;
+        z-index: 1000;
+        color: var(--accent);
+    `;
+
+    document.body.appendChild(particle);
+
+    particle.animate([
+        { transform: 'translateY(-50%) scale(0) rotate(0deg)', opacity: 1 },
+        { transform: 'translateY(-70%) scale(1) rotate(360deg)', opacity: 0 }
+    ], { 
+        duration: 600, 
+        easing: 'ease-out' 
+    }).onfinish = () => {
+        if (particle.parentNode) {
+            document.body.removeChild(particle);
+        }
+    };
+}
+
+// Enhanced input interactions
+document.querySelectorAll('.magic-input').forEach(input => {
+    input.addEventListener('focus', function() {
+        this.parentElement.classList.add('focused');
+        createFocusParticles(this);
+    });
+
+    input.addEventListener('blur', function() {
+        this.parentElement.classList.remove('focused');
+    });
+
+    input.addEventListener('input', function() {
+        if (this.value.length > 0) {
+            this.style.borderColor = 'var(--accent-2)';
+            this.style.background = 'rgba(255,255,255,0.15)';
+        } else {
+            this.style.borderColor = '';
+            this.style.background = '';
+        }
+        // Clear invalid state on input
+        this.classList.remove('invalid');
+    });
+});
+
+// Enhanced keyboard navigation
+document.addEventListener('keydown', function(e) {
+    if (e.key === 'Enter' && !e.shiftKey) {
+        const form = document.getElementById('loginForm');
+        const activeElement = document.activeElement;
+
+        if (activeElement && activeElement.closest('.login-form')) {
+            if (activeElement.name === 'username') {
+                const passwordInput = form.querySelector('input[name="password"]');
+                if (passwordInput) {
+                    e.preventDefault();
+                    passwordInput.focus();
+                }
+            }
+        }
+    }
+
+    // Escape key to clear messages
+    if (e.key === 'Escape') {
+        hideMessage();
+    }
+});
+
+// Enhanced hover effects for desktop
+if (window.matchMedia('(hover: hover)').matches) {
+    document.querySelectorAll('.input-group').forEach(group => {
+        group.addEventListener('mouseenter', function() {
+            if (!this.classList.contains('focused')) {
+                this.style.transform = 'translateY(-1px)';
+                this.style.boxShadow = '0 4px 12px rgba(255,90,122,0.1)';
+            }
+        });
+
+        group.addEventListener('mouseleave', function() {
+            if (!this.classList.contains('focused')) {
+                this.style.transform = '';
+                this.style.boxShadow = '';
+            }
+        });
+    });
+}
+
+// Auto-focus first input on load (desktop only)
+window.addEventListener('load', function() {
+    if (window.matchMedia('(min-width: 768px)').matches) {
+        const firstInput = document.querySelector('input[name="username"]');
+        if (firstInput) {
+            setTimeout(() => {
+                firstInput.focus();
+            }, 500);
+        }
+    }
+});
+
+// Performance optimizations
+let resizeTimeout;
+window.addEventListener('resize', function() {
+    clearTimeout(resizeTimeout);
+    resizeTimeout = setTimeout(function() {
+        // Recalculate any necessary measurements
+        document.body.style.height = window.innerHeight + 'px';
+    }, 150);
+});
+
+// Touch device optimizations
+if ('ontouchstart' in window) {
+    document.documentElement.classList.add('touch-device');
+
+    // Prevent zoom on input focus for iOS
+    document.querySelectorAll('input').forEach(input => {
+        input.addEventListener('focus', function() {
+            if (this.style.fontSize !== '16px') {
+                this.style.fontSize = '16px';
+            }
+        });
+    });
+}
+
+// Handle form reset on page visibility change (prevents stuck loading states)
+document.addEventListener('visibilitychange', function() {
+    if (document.visibilityState === 'visible') {
+        const btn = document.getElementById('loginBtn');
+        if (btn.classList.contains('btn-loading')) {
+            btn.classList.remove('btn-loading');
+            btn.disabled = false;
+            btn.querySelector('.btn-text').textContent = 'Sign In';
+            btn.querySelector('.btn-icon').textContent = '✨';
+        }
+    }
+});
+
+// Service Worker registration for enhanced offline experience (optional)
+if ('serviceWorker' in navigator && window.location.protocol === 'https:') {
+    window.addEventListener('load', function() {
+        navigator.serviceWorker.register('/sw.js').catch(function(err) {
+            console.log('ServiceWorker registration failed: ', err);
+        });
+    });
+}
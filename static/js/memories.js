@@ -0,0 +1,777 @@
+document.addEventListener('DOMContentLoaded', () => {
+  initializeMemoriesPage();
+});
+
+function initializeMemoriesPage() {
+  // Character counter for textarea
+  const textarea = document.getElementById('memory-text');
+  const charCount = document.getElementById('char-count');
+
+  if (textarea && charCount) {
+    textarea.addEventListener('input', () => {
+      const count = textarea.value.length;
+      charCount.textContent = count;
+
+      // Color coding for character limit
+      if (count > 450) {
+        charCount.style.color = '#ff4757';
+      } else if (count > 400) {
+        charCount.style.color = '#ffa502';
+      } else {
+        charCount.style.color = 'rgba(255, 255, 255, 0.6)';
+      }
+    });
+  }
+
+  // Initialize filter tags
+  const filterTags = document.querySelectorAll('.filter-tag');
+  filterTags.forEach(tag => {
+    tag.addEventListener('click', () => {
+      // Remove active class from all tags
+      filterTags.forEach(t => t.classList.remove('active'));
+      // Add active class to clicked tag
+      tag.classList.add('active');
+
+      // Filter memories
+      const filter = tag.getAttribute('data-filter');
+      filterMemoriesByCategory(filter);
+    });
+  });
+
+  // Initialize share buttons, including ones on pages loaded later
+  document.addEventListener('click', (e) => {
+    const button = e.target.closest('.share-btn');
+    if (!button) return;
+    const text = button.getAttribute('data-text');
+    const category = button.getAttribute('data-category');
+    shareMemory(text, category);
+  });
+
+  // Initialize search input
+  const searchInput = document.getElementById('memory-search');
+  const clearSearch = document.querySelector('.clear-search');
+
+  if (searchInput && clearSearch) {
+    searchInput.addEventListener('input', () => {
+      if (searchInput.value.length > 0) {
+        clearSearch.style.display = 'flex';
+      } else {
+        clearSearch.style.display = 'none';
+      }
+      filterMemories();
+    });
+  }
+
+  // Initialize lazy loading for images
+  if ('IntersectionObserver' in window) {
+    const imageObserver = new IntersectionObserver((entries, observer) => {
+      entries.forEach(entry => {
+        if (entry.isIntersecting) {
+          const img = entry.target;
+          img.src = img.dataset.src || img.src;
+          img.classList.remove('lazy');
+          observer.unobserve(img);
+        }
+      });
+    });
+
+    document.querySelectorAll('img[loading="lazy"]').forEach(img => {
+      imageObserver.observe(img);
+    });
+  }
+}
+
+function filterMemories() {
+  const input = document.getElementById("memory-search").value.toLowerCase();
+  const cards = document.getElementsByClassName("memory-card");
+  let visibleCount = 0;
+
+  for (let card of cards) {
+    const content = card.dataset.content;
+    const category = card.dataset.category.toLowerCase();
+
+    if (content.includes(input) || category.includes(input)) {
+      card.style.display = "";
+      visibleCount++;
+    } else {
+      card.style.display = "none";
+    }
+  }
+
+  // Update memory count if exists
+  const memoryCount = document.querySelector('.memory-count');
+  if (memoryCount) {
+    memoryCount.textContent = `(${visibleCount})`;
+  }
+}
+
+function filterMemoriesByCategory(category) {
+  const cards = document.getElementsByClassName("memory-card");
+  let visibleCount = 0;
+
+  for (let card of cards) {
+    const cardCategory = card.dataset.category;
+
+    if (category === 'all' || cardCategory === category) {
+      card.style.display = "";
+      visibleCount++;
+    } else {
+      card.style.display = "none";
+    }
+  }
+
+  // Update memory count
+  const memoryCount = document.querySelector('.memory-count');
+  if (memoryCount) {
+    memoryCount.textContent = `(${visibleCount})`;
+  }
+}
+
+function clearSearch() {
+  const searchInput = document.getElementById("memory-search");
+  const clearButton = document.querySelector('.clear-search');
+
+  if (searchInput) {
+    searchInput.value = '';
+    clearButton.style.display = 'none';
+    filterMemories();
+  }
+}
+
+function sortMemories() {
+  const select = document.getElementById("memory-sort");
+  const value = select.value;
+  const list = document.getElementById("memory-list");
+
+  if (!list) return;
+
+  const cards = Array.from(list.getElementsByClassName("memory-card"));
+
+  cards.sort((a, b) => {
+    switch (value) {
+      case "timestamp-desc":
+        return b.dataset.timestamp.localeCompare(a.dataset.timestamp);
+      case "timestamp-asc":
+        return a.dataset.timestamp.localeCompare(b.dataset.timestamp);
+      case "category":
+        return a.dataset.category.localeCompare(b.dataset.category);
+      case "length":
+        return parseInt(b.dataset.length) - parseInt(a.dataset.length);
+      default:
+        return 0;
+    }
+  });
+
+  // Animate sorting
+  list.style.opacity = '0.5';
+  setTimeout(() => {
+    list.innerHTML = "";
+    cards.forEach(card => list.appendChild(card));
+    list.style.opacity = '1';
+  }, 150);
+}
+
+function editMemory(button, index) {
+  const card = button.closest(".memory-card");
+  const textElement = card.querySelector(".memory-text");
+  const currentText = textElement.textContent.trim();
+  const form = card.querySelector(".edit-form");
+  const input = form.querySelector("input[name='new_text']");
+
+  if (button.querySelector('.btn-text').textContent === "Edit") {
+    // Create editing interface
+    const editContainer = document.createElement("div");
+    editContainer.className = "edit-container";
+    editContainer.innerHTML = `
+      <textarea class="edit-textarea" rows="3" maxlength="500">${currentText}</textarea>
+      <div class="edit-actions">
+        <button type="button" class="btn secondary-btn cancel-edit">
+          <span class="btn-icon">❌</span>
+          <span class="btn-text">Cancel</span>
+        </button>
+        <button type="button" class="btn primary-btn save-edit">
+          <span class="btn-icon">💾</span>
+          <span class="btn-text">Save</span>
+        </button>
+      </div>
+    `;
+
+    textElement.style.display = 'none';
+    textElement.parentNode.insertBefore(editContainer, textElement.nextSibling);
+
+    // Update button
+    button.innerHTML = `
+      <span class="btn-icon">💾</span>
+      <span class="btn-text">Save</span>
+    `;
+
+    // Add event listeners
+    const cancelBtn = editContainer.querySelector('.cancel-edit');
+    const saveBtn = editContainer.querySelector('.save-edit');
+    const textarea = editContainer.querySelector('.edit-textarea');
+
+    cancelBtn.addEventListener('click', () => {
+      editContainer.remove();
+      textElement.style.display = '';
+      button.innerHTML = `
+        <span class="btn-icon">✏️</span>
+        <span class="btn-text">Edit</span>
+      `;
+    });
+
+    saveBtn.addEventListener('click', () => {
+      const newText = textarea.value.trim();
+      if (newText && newText !== currentText) {
+        input.value = newText;
+
+        // Show loading state
+        button.classList.add('loading');
+        form.submit();
+      } else if (!newText) {
+        showNotification('Memory text cannot be empty!', 'error');
+      } else {
+        // No changes, just cancel
+        cancelBtn.click();
+      }
+    });
+
+    // Auto-focus textarea
+    textarea.focus();
+    textarea.select();
+
+  }
+}
+
+function shareMemory(text, category) {
+  if (!text || !category) {
+    showNotification('Cannot share: Memory data is missing.', 'error');
+    return;
+  }
+
+  const shareText = `💕 Memory: [${category}] ${text}`;
+
+  // Try native sharing first
+  if (navigator.share) {
+    navigator.share({
+      title: 'Our Journey - Memory',
+      text: shareText,
+    }).then(() => {
+      showNotification('Memory shared successfully! 💕', 'success');
+    }).catch(() => {
+      copyToClipboard(shareText);
+    });
+  } else {
+    copyToClipboard(shareText);
+  }
+}
+
+function copyToClipboard(text) {
+  if (navigator.clipboard && navigator.clipboard.writeText) {
+    navigator.clipboard.writeText(text).then(() => {
+      showNotification('Memory copied to clipboard! 📋', 'success');
+    }).catch(() => {
+      fallbackCopyTextToClipboard(text);
+    });
+  } else {
+    fallbackCopyTextToClipboard(text);
+  }
+}
+
+function fallbackCopyTextToClipboard(text) {
+  const textArea = document.createElement("textarea");
+  textArea.value = text;
+  textArea.style.position = "fixed";
+  textArea.style.left = "-999999px";
+  textArea.style.top = "-999999px";
+  document.body.appendChild(textArea);
+  textArea.focus();
+  textArea.select();
+
+  try {
+    document.execCommand('copy');
+    showNotification('Memory copied to clipboard! 📋', 'success');
+  } catch (err) {
+    showNotification('Could not copy text: ' + text, 'error');
+  }
+
+  document.body.removeChild(textArea);
+}
+
+function previewMemoryPhoto(input) {
+  const file = input.files[0];
+  const preview = document.getElementById("memory-preview");
+  const previewContainer = document.getElementById("image-preview");
+  const label = input.nextElementSibling;
+
+  if (file) {
+    // Validate file size against the server's upload limit
+    const maxBytes = Number(input.form.dataset.maxBytes) || Infinity;
+    if (file.size > maxBytes) {
+      showNotification(`File size must be less than ${Math.round(maxBytes / (1024 * 1024))}MB`, 'error');
+      input.value = '';
+      return;
+    }
+
+    // Validate file type
+    if (!file.type.startsWith('image/')) {
+      showNotification('Please select an image file', 'error');
+      input.value = '';
+      return;
+    }
+
+    const reader = new FileReader();
+    reader.onload = function(e) {
+      preview.src = e.target.result;
+      previewContainer.style.display = "block";
+      label.innerHTML = `
+        <span class="file-icon">✅</span>
+        <span class="file-text">Photo Selected</span>
+      `;
+    };
+    reader.readAsDataURL(file);
+  } else {
+    removeImagePreview();
+  }
+}
+
+// Send the photo through the chunked upload API first, so a big photo on a
+// flaky connection resumes instead of failing the whole form
+document.addEventListener('DOMContentLoaded', () => {
+  const form = document.querySelector('.add-memory-form');
+  const input = document.getElementById('memory-photo');
+  if (!form || !input || !window.chunkedUpload || !window.fetch) return;
+
+  form.addEventListener('submit', (e) => {
+    const file = input.files[0];
+    if (!file || form.dataset.uploading) return;
+    e.preventDefault();
+    e.stopImmediatePropagation();
+    form.dataset.uploading = 'true';
+    const label = input.nextElementSibling;
+    window.chunkedUpload(file, 'memories', (sent, total) => {
+      label.innerHTML = `
+        <span class="file-icon">⏳</span>
+        <span class="file-text">Uploading... ${Math.round((sent / total) * 100)}%</span>
+      `;
+    })
+      .then(result => {
+        const hidden = document.createElement('input');
+        hidden.type = 'hidden';
+        hidden.name = 'uploaded';
+        hidden.value = result.id;
+        form.appendChild(hidden);
+        input.disabled = true;
+        form.submit();
+      })
+      .catch(error => {
+        delete form.dataset.uploading;
+        label.innerHTML = `
+          <span class="file-icon">📸</span>
+          <span class="file-text">Retry Upload</span>
+        `;
+        showNotification(`${error.message} Save again to resume the upload.`, 'error');
+      });
+  });
+});
+
+function removeImagePreview() {
+  const preview = document.getElementById("memory-preview");
+  const previewContainer = document.getElementById("image-preview");
+  const input = document.getElementById("memory-photo");
+  const label = input.nextElementSibling;
+
+  preview.src = '';
+  previewContainer.style.display = "none";
+  input.value = '';
+  label.innerHTML = `
+    <span class="file-icon">📸</span>
+    <span class="file-text">Choose Photo</span>
+  `;
+}
+
+function openDeleteModal(index) {
+  const modal = document.getElementById("delete-modal");
+  const confirmBtn = modal.querySelector(".confirm-delete-btn");
+
+  if (modal && confirmBtn) {
+    modal.style.display = "flex";
+    confirmBtn.setAttribute("form", `delete-form-${index}`);
+
+    // Focus management for accessibility
+    const closeBtn = modal.querySelector(".modal-close");
+    if (closeBtn) {
+      closeBtn.focus();
+    }
+  }
+}
+
+function closeDeleteModal() {
+  const modal = document.getElementById("delete-modal");
+  if (modal) {
+    modal.style.display = "none";
+  }
+}
+
+function openPhotoModal(img) {
+  const modal = document.getElementById("photo-modal");
+  const modalPhoto = document.getElementById("modal-photo");
+
+  if (modal && modalPhoto) {
+    modalPhoto.src = img.currentSrc || img.src;
+    modalPhoto.alt = img.alt;
+    modal.style.display = "flex";
+
+    // Store current photo for download/share
+    modal.dataset.currentPhoto = img.src;
+  }
+}
+
+function closePhotoModal() {
+  const modal = document.getElementById("photo-modal");
+  if (modal) {
+    modal.style.display = "none";
+  }
+}
+
+function downloadPhoto() {
+  const modal = document.getElementById("photo-modal");
+  const photoSrc = modal.dataset.currentPhoto;
+
+  if (photoSrc) {
+    const link = document.createElement('a');
+    link.href = photoSrc;
+    link.download = `memory-photo-${Date.now()}.jpg`;
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+
+    showNotification('Photo download started! 📥', 'success');
+  }
+}
+
+function sharePhoto() {
+  const modal = document.getElementById("photo-modal");
+  const photoSrc = modal.dataset.currentPhoto;
+
+  if (photoSrc && navigator.share) {
+    fetch(photoSrc)
+      .then(response => response.blob())
+      .then(blob => {
+        const file = new File([blob], 'memory-photo.jpg', { type: blob.type });
+        return navigator.share({
+          title: 'Our Journey - Memory Photo',
+          files: [file]
+        });
+      })
+      .then(() => {
+        showNotification('Photo shared successfully! 📤', 'success');
+      })
+      .catch(() => {
+        // Fallback to copying image URL
+        copyToClipboard(photoSrc);
+      });
+  } else {
+    copyToClipboard(photoSrc);
+  }
+}
+
+function loadMoreMemories() {
+  // This would typically load more memories from the server
+  // For now, we'll just show a message
+  showNotification('All memories loaded! 📚', 'info');
+
+  const loadMoreBtn = document.querySelector('.load-more-container');
+  if (loadMoreBtn) {
+    loadMoreBtn.style.display = 'none';
+  }
+}
+
+function showNotification(message, type = 'info') {
+  // Check if we're in the base template context (with notification system)
+  if (typeof window.showNotification === 'function') {
+    window.showNotification(message, type);
+    return;
+  }
+
+  // Fallback notification system for standalone page
+  const notification = document.createElement('div');
+  notification.className = `notification notification-${type}`;
+  notification.innerHTML = `
+    <span class="notification-icon">${getNotificationIcon(type)}</span>
+    <span class="notification-message">${message}</span>
+    <button class="notification-close" onclick="this.parentElement.remove()">×</button>
+  `;
+
+  // Create container if it doesn't exist
+  let container = document.getElementById('temp-notification-container');
+  if (!container) {
+    container = document.createElement('div');
+    container.id = 'temp-notification-container';
+    container.style.cssText = `
+      position: fixed;
+      top: 20px;
+      right: 20px;
+      z-index: 10000;
+      display: flex;
+      flex-direction: column;
+      gap: 10px;
+    `;
+    document.body.appendChild(container);
+  }
+
+  container.appendChild(notification);
+
+  // Auto remove after 4 seconds
+  setTimeout(() => {
+    if (notification.parentNode) {
+      notification.style.animation = 'slideOutRight 0.3s ease forwards';
+      setTimeout(() => notification.remove(), 300);
+    }
+  }, 4000);
+}
+
+function getNotificationIcon(type) {
+  const icons = {
+    success: '✅',
+    error: '❌',
+    warning: '⚠️',
+    info: 'ℹ️'
+  };
+  return icons[type] || '📢';
+}
+
+// Form submission with loading state
+document.addEventListener('submit', (e) => {
+  const form = e.target;
+  const submitBtn = form.querySelector('button[type="submit"]');
+
+  if (submitBtn && !submitBtn.disabled) {
+    submitBtn.classList.add('loading');
+    submitBtn.disabled = true;
+
+    // Re-enable after 5 seconds to prevent permanent disability
+    setTimeout(() => {
+      submitBtn.classList.remove('loading');
+      submitBtn.disabled = false;
+    }, 5000);
+  }
+});
+
+// Keyboard shortcuts
+document.addEventListener('keydown', (e) => {
+  // Escape to close modals
+  if (e.key === 'Escape') {
+    const openModal = document.querySelector('.modal[style*="flex"]');
+    if (openModal) {
+      if (openModal.id === 'delete-modal') {
+        closeDeleteModal();
+      } else if (openModal.id === 'photo-modal') {
+        closePhotoModal();
+      }
+    }
+  }
+
+  // Ctrl/Cmd + F to focus search
+  if ((e.ctrlKey || e.metaKey) && e.key === 'f') {
+    e.preventDefault();
+    const searchInput = document.getElementById('memory-search');
+    if (searchInput) {
+      searchInput.focus();
+      searchInput.select();
+    }
+  }
+});
+
+// Handle image loading errors
+document.addEventListener('error', (e) => {
+  if (e.target.tagName === 'IMG') {
+    e.target.style.display = 'none';
+    const container = e.target.closest('.memory-photo-container');
+    if (container) {
+      container.innerHTML = `
+        <div style="padding: 40px; text-align: center; color: rgba(255,255,255,0.6);">
+          <div style="font-size: 2rem; margin-bottom: 8px;">🖼️</div>
+          <div>Image not found</div>
+        </div>
+      `;
+    }
+  }
+}, true);
+
+// Optimize performance on scroll
+let ticking = false;
+
+function updateScrollElements() {
+  // Add parallax or other scroll effects here if needed
+  ticking = false;
+}
+
+document.addEventListener('scroll', () => {
+  if (!ticking) {
+    requestAnimationFrame(updateScrollElements);
+    ticking = true;
+  }
+});
+
+// Touch gesture support for mobile
+let touchStartX = 0;
+let touchStartY = 0;
+
+document.addEventListener('touchstart', (e) => {
+  touchStartX = e.touches[0].clientX;
+  touchStartY = e.touches[0].clientY;
+}, { passive: true });
+
+document.addEventListener('touchmove', (e) => {
+  if (!touchStartX || !touchStartY) {
+    return;
+  }
+
+  const touchEndX = e.touches[0].clientX;
+  const touchEndY = e.touches[0].clientY;
+
+  const diffX = touchStartX - touchEndX;
+  const diffY = touchStartY - touchEndY;
+
+  // Detect swipe gestures (if needed for future features)
+  if (Math.abs(diffX) > Math.abs(diffY)) {
+    if (diffX > 50) {
+      // Swipe left
+    } else if (diffX < -50) {
+      // Swipe right
+    }
+  }
+
+  touchStartX = 0;
+  touchStartY = 0;
+}, { passive: true });
+
+// Initialize on page load
+if (document.readyState === 'loading') {
+  document.addEventListener('DOMContentLoaded', initializeMemoriesPage);
+} else {
+  initializeMemoriesPage();
+}
+
+// Add extra styles for temporary notification system
+const notificationStyles = `
+.notification {
+  display: flex;
+  align-items: center;
+  gap: 12px;
+  padding: 12px 16px;
+  background: rgba(255,255,255,0.9);
+  backdrop-filter: blur(10px);
+  border-radius: 8px;
+  box-shadow: 0 4px 20px rgba(0,0,0,0.1);
+  animation: slideInRight 0.3s ease;
+  max-width: 300px;
+  border-left: 4px solid var(--accent);
+  color: #374151;
+}
+
+.notification-success { border-left-color: #10b981; }
+.notification-error { border-left-color: #ef4444; }
+.notification-warning { border-left-color: #f59e0b; }
+.notification-info { border-left-color: #3b82f6; }
+
+.notification-icon {
+  font-size: 16px;
+  flex-shrink: 0;
+}
+
+.notification-message {
+  flex: 1;
+  font-size: 14px;
+  font-weight: 500;
+}
+
+.notification-close {
+  background: none;
+  border: none;
+  color: #6b7280;
+  cursor: pointer;
+  font-size: 18px;
+  width: 20px;
+  height: 20px;
+  border-radius: 50%;
+  display: flex;
+  align-items: center;
+  justify-content: center;
+  transition: all 0.2s ease;
+}
+
+.notification-close:hover {
+  background: rgba(0,0,0,0.1);
+  color: #374151;
+}
+
+@keyframes slideInRight {
+  from {
+    opacity: 0;
+    transform: translateX(100%);
+  }
+  to {
+    opacity: 1;
+    transform: translateX(0);
+  }
+}
+
+@keyframes slideOutRight {
+  to {
+    opacity: 0;
+    transform: translateX(100%);
+  }
+}
+
+.edit-container {
+  margin: 16px 0;
+  padding: 16px;
+  background: rgba(255,255,255,0.05);
+  border-radius: 12px;
+  border: 1px solid rgba(255,255,255,0.1);
+}
+
+.edit-textarea {
+  width: 100%;
+  padding: 12px;
+  border-radius: 8px;
+  border: 2px solid rgba(255,255,255,0.15);
+  background: rgba(255,255,255,0.1);
+  color: white;
+  font-size: 0.95rem;
+  font-family: inherit;
+  resize: vertical;
+  margin-bottom: 12px;
+}
+
+.edit-textarea:focus {
+  outline: none;
+  border-color: var(--accent);
+  background: rgba(255,255,255,0.15);
+}
+
+.edit-actions {
+  display: flex;
+  gap: 12px;
+  justify-content: flex-end;
+}
+
+@media (max-width: 480px) {
+  .edit-actions {
+    flex-direction: column;
+  }
+
+  .edit-actions .btn {
+    width: 100%;
+  }
+}
+`;
+
+// Inject styles if not already present
+if (!document.getElementById('memories-extra-styles')) {
+  const styleSheet = document.createElement('style');
+  styleSheet.id = 'memories-extra-styles';
+  styleSheet.textContent = notificationStyles;
+  document.head.appendChild(styleSheet);
+}
@@ -0,0 +1,125 @@
+// Particle animation system
+function createParticle() {
+  const particle = document.createElement('div');
+  particle.className = 'particle';
+  particle.style.left = Math.random() * 100 + 'vw';
+  particle.style.animationDuration = (Math.random() * 3 + 2) + 's';
+  particle.style.opacity = Math.random();
+  particle.style.animation = `floatUp ${particle.style.animationDuration} linear infinite`;
+
+  document.body.appendChild(particle);
+
+  setTimeout(() => {
+    particle.remove();
+  }, 5000);
+}
+
+// Create floating particles
+setInterval(createParticle, 300);
+
+// Add CSS for particle animation
+const style = document.createElement('style');
+style.textContent = `
+  @keyframes floatUp {
+    0% {
+      transform: translateY(100vh) rotate(0deg);
+      opacity: 1;
+    }
+    100% {
+      transform: translateY(-10vh) rotate(360deg);
+      opacity: 0;
+    }
+  }
+`;
+document.head.appendChild(style);
+
+// Form interaction
+document.addEventListener('DOMContentLoaded', () => {
+  const placementSelect = document.querySelector('#placementSelect');
+  const customInput = document.querySelector('#customPlacementInput');
+
+  if (placementSelect && customInput) {
+    // Function to toggle custom input
+    function toggleCustomInput() {
+      if (placementSelect.value === 'Custom') {
+        customInput.style.display = 'block';
+        customInput.style.animation = 'slideDown 0.3s ease-out';
+        customInput.setAttribute('required', 'required');
+        customInput.focus(); // Auto-focus for better UX
+      } else {
+        customInput.style.display = 'none';
+        customInput.removeAttribute('required');
+        customInput.value = ''; // Clear the value when hidden
+      }
+    }
+
+    // Listen for changes
+    placementSelect.addEventListener('change', toggleCustomInput);
+
+    // Also check on page load in case "Custom" is pre-selected
+    toggleCustomInput();
+  }
+
+  // Add hover sound effect simulation
+  const cards = document.querySelectorAll('.music-card');
+  cards.forEach(card => {
+    card.addEventListener('mouseenter', () => {
+      card.style.animation = 'none';
+      setTimeout(() => {
+        card.style.animation = 'cardHover 0.3s ease-out';
+      }, 10);
+    });
+  });
+
+  // Add button click animation
+  const buttons = document.querySelectorAll('.btn');
+  buttons.forEach(btn => {
+    btn.addEventListener('click', (e) => {
+      const ripple = document.createElement('span');
+      const rect = btn.getBoundingClientRect();
+      const size = Math.max(rect.width, rect.height);
+      const x = e.clientX - rect.left - size / 2;
+      const y = e.clientY - rect.top - size / 2;
+
+      ripple.style.cssText = `
+        position: absolute;
+        width: ${size}px;
+        height: ${size}px;
+        left: ${x}px;
+        top: ${y}px;
+        background: rgba(255, 255, 255, 0.5);
+        border-radius: 50%;
+        transform: scale(0);
+        animation: ripple 0.6s linear;
+        pointer-events: none;
+      `;
+
+      btn.appendChild(ripple);
+
+      setTimeout(() => ripple.remove(), 600);
+    });
+  });
+
+  // Add CSS for additional animations
+  const additionalStyles = document.createElement('style');
+  additionalStyles.textContent = `
+    @keyframes slideDown {
+      from { opacity: 0; transform: translateY(-10px); }
+      to { opacity: 1; transform: translateY(0); }
+    }
+
+    @keyframes cardHover {
+      0% { transform: translateY(0) scale(1); }
+      50% { transform: translateY(-5px) scale(1.01); }
+      100% { transform: translateY(-8px) scale(1.02); }
+    }
+
+    @keyframes ripple {
+      to { transform: scale(4); opacity: 0; }
+    }
+  `;
+  document.head.appendChild(additionalStyles);
+});
+
+// Smooth scroll behavior
+document.documentElement.style.scrollBehavior = 'smooth';
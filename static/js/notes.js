@@ -0,0 +1,411 @@
+document.addEventListener('DOMContentLoaded', function() {
+  // Character counter and progress bar
+  const textarea = document.getElementById('note-input');
+  const charCount = document.getElementById('char-count');
+  const progressBar = document.getElementById('char-progress-bar');
+  const submitBtn = document.getElementById('submit-btn');
+  const clearBtn = document.getElementById('clear-btn');
+
+  if (textarea && charCount && progressBar) {
+    function updateCharCounter() {
+      const length = textarea.value.length;
+      const maxLength = parseInt(textarea.getAttribute('maxlength'));
+      const percentage = (length / maxLength) * 100;
+
+      charCount.textContent = length;
+      progressBar.style.width = percentage + '%';
+
+      // Change color based on usage
+      if (percentage < 50) {
+        progressBar.style.background = 'var(--success)';
+      } else if (percentage < 80) {
+        progressBar.style.background = 'var(--warning)';
+      } else {
+        progressBar.style.background = 'var(--danger)';
+      }
+
+      // Disable submit if empty or too long
+      if (submitBtn) {
+        submitBtn.disabled = length === 0 || length > maxLength;
+        submitBtn.style.opacity = submitBtn.disabled ? '0.5' : '1';
+      }
+    }
+
+    textarea.addEventListener('input', updateCharCounter);
+    updateCharCounter(); // Initial call
+  }
+
+  // Clear button functionality
+  if (clearBtn && textarea) {
+    clearBtn.addEventListener('click', function() {
+      if (textarea.value.length > 0) {
+        if (confirm('Are you sure you want to clear your note?')) {
+          textarea.value = '';
+          textarea.focus();
+          if (charCount) charCount.textContent = '0';
+          if (progressBar) {
+            progressBar.style.width = '0%';
+            progressBar.style.background = 'var(--success)';
+          }
+        }
+      }
+    });
+  }
+
+  // Search functionality
+  const searchToggle = document.getElementById('search-toggle');
+  const searchContainer = document.getElementById('search-container');
+  const searchInput = document.getElementById('search-input');
+  const notesList = document.getElementById('notes-list');
+
+  if (searchToggle && searchContainer && searchInput) {
+    // Show search container by default if there are notes
+    if (document.querySelectorAll('.note-card').length > 0) {
+      searchContainer.style.display = 'block';
+      updateToggleButton(searchToggle, true);
+    }
+
+    searchToggle.addEventListener('click', function() {
+      const isCurrentlyVisible = searchContainer.style.display === 'block';
+
+      if (isCurrentlyVisible) {
+        // Hide search
+        searchContainer.style.display = 'none';
+        searchInput.value = '';
+        showAllNotes();
+        updateToggleButton(this, false);
+      } else {
+        // Show search
+        searchContainer.style.display = 'block';
+        updateToggleButton(this, true);
+        setTimeout(() => {
+          searchInput.focus();
+        }, 100);
+
+        // Close sort if open
+        const sortContainer = document.getElementById('sort-container');
+        const sortToggle = document.getElementById('sort-toggle');
+        if (sortContainer && sortToggle) {
+          sortContainer.style.display = 'none';
+          updateToggleButton(sortToggle, false);
+        }
+      }
+    });
+
+    searchInput.addEventListener('input', function() {
+      const query = this.value.toLowerCase().trim();
+      filterNotes(query);
+    });
+
+    // Allow Enter key to focus on first visible note
+    searchInput.addEventListener('keydown', function(e) {
+      if (e.key === 'Enter') {
+        const firstVisibleNote = document.querySelector('.note-card[style*="block"], .note-card:not([style*="none"])');
+        if (firstVisibleNote) {
+          firstVisibleNote.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        }
+      }
+    });
+  }
+
+  function filterNotes(query) {
+    const noteCards = document.querySelectorAll('.note-card');
+    let visibleCount = 0;
+
+    noteCards.forEach(card => {
+      const noteText = card.querySelector('.note-text');
+      if (noteText) {
+        const text = noteText.textContent.toLowerCase();
+        const noteTitle = card.querySelector('.note-title');
+        const titleText = noteTitle ? noteTitle.textContent.toLowerCase() : '';
+
+        const isMatch = query === '' || text.includes(query) || titleText.includes(query);
+
+        if (isMatch) {
+          card.style.display = 'block';
+          card.style.opacity = '1';
+          visibleCount++;
+
+          // Highlight matching text
+          if (query && query.length > 0) {
+            highlightText(noteText, query);
+          } else {
+            removeHighlights(noteText);
+          }
+        } else {
+          card.style.display = 'none';
+          card.style.opacity = '0';
+        }
+      }
+    });
+
+    // Update notes count if exists
+    const notesCount = document.querySelector('.notes-count');
+    if (notesCount) {
+      const totalNotes = noteCards.length;
+      if (query && query.length > 0) {
+        notesCount.textContent = `(${visibleCount}/${totalNotes})`;
+        notesCount.style.color = visibleCount === 0 ? 'var(--danger)' : 'var(--accent)';
+      } else {
+        notesCount.textContent = `(${totalNotes})`;
+        notesCount.style.color = 'var(--accent)';
+      }
+    }
+
+    // Show "no results" message
+    showNoResultsMessage(visibleCount, query);
+  }
+
+  function highlightText(element, query) {
+    const originalText = element.dataset.originalText || element.textContent;
+    element.dataset.originalText = originalText;
+
+    const regex = new RegExp(`(${escapeRegExp(query)})`, 'gi');
+    const highlightedText = originalText.replace(regex, '<mark class="search-highlight">$1</mark>');
+    element.innerHTML = highlightedText;
+  }
+
+  function removeHighlights(element) {
+    if (element.dataset.originalText) {
+      element.textContent = element.dataset.originalText;
+      delete element.dataset.originalText;
+    }
+  }
+
+  function escapeRegExp(string) {
+    return string.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+  }
+
+  function showNoResultsMessage(visibleCount, query) {
+    const existingMessage = document.getElementById('no-results-message');
+    if (existingMessage) {
+      existingMessage.remove();
+    }
+
+    if (visibleCount === 0 && query && query.length > 0) {
+      const message = document.createElement('div');
+      message.id = 'no-results-message';
+      message.className = 'no-results';
+      message.innerHTML = `
+        <div class="no-results-icon">🔍</div>
+        <h4>No notes found</h4>
+        <p>No notes contain "<strong>${escapeHtml(query)}</strong>"</p>
+        <button class="btn btn-outline btn-small" onclick="document.getElementById('search-input').value=''; showAllNotes(); this.parentElement.remove();">
+          <span class="btn-text">Clear Search</span>
+        </button>
+      `;
+
+      const notesList = document.getElementById('notes-list');
+      if (notesList) {
+        notesList.appendChild(message);
+      }
+    }
+  }
+
+  function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+  }
+
+  function showAllNotes() {
+    const noteCards = document.querySelectorAll('.note-card');
+    noteCards.forEach(card => {
+      card.style.display = 'block';
+      card.style.opacity = '1';
+
+      // Remove highlights
+      const noteText = card.querySelector('.note-text');
+      if (noteText) {
+        removeHighlights(noteText);
+      }
+    });
+
+    // Reset notes count
+    const notesCount = document.querySelector('.notes-count');
+    if (notesCount) {
+      const totalNotes = noteCards.length;
+      notesCount.textContent = `(${totalNotes})`;
+      notesCount.style.color = 'var(--accent)';
+    }
+
+    // Remove no results message
+    const noResultsMessage = document.getElementById('no-results-message');
+    if (noResultsMessage) {
+      noResultsMessage.remove();
+    }
+  }
+
+  // Sort functionality
+  const sortToggle = document.getElementById('sort-toggle');
+  const sortContainer = document.getElementById('sort-container');
+  const sortButtons = document.querySelectorAll('.sort-btn');
+
+  if (sortToggle && sortContainer) {
+    sortToggle.addEventListener('click', function() {
+      const isCurrentlyVisible = sortContainer.style.display === 'block';
+
+      if (isCurrentlyVisible) {
+        // Hide sort
+        sortContainer.style.display = 'none';
+        updateToggleButton(this, false);
+      } else {
+        // Show sort
+        sortContainer.style.display = 'block';
+        updateToggleButton(this, true);
+
+        // Close search if open
+        const searchContainer = document.getElementById('search-container');
+        const searchToggle = document.getElementById('search-toggle');
+        const searchInput = document.getElementById('search-input');
+
+        if (searchContainer && searchToggle && searchInput) {
+          searchContainer.style.display = 'none';
+          searchInput.value = '';
+          showAllNotes();
+          updateToggleButton(searchToggle, false);
+        }
+      }
+    });
+  }
+
+  // Helper function to update toggle button appearance
+  function updateToggleButton(button, isActive) {
+    const btnText = button.querySelector('.btn-text');
+    const btnIcon = button.querySelector('.btn-icon');
+
+    if (button.id === 'search-toggle') {
+      if (btnText) btnText.textContent = isActive ? 'Hide Search' : 'Search';
+      if (btnIcon) btnIcon.textContent = isActive ? '✖️' : '🔍';
+      button.classList.toggle('active', isActive);
+    } else if (button.id === 'sort-toggle') {
+      if (btnText) btnText.textContent = isActive ? 'Hide Sort' : 'Sort';
+      if (btnIcon) btnIcon.textContent = isActive ? '✖️' : '📅';
+      button.classList.toggle('active', isActive);
+    }
+  }
+
+  sortButtons.forEach(btn => {
+    btn.addEventListener('click', function() {
+      // Update active state
+      sortButtons.forEach(b => b.classList.remove('active'));
+      this.classList.add('active');
+
+      // Sort notes
+      const sortType = this.dataset.sort;
+      sortNotes(sortType);
+    });
+  });
+
+  function sortNotes(sortType) {
+    const notesList = document.getElementById('notes-list');
+    if (!notesList) return;
+
+    const noteCards = Array.from(notesList.children);
+
+    noteCards.sort((a, b) => {
+      switch (sortType) {
+        case 'newest':
+          return new Date(b.dataset.timestamp) - new Date(a.dataset.timestamp);
+        case 'oldest':
+          return new Date(a.dataset.timestamp) - new Date(b.dataset.timestamp);
+        case 'longest':
+          return parseInt(b.dataset.length) - parseInt(a.dataset.length);
+        case 'shortest':
+          return parseInt(a.dataset.length) - parseInt(b.dataset.length);
+        default:
+          return 0;
+      }
+    });
+
+    // Re-append sorted cards
+    noteCards.forEach(card => {
+      notesList.appendChild(card);
+    });
+
+    // Add animation
+    noteCards.forEach((card, index) => {
+      card.style.animation = `fadeInUp 0.3s ease-out ${index * 0.05}s both`;
+    });
+  }
+
+  // Modal functionality
+  const deleteModal = document.getElementById('delete-modal');
+  const deleteForm = document.getElementById('delete-form');
+  const notePreview = document.getElementById('note-preview');
+  const modalClose = document.getElementById('modal-close');
+  const cancelDelete = document.getElementById('cancel-delete');
+
+  // Handle delete button clicks, including notes on pages loaded later
+  document.addEventListener('click', function(e) {
+    const btn = e.target.closest('.delete-btn[data-note-id]');
+    if (!btn) return;
+    e.preventDefault();
+    const noteId = btn.dataset.noteId;
+    const preview = btn.dataset.notePreview;
+
+    notePreview.textContent = preview;
+    deleteForm.action = window.pageData.deleteNoteUrl.replace('/0/', `/${noteId}/`);
+    deleteModal.style.display = 'flex';
+
+    // Trap focus in modal
+    trapFocus(deleteModal);
+  });
+
+  // Close modal handlers
+  [modalClose, cancelDelete].forEach(btn => {
+    if (btn) {
+      btn.addEventListener('click', closeModal);
+    }
+  });
+
+  // Close on overlay click
+  if (deleteModal) {
+    deleteModal.querySelector('.modal-overlay').addEventListener('click', closeModal);
+  }
+
+  // Close on escape key
+  document.addEventListener('keydown', function(e) {
+    if (e.key === 'Escape' && deleteModal.style.display === 'flex') {
+      closeModal();
+    }
+  });
+
+  function closeModal() {
+    if (deleteModal) {
+      deleteModal.style.display = 'none';
+      // Return focus to the delete button that opened the modal
+      const activeDeleteBtn = document.querySelector('.delete-btn:focus');
+      if (activeDeleteBtn) {
+        activeDeleteBtn.focus();
+      }
+    }
+  }
+
+  function trapFocus(modal) {
+    const focusableElements = modal.querySelectorAll('button, [href], input, select, textarea, [tabindex]:not([tabindex="-1"])');
+    const firstElement = focusableElements[0];
+    const lastElement = focusableElements[focusableElements.length - 1];
+
+    if (firstElement) {
+      firstElement.focus();
+    }
+
+    modal.addEventListener('keydown', function(e) {
+      const isTabPressed = (e.key === 'Tab' || e.keyCode === 9);
+      if (!isTabPressed) return;
+
+      if (e.shiftKey) { // Shift + Tab
+        if (document.activeElement === firstElement) {
+          e.preventDefault();
+          lastElement.focus();
+        }
+      } else { // Tab
+        if (document.activeElement === lastElement) {
+          e.preventDefault();
+          firstElement.focus();
+        }
+      }
+    });
+  }
+});
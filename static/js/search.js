@@ -0,0 +1,29 @@
+// Search as you type: fetch the rendered results as JSON and swap them in
+document.addEventListener('DOMContentLoaded', function() {
+  const input = document.getElementById('search-input');
+  const results = document.getElementById('search-results');
+  if (!input || !results) return;
+
+  let timer = null;
+  let controller = null;
+
+  input.addEventListener('input', function() {
+    clearTimeout(timer);
+    timer = setTimeout(function() {
+      const query = input.value.trim();
+      const url = new URL(window.location.href);
+      url.searchParams.set('q', query);
+      history.replaceState(null, '', url);
+
+      if (controller) controller.abort();
+      controller = new AbortController();
+      url.searchParams.set('format', 'json');
+      fetch(url, { signal: controller.signal, headers: { 'Accept': 'application/json' } })
+        .then(function(response) { return response.json(); })
+        .then(function(data) { results.innerHTML = data.html; })
+        .catch(function(error) {
+          if (error.name !== 'AbortError') console.error('Search failed:', error);
+        });
+    }, 150);
+  });
+});
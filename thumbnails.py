@@ -0,0 +1,101 @@
+# Image variant and jigsaw puzzle generation, kept out of app.py so the
+# process pool workers only import Pillow and not the whole app (and its
+# startup) as well.
+import json
+import os
+import shutil
+
+from PIL import Image, ImageOps
+
+
+# EXIF orientations that turn the image a quarter, so width and height swap
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+# (width, height) as displayed, from the image header without decoding the
+# pixels; the variants are rotated the same way by exif_transpose
+def image_size(path):
+    with Image.open(path) as img:
+        width, height = img.size
+        if img.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+            return height, width
+        return width, height
+
+
+# Writes <name>-<width>.webp for each (name, max_width) into a scratch directory
+# and renames it to target, so a target directory that exists is complete.
+# Images are never upscaled; variants that would come out the same width are
+# written once. Returns the number of files written.
+def generate_variants(source, target, variants, quality=80, force=False):
+    if os.path.isdir(target) and not force:
+        return 0
+    scratch = f"{target}.tmp-{os.getpid()}"
+    os.makedirs(scratch, exist_ok=True)
+    written = 0
+    try:
+        with Image.open(source) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+            widths = set()
+            for name, max_width in variants:
+                width = min(max_width, img.width)
+                if width in widths:
+                    continue
+                widths.add(width)
+                height = max(1, round(img.height * width / img.width))
+                resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+                resized.save(os.path.join(scratch, f"{name}-{width}.webp"), "WEBP", quality=quality, method=4)
+                written += 1
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.rename(scratch, target)
+    except Exception:
+        shutil.rmtree(scratch)
+        raise
+    return written
+
+
+# Writes a jigsaw puzzle for source into target: board.webp, the image
+# scaled to fit max_size and cropped by a few pixels so it splits into
+# grid x grid whole-pixel pieces (it is also the pieces' sprite sheet), and
+# manifest.json with the piece rectangles. Returns the manifest.
+def make_puzzle(source, target, grid, max_size, quality=80):
+    scratch = f"{target}.tmp-{os.getpid()}"
+    os.makedirs(scratch, exist_ok=True)
+    try:
+        with Image.open(source) as img:
+            # Let the JPEG decoder skip detail the board will not keep
+            img.draft("RGB", (max_size, max_size))
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+            scale = min(1, max_size / max(img.width, img.height))
+            piece_width = max(1, int(img.width * scale) // grid)
+            piece_height = max(1, int(img.height * scale) // grid)
+            width, height = piece_width * grid, piece_height * grid
+            board = ImageOps.fit(img, (width, height), Image.LANCZOS)
+            board.save(os.path.join(scratch, "board.webp"), "WEBP", quality=quality, method=4)
+        manifest = {
+            "image": "board.webp",
+            "width": width,
+            "height": height,
+            "grid": grid,
+            "piece_width": piece_width,
+            "piece_height": piece_height,
+            "pieces": [
+                {"row": row, "col": col, "x": col * piece_width, "y": row * piece_height}
+                for row in range(grid) for col in range(grid)
+            ],
+        }
+        with open(os.path.join(scratch, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        try:
+            os.rename(scratch, target)
+        except OSError:
+            # Made by another worker in the meantime; theirs is as good
+            shutil.rmtree(scratch)
+    except Exception:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    return manifest